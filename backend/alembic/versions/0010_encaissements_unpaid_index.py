@@ -0,0 +1,31 @@
+"""add partial index on unpaid encaissements for receivables aging
+
+Revision ID: 0010_encaissements_unpaid_idx
+Revises: 0009_print_settings_assets
+Create Date: 2026-10-18
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0010_encaissements_unpaid_idx"
+down_revision = "0009_print_settings_assets"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Seules les lignes non soldées sont indexées: l'index reste petit même avec un historique long
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_encaissements_unpaid_date "
+        "ON public.encaissements(date_encaissement) "
+        "INCLUDE (type_client, type_operation, expert_comptable_id, montant_total, montant_paye) "
+        "WHERE statut_paiement IN ('non_paye','partiel');"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_encaissements_unpaid_date;")
@@ -0,0 +1,61 @@
+"""create cotisations_statut table (annual dues per expert)
+
+Revision ID: 0011_cotisations_statut
+Revises: 0010_encaissements_unpaid_idx
+Create Date: 2026-10-18
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0011_cotisations_statut"
+down_revision = "0010_encaissements_unpaid_idx"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+CREATE TABLE IF NOT EXISTS public.cotisations_statut (
+  expert_comptable_id uuid NOT NULL REFERENCES public.experts_comptables(id) ON DELETE CASCADE,
+  annee integer NOT NULL,
+  montant_facture numeric(15,2) NOT NULL DEFAULT 0,
+  montant_paye numeric(15,2) NOT NULL DEFAULT 0,
+  dernier_paiement timestamptz,
+  updated_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (expert_comptable_id, annee)
+);
+"""
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_cotisations_statut_annee ON public.cotisations_statut(annee);")
+    # Remplissage initial à partir de l'historique existant (équivalent du job de reconstruction)
+    op.execute(
+        """
+INSERT INTO public.cotisations_statut (expert_comptable_id, annee, montant_facture, montant_paye, dernier_paiement, updated_at)
+SELECT e.expert_comptable_id,
+       EXTRACT(YEAR FROM e.date_encaissement)::int,
+       SUM(e.montant_total),
+       SUM(e.montant_paye),
+       MAX(GREATEST(ph.dernier, CASE WHEN e.montant_paye > COALESCE(ph.total, 0) THEN e.date_encaissement END)),
+       now()
+FROM public.encaissements e
+LEFT JOIN LATERAL (
+  SELECT SUM(p.montant) AS total, MAX(p.created_at) AS dernier
+  FROM public.payment_history p
+  WHERE p.encaissement_id = e.id
+) ph ON true
+WHERE e.type_operation IN ('cotisation_annuelle','cotisation_trimestrielle')
+  AND e.expert_comptable_id IS NOT NULL
+GROUP BY 1, 2
+ON CONFLICT DO NOTHING;
+"""
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_cotisations_statut_annee;")
+    op.execute("DROP TABLE IF EXISTS public.cotisations_statut;")
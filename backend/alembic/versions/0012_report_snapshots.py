@@ -0,0 +1,55 @@
+"""create report_snapshots table (immutable monthly report summaries)
+
+Revision ID: 0012_report_snapshots
+Revises: 0011_cotisations_statut
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0012_report_snapshots"
+down_revision = "0011_cotisations_statut"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+CREATE TABLE IF NOT EXISTS public.report_snapshots (
+  mois date PRIMARY KEY CHECK (EXTRACT(DAY FROM mois) = 1),
+  payload jsonb NOT NULL,
+  content_hash varchar(64) NOT NULL,
+  closed_by uuid,
+  closed_at timestamptz NOT NULL DEFAULT now()
+);
+"""
+    )
+    # Un mois clôturé ne se modifie pas : la réouverture passe par la suppression de la ligne
+    op.execute(
+        """
+CREATE OR REPLACE FUNCTION public.report_snapshots_immutable() RETURNS trigger AS $$
+BEGIN
+  RAISE EXCEPTION 'report_snapshots est en lecture seule (mois %)', OLD.mois;
+END;
+$$ LANGUAGE plpgsql;
+"""
+    )
+    op.execute("DROP TRIGGER IF EXISTS trg_report_snapshots_immutable ON public.report_snapshots;")
+    op.execute(
+        """
+CREATE TRIGGER trg_report_snapshots_immutable
+BEFORE UPDATE ON public.report_snapshots
+FOR EACH ROW EXECUTE FUNCTION public.report_snapshots_immutable();
+"""
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_report_snapshots_immutable ON public.report_snapshots;")
+    op.execute("DROP FUNCTION IF EXISTS public.report_snapshots_immutable();")
+    op.execute("DROP TABLE IF EXISTS public.report_snapshots;")
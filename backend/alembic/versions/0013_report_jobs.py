@@ -0,0 +1,56 @@
+"""create report_jobs table (background report computations)
+
+Revision ID: 0013_report_jobs
+Revises: 0012_report_snapshots
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0013_report_jobs"
+down_revision = "0012_report_snapshots"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+CREATE TABLE IF NOT EXISTS public.report_jobs (
+  id uuid PRIMARY KEY,
+  kind varchar(50) NOT NULL,
+  params jsonb NOT NULL,
+  params_hash varchar(64) NOT NULL,
+  status varchar(20) NOT NULL DEFAULT 'pending'
+    CHECK (status IN ('pending','running','done','failed')),
+  result bytea,
+  error text,
+  created_by uuid,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  started_at timestamptz,
+  finished_at timestamptz,
+  expires_at timestamptz NOT NULL
+);
+"""
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_report_jobs_params_hash ON public.report_jobs(params_hash);")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_report_jobs_expires_at ON public.report_jobs(expires_at);")
+    # Une seule exécution en cours par demande identique
+    op.execute(
+        """
+CREATE UNIQUE INDEX IF NOT EXISTS ux_report_jobs_active_params
+ON public.report_jobs(params_hash)
+WHERE status IN ('pending','running');
+"""
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ux_report_jobs_active_params;")
+    op.execute("DROP INDEX IF EXISTS ix_report_jobs_expires_at;")
+    op.execute("DROP INDEX IF EXISTS ix_report_jobs_params_hash;")
+    op.execute("DROP TABLE IF EXISTS public.report_jobs;")
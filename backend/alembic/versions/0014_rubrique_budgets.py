@@ -0,0 +1,59 @@
+"""create rubrique_budgets table (annual budget and consumption counters per rubrique)
+
+Revision ID: 0014_rubrique_budgets
+Revises: 0013_report_jobs
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0014_rubrique_budgets"
+down_revision = "0013_report_jobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+CREATE TABLE IF NOT EXISTS public.rubrique_budgets (
+  rubrique_code varchar(50) NOT NULL REFERENCES public.rubriques(code) ON UPDATE CASCADE ON DELETE CASCADE,
+  annee integer NOT NULL,
+  budget numeric(15,2) NOT NULL DEFAULT 0,
+  montant_engage numeric(15,2) NOT NULL DEFAULT 0,
+  montant_paye numeric(15,2) NOT NULL DEFAULT 0,
+  updated_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (rubrique_code, annee)
+);
+"""
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_rubrique_budgets_annee ON public.rubrique_budgets(annee);")
+    # Remplissage initial des compteurs (équivalent de la réconciliation)
+    op.execute(
+        """
+INSERT INTO public.rubrique_budgets (rubrique_code, annee, montant_engage, montant_paye, updated_at)
+SELECT rubrique_code, annee, SUM(engage), SUM(paye), now()
+FROM (
+  SELECT r.code AS rubrique_code, EXTRACT(YEAR FROM q.created_at)::int AS annee, l.montant_total AS engage, 0 AS paye
+  FROM public.lignes_requisition l
+  JOIN public.requisitions q ON q.id = l.requisition_id
+  JOIN public.rubriques r ON r.code = l.rubrique
+  WHERE UPPER(q.status) IN ('VALIDEE','APPROUVEE','VALIDATED','APPROVED','PAYEE','PAID')
+  UNION ALL
+  SELECT r.code, EXTRACT(YEAR FROM COALESCE(s.date_paiement, s.created_at))::int, 0, s.montant_paye
+  FROM public.sorties_fonds s
+  JOIN public.rubriques r ON r.code = s.rubrique_code
+) flux
+GROUP BY 1, 2
+ON CONFLICT DO NOTHING;
+"""
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_rubrique_budgets_annee;")
+    op.execute("DROP TABLE IF EXISTS public.rubrique_budgets;")
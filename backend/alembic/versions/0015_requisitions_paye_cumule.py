@@ -0,0 +1,41 @@
+"""add requisitions.montant_paye_cumule (maintained sum of linked sorties_fonds)
+
+Revision ID: 0015_requisitions_paye_cumule
+Revises: 0014_rubrique_budgets
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0015_requisitions_paye_cumule"
+down_revision = "0014_rubrique_budgets"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE public.requisitions ADD COLUMN IF NOT EXISTS montant_paye_cumule numeric(14,2) NOT NULL DEFAULT 0;"
+    )
+    # Reprise de l'historique des décaissements
+    op.execute(
+        """
+UPDATE public.requisitions q
+SET montant_paye_cumule = s.total
+FROM (
+  SELECT requisition_id, SUM(montant_paye) AS total
+  FROM public.sorties_fonds
+  WHERE requisition_id IS NOT NULL
+  GROUP BY requisition_id
+) s
+WHERE s.requisition_id = q.id;
+"""
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE public.requisitions DROP COLUMN IF EXISTS montant_paye_cumule;")
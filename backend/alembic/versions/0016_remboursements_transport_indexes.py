@@ -0,0 +1,34 @@
+"""index remboursements_transport.requisition_id and participants_transport.remboursement_id
+
+Revision ID: 0016_remb_transport_indexes
+Revises: 0015_requisitions_paye_cumule
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0016_remb_transport_indexes"
+down_revision = "0015_requisitions_paye_cumule"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Filtre requisition_id de la liste et jointure LATERAL des participants
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_remboursements_transport_requisition_id "
+        "ON public.remboursements_transport(requisition_id);"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_participants_transport_remboursement_id "
+        "ON public.participants_transport(remboursement_id);"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_participants_transport_remboursement_id;")
+    op.execute("DROP INDEX IF EXISTS ix_remboursements_transport_requisition_id;")
@@ -0,0 +1,46 @@
+"""import_files: compressed, content-addressed storage of imported files
+
+Revision ID: 0017_import_files
+Revises: 0016_remb_transport_indexes
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0017_import_files"
+down_revision = "0016_remb_transport_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+CREATE TABLE IF NOT EXISTS public.import_files (
+  content_hash varchar(64) PRIMARY KEY,
+  format varchar(10) NOT NULL,
+  size_bytes bigint NOT NULL,
+  row_count integer NOT NULL DEFAULT 0,
+  data bytea NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT now()
+);
+"""
+    )
+    # Contenu déjà compressé par l'application : pas de recompression TOAST
+    op.execute("ALTER TABLE public.import_files ALTER COLUMN data SET STORAGE EXTERNAL;")
+    op.execute(
+        "ALTER TABLE public.imports_history ADD COLUMN IF NOT EXISTS file_hash varchar(64) "
+        "REFERENCES public.import_files(content_hash);"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_imports_history_file_hash ON public.imports_history(file_hash);")
+    # file_data reste lisible pour les imports existants ; les nouveaux imports ne l'alimentent plus
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_imports_history_file_hash;")
+    op.execute("ALTER TABLE public.imports_history DROP COLUMN IF EXISTS file_hash;")
+    op.execute("DROP TABLE IF EXISTS public.import_files;")
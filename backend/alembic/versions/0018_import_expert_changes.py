@@ -0,0 +1,35 @@
+"""import_expert_changes: before-images of experts touched by an import (rollback)
+
+Revision ID: 0018_import_expert_changes
+Revises: 0017_import_files
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0018_import_expert_changes"
+down_revision = "0017_import_files"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+CREATE TABLE IF NOT EXISTS public.import_expert_changes (
+  import_id uuid NOT NULL REFERENCES public.imports_history(id) ON DELETE CASCADE,
+  expert_id uuid NOT NULL,
+  action varchar(10) NOT NULL,
+  before jsonb,
+  PRIMARY KEY (import_id, expert_id)
+);
+"""
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS public.import_expert_changes;")
@@ -0,0 +1,25 @@
+"""import_expert_changes.after: state of each expert right after the import (rollback check)
+
+Revision ID: 0019_import_expert_after
+Revises: 0018_import_expert_changes
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0019_import_expert_after"
+down_revision = "0018_import_expert_changes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE public.import_expert_changes ADD COLUMN IF NOT EXISTS after jsonb;")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE public.import_expert_changes DROP COLUMN IF EXISTS after;")
@@ -0,0 +1,27 @@
+"""report_jobs.expires_at: set when the job finishes, empty while pending or running
+
+Revision ID: 0020_report_jobs_expiry
+Revises: 0019_import_expert_after
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0020_report_jobs_expiry"
+down_revision = "0019_import_expert_after"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE public.report_jobs ALTER COLUMN expires_at DROP NOT NULL;")
+    op.execute("UPDATE public.report_jobs SET expires_at = NULL WHERE status IN ('pending','running');")
+
+
+def downgrade() -> None:
+    op.execute("UPDATE public.report_jobs SET expires_at = now() + interval '1 hour' WHERE expires_at IS NULL;")
+    op.execute("ALTER TABLE public.report_jobs ALTER COLUMN expires_at SET NOT NULL;")
@@ -3,8 +3,9 @@ from __future__ import annotations
 import uuid
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -14,6 +15,7 @@ from app.db.session import get_db
 from app.models.print_settings import PrintSettings
 from app.models.requisition_approver import RequisitionApprover
 from app.models.rubrique import Rubrique
+from app.models.rubrique_budget import RubriqueBudget
 from app.models.user import User
 from app.models.user_menu_permission import UserMenuPermission
 from app.models.user_role import UserRole
@@ -27,6 +29,9 @@ from app.schemas.admin import (
     RequisitionApproverOut,
     RequisitionApproverUpdateRequest,
     ResetPasswordRequest,
+    RubriqueBudgetOut,
+    RubriqueBudgetReconcileResponse,
+    RubriqueBudgetUpsertRequest,
     RubriqueCreateRequest,
     RubriqueOut,
     RubriqueUpdateRequest,
@@ -40,6 +45,8 @@ from app.schemas.admin import (
     UserRoleAssignmentOut,
     UserUpdateRequest,
 )
+from app.services.budgets import disponible, reconcile_rubrique_budgets
+from app.services.pdf import invalidate_print_template
 
 router = APIRouter()
 
@@ -284,6 +291,83 @@ async def update_rubrique(rubrique_id: str, payload: RubriqueUpdateRequest, db:
     return _rubrique_out(r)
 
 
+@router.put(
+    "/rubriques/{rubrique_id}/budget",
+    response_model=RubriqueBudgetOut,
+    dependencies=[Depends(require_roles(["admin"]))],
+)
+async def set_rubrique_budget(
+    rubrique_id: str, payload: RubriqueBudgetUpsertRequest, db: AsyncSession = Depends(get_db)
+) -> RubriqueBudgetOut:
+    """Fixe le budget annuel d'une rubrique ; les compteurs engagé/payé ne sont pas touchés."""
+    try:
+        rid = uuid.UUID(rubrique_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid rubrique_id")
+    res = await db.execute(select(Rubrique).where(Rubrique.id == rid))
+    r = res.scalar_one_or_none()
+    if not r:
+        raise HTTPException(status_code=404, detail="Rubrique not found")
+
+    result = await db.execute(
+        pg_insert(RubriqueBudget)
+        .values(
+            rubrique_code=r.code,
+            annee=payload.annee,
+            budget=payload.budget,
+            montant_engage=0,
+            montant_paye=0,
+            updated_at=_utcnow(),
+        )
+        .on_conflict_do_update(
+            index_elements=[RubriqueBudget.rubrique_code, RubriqueBudget.annee],
+            set_={"budget": payload.budget, "updated_at": _utcnow()},
+        )
+        .returning(RubriqueBudget)
+    )
+    b = result.scalar_one()
+    await db.commit()
+    return RubriqueBudgetOut(
+        rubrique_code=r.code,
+        libelle=r.libelle,
+        annee=b.annee,
+        budget=b.budget,
+        montant_engage=b.montant_engage,
+        montant_paye=b.montant_paye,
+        disponible=disponible(b.budget, b.montant_engage, b.montant_paye),
+    )
+
+
+@router.post(
+    "/rubriques/budgets/reconcile",
+    response_model=RubriqueBudgetReconcileResponse,
+    dependencies=[Depends(require_roles(["admin"]))],
+)
+async def reconcile_budgets(
+    annee: int | None = Query(default=None),
+    fix: bool = Query(default=False, description="Corriger les compteurs en écart"),
+    db: AsyncSession = Depends(get_db),
+) -> RubriqueBudgetReconcileResponse:
+    """Recalcule la consommation des rubriques et signale (ou corrige) les écarts des compteurs."""
+    drifts = await reconcile_rubrique_budgets(db, annee=annee, fix=fix)
+    if fix:
+        await db.commit()
+    return RubriqueBudgetReconcileResponse(
+        annee=annee,
+        fixed=fix,
+        drifts=[
+            {
+                "rubrique_code": d["rubrique_code"],
+                "annee": d["annee"],
+                "montant_engage": d["engage"],
+                "montant_engage_attendu": d["engage_attendu"],
+                "montant_paye": d["paye"],
+                "montant_paye_attendu": d["paye_attendu"],
+            }
+            for d in drifts
+        ],
+    )
+
 # ----------------------
 # Print settings
 # ----------------------
@@ -323,6 +407,7 @@ async def upsert_print_settings(payload: PrintSettingsUpdateRequest, db: AsyncSe
 
     ps.updated_at = _utcnow()
     await db.commit()
+    invalidate_print_template()
     return {"ok": True}
 
 
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_user, require_roles
+from app.db.session import get_db
+from app.models.user import User
+from app.schemas.cotisation import (
+    CotisationGenerateRequest,
+    CotisationGenerateResponse,
+    CotisationRebuildResponse,
+    CotisationStatutOut,
+)
+from app.services.cotisations import generate_cotisations_annuelles, rebuild_cotisations_statut
+
+router = APIRouter()
+logger = logging.getLogger("onec_cpk_api.cotisations")
+
+# Expression SQL du statut, réutilisée pour le filtre afin qu'il soit évalué côté base
+_STATUT_SQL = """
+CASE
+    WHEN COALESCE(cs.montant_facture, 0) = 0 THEN 'non_facture'
+    WHEN COALESCE(cs.montant_paye, 0) = 0 THEN 'impaye'
+    WHEN cs.montant_paye < cs.montant_facture THEN 'partiel'
+    ELSE 'solde'
+END
+"""
+
+STATUTS_COTISATION = {"non_facture", "impaye", "partiel", "solde"}
+
+
+@router.get("", response_model=list[CotisationStatutOut])
+async def list_cotisations(
+    annee: int | None = Query(default=None, description="Exercice (défaut: année en cours)"),
+    statut: str | None = Query(
+        default=None,
+        description="non_facture, impaye, partiel, solde ; plusieurs valeurs séparées par des virgules",
+    ),
+    type_ec: str | None = Query(default=None),
+    active: bool | None = Query(default=True),
+    limit: int = Query(default=100, ge=1, le=5000),
+    offset: int = Query(default=0, ge=0),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> list[CotisationStatutOut]:
+    """
+    Situation des cotisations de tout le tableau pour un exercice.
+
+    Lit la table maintenue cotisations_statut (clé expert/année) : « qui n'a pas payé cette
+    année ? » devient statut=non_facture,impaye sans parcourir les encaissements.
+    """
+    exercice = annee or datetime.now(timezone.utc).year
+    statuts = [s.strip() for s in (statut or "").split(",") if s.strip()]
+    if any(s not in STATUTS_COTISATION for s in statuts):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="statut invalide")
+
+    conditions = ["TRUE"]
+    params: dict[str, object] = {"annee": exercice, "limit": limit, "offset": offset}
+    if statuts:
+        conditions.append(f"({_STATUT_SQL}) = ANY(:statuts)")
+        params["statuts"] = statuts
+    if type_ec:
+        conditions.append("ec.type_ec = :type_ec")
+        params["type_ec"] = type_ec
+    if active is not None:
+        conditions.append("ec.active = :active")
+        params["active"] = active
+
+    result = await db.execute(
+        text(
+            f"""
+            SELECT ec.id, ec.numero_ordre, ec.nom_denomination, ec.type_ec,
+                   COALESCE(cs.montant_facture, 0) AS montant_facture,
+                   COALESCE(cs.montant_paye, 0) AS montant_paye,
+                   cs.dernier_paiement,
+                   {_STATUT_SQL} AS statut
+            FROM public.experts_comptables ec
+            LEFT JOIN public.cotisations_statut cs
+              ON cs.expert_comptable_id = ec.id AND cs.annee = :annee
+            WHERE {" AND ".join(conditions)}
+            ORDER BY ec.numero_ordre
+            LIMIT :limit OFFSET :offset
+            """
+        ),
+        params,
+    )
+
+    return [
+        CotisationStatutOut(
+            expert_comptable_id=str(row.id),
+            numero_ordre=row.numero_ordre,
+            nom_denomination=row.nom_denomination,
+            type_ec=row.type_ec,
+            annee=exercice,
+            montant_facture=row.montant_facture,
+            montant_paye=row.montant_paye,
+            restant=max(Decimal(row.montant_facture) - Decimal(row.montant_paye), Decimal("0")),
+            dernier_paiement=row.dernier_paiement,
+            statut=row.statut,
+        )
+        for row in result
+    ]
+
+
+@router.post("/rebuild", response_model=CotisationRebuildResponse)
+async def rebuild_cotisations(
+    user: User = Depends(require_roles(["admin"])),
+    db: AsyncSession = Depends(get_db),
+) -> CotisationRebuildResponse:
+    """Reconstruit cotisations_statut depuis l'historique (reprise après correction manuelle)."""
+    rows = await rebuild_cotisations_statut(db)
+    await db.commit()
+    logger.info("cotisations_statut rebuilt rows=%s by=%s", rows, user.id)
+    return CotisationRebuildResponse(rows=rows)
+
+
+@router.post("/generate", response_model=CotisationGenerateResponse)
+async def generate_cotisations(
+    payload: CotisationGenerateRequest,
+    user: User = Depends(require_roles(["admin"])),
+    db: AsyncSession = Depends(get_db),
+) -> CotisationGenerateResponse:
+    """
+    Génère les encaissements non_paye de cotisation annuelle pour tous les experts actifs.
+
+    Les experts déjà facturés pour l'exercice sont ignorés (opération rejouable) ;
+    dry_run=true renvoie l'aperçu (effectifs, montant, plage de reçus) sans rien écrire.
+    """
+    now = datetime.now(timezone.utc)
+    date_encaissement = payload.date_encaissement or (
+        now if now.year == payload.annee else datetime(payload.annee, 1, 1, tzinfo=timezone.utc)
+    )
+    if date_encaissement.tzinfo is None:
+        date_encaissement = date_encaissement.replace(tzinfo=timezone.utc)
+    if date_encaissement.year != payload.annee:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_encaissement doit appartenir à l'exercice",
+        )
+
+    summary = await generate_cotisations_annuelles(
+        db,
+        annee=payload.annee,
+        montant_ec=payload.montant_ec,
+        montant_sec=payload.montant_sec,
+        date_encaissement=date_encaissement,
+        created_by=user.id,
+        dry_run=payload.dry_run,
+    )
+    if payload.dry_run:
+        await db.rollback()
+    else:
+        await db.commit()
+    logger.info(
+        "cotisations generate annee=%s dry_run=%s ec=%s sec=%s total=%s",
+        payload.annee,
+        payload.dry_run,
+        summary.count_ec,
+        summary.count_sec,
+        summary.montant_total,
+    )
+
+    return CotisationGenerateResponse(
+        dry_run=payload.dry_run,
+        annee=payload.annee,
+        count=summary.count_ec + summary.count_sec,
+        count_ec=summary.count_ec,
+        count_sec=summary.count_sec,
+        montant_total=summary.montant_total,
+        premier_numero=summary.premier_numero,
+        dernier_numero=summary.dernier_numero,
+    )
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
+from datetime import datetime, timezone
+
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import select
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
 from app.db.session import get_db
 from app.models.rubrique import Rubrique
 from app.models.user import User
-from app.schemas.admin import RubriqueOut
+from app.schemas.admin import RubriqueBudgetOut, RubriqueOut
+from app.services.budgets import disponible
 
 router = APIRouter()
 
@@ -54,6 +57,42 @@ async def list_rubriques(
     res = await db.execute(stmt)
     return [_rubrique_out(r) for r in res.scalars().all()]
 
+@router.get("/rubriques/budgets", response_model=list[RubriqueBudgetOut])
+async def list_rubrique_budgets(
+    annee: int | None = Query(default=None, description="Exercice (défaut: année en cours)"),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> list[RubriqueBudgetOut]:
+    """Budget, engagé, payé et disponible par rubrique, lus depuis les compteurs de rubrique_budgets."""
+    exercice = annee or datetime.now(timezone.utc).year
+    res = await db.execute(
+        text(
+            """
+            SELECT r.code, r.libelle,
+                   COALESCE(b.budget, 0) AS budget,
+                   COALESCE(b.montant_engage, 0) AS montant_engage,
+                   COALESCE(b.montant_paye, 0) AS montant_paye
+            FROM public.rubriques r
+            LEFT JOIN public.rubrique_budgets b ON b.rubrique_code = r.code AND b.annee = :annee
+            WHERE r.active OR b.rubrique_code IS NOT NULL
+            ORDER BY r.libelle
+            """
+        ),
+        {"annee": exercice},
+    )
+    return [
+        RubriqueBudgetOut(
+            rubrique_code=row.code,
+            libelle=row.libelle,
+            annee=exercice,
+            budget=row.budget,
+            montant_engage=row.montant_engage,
+            montant_paye=row.montant_paye,
+            disponible=disponible(row.budget, row.montant_engage, row.montant_paye),
+        )
+        for row in res
+    ]
+
 @router.get("/users")
 def list_users():
     return {"message": "Liste des utilisateurs"}
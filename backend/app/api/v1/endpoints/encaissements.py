@@ -6,7 +6,8 @@ from decimal import Decimal
 from typing import Any
 
 import logging
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import func, or_, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -17,6 +18,16 @@ from app.models.encaissement import Encaissement
 from app.models.expert_comptable import ExpertComptable
 from app.models.user import User
 from app.schemas.payment import EncaissementCreate, EncaissementResponse
+from app.services.closed_months import ensure_months_open
+from app.services.cotisations import TYPES_COTISATION, apply_cotisation_deltas, lock_numeros_recu
+from app.services.exports import (
+    check_export_format,
+    export_filename,
+    export_response,
+    parse_export_date,
+    stream_rows,
+)
+from app.services.pdf import get_print_template, render_pdf, render_receipts
 
 router = APIRouter()
 logger = logging.getLogger("onec_cpk_api.encaissements")
@@ -32,6 +43,22 @@ TYPE_CLIENTS = {
 }
 STATUT_PAIEMENT = {"NON_PAYE", "PARTIEL", "COMPLET", "AVANCE"}
 MODE_PAIEMENT = {"cash", "mobile_money", "virement"}
+# Nombre maximal de reçus par PDF de lot
+PDF_BATCH_MAX = 2000
+EXPORT_HEADERS = (
+    "Numéro reçu",
+    "Date",
+    "Type client",
+    "N° ordre",
+    "Client",
+    "Type opération",
+    "Description",
+    "Montant total",
+    "Montant payé",
+    "Statut paiement",
+    "Mode paiement",
+    "Référence",
+)
 
 
 def _parse_datetime(value: str | None, end_of_day: bool = False) -> datetime | None:
@@ -119,11 +146,63 @@ def _parse_order(order: str | None):
     return col.desc() if direction.lower() == "desc" else col.asc()
 
 
+def _apply_list_filters(
+    query,
+    *,
+    start_dt: datetime | None,
+    end_excl_dt: datetime | None,
+    statut_paiement: str | None,
+    numero_recu: str | None,
+    client: str | None,
+    type_operation: str | None,
+    type_client: str | None,
+    mode_paiement: str | None,
+    expert_comptable_id: str | None,
+):
+    """Filtres communs à la liste et à l'export. `client` suppose la jointure sur ExpertComptable."""
+    if start_dt:
+        query = query.where(Encaissement.date_encaissement >= start_dt)
+    if end_excl_dt:
+        query = query.where(Encaissement.date_encaissement < end_excl_dt)
+
+    if statut_paiement:
+        statut_upper = statut_paiement.upper()
+        if statut_upper not in STATUT_PAIEMENT:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="statut_paiement invalide")
+        query = query.where(func.upper(Encaissement.statut_paiement) == statut_upper)
+    if numero_recu:
+        query = query.where(Encaissement.numero_recu.ilike(f"%{numero_recu}%"))
+    if type_operation:
+        query = query.where(Encaissement.type_operation == type_operation)
+    if type_client:
+        query = query.where(Encaissement.type_client == type_client)
+    if mode_paiement:
+        query = query.where(Encaissement.mode_paiement == mode_paiement)
+    if expert_comptable_id:
+        try:
+            exp_uid = uuid.UUID(expert_comptable_id)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid expert_comptable_id UUID")
+        query = query.where(Encaissement.expert_comptable_id == exp_uid)
+
+    if client:
+        query = query.where(
+            or_(
+                Encaissement.client_nom.ilike(f"%{client}%"),
+                ExpertComptable.nom_denomination.ilike(f"%{client}%"),
+                ExpertComptable.numero_ordre.ilike(f"%{client}%"),
+            )
+        )
+    return query
+
+
 @router.post("/generate-numero-recu")
 async def generate_numero_recu(
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> str:
+    # Même verrou que la génération des cotisations : pas de numéro pris dans un bloc en cours
+    await lock_numeros_recu(db)
     today = datetime.now(timezone.utc).date()
     prefix = f"REC-{today:%Y%m%d}-"
     result = await db.execute(
@@ -193,39 +272,18 @@ async def list_encaissements(
     else:
         query = select(Encaissement)
 
-    if start_dt:
-        query = query.where(Encaissement.date_encaissement >= start_dt)
-    if end_excl_dt:
-        query = query.where(Encaissement.date_encaissement < end_excl_dt)
-
-    if statut_paiement:
-        statut_upper = statut_paiement.upper()
-        if statut_upper not in STATUT_PAIEMENT:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="statut_paiement invalide")
-        query = query.where(func.upper(Encaissement.statut_paiement) == statut_upper)
-    if numero_recu:
-        query = query.where(Encaissement.numero_recu.ilike(f"%{numero_recu}%"))
-    if type_operation:
-        query = query.where(Encaissement.type_operation == type_operation)
-    if type_client:
-        query = query.where(Encaissement.type_client == type_client)
-    if mode_paiement:
-        query = query.where(Encaissement.mode_paiement == mode_paiement)
-    if expert_comptable_id:
-        try:
-            exp_uid = uuid.UUID(expert_comptable_id)
-        except ValueError:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid expert_comptable_id UUID")
-        query = query.where(Encaissement.expert_comptable_id == exp_uid)
-
-    if client:
-        query = query.where(
-            or_(
-                Encaissement.client_nom.ilike(f"%{client}%"),
-                ExpertComptable.nom_denomination.ilike(f"%{client}%"),
-                ExpertComptable.numero_ordre.ilike(f"%{client}%"),
-            )
-        )
+    query = _apply_list_filters(
+        query,
+        start_dt=start_dt,
+        end_excl_dt=end_excl_dt,
+        statut_paiement=statut_paiement,
+        numero_recu=numero_recu,
+        client=client,
+        type_operation=type_operation,
+        type_client=type_client,
+        mode_paiement=mode_paiement,
+        expert_comptable_id=expert_comptable_id,
+    )
 
     query = query.order_by(_parse_order(order)).offset(offset).limit(limit)
 
@@ -245,6 +303,77 @@ async def list_encaissements(
     return [_encaissement_to_response(enc) for enc in encaissements]
 
 
+@router.get("/export")
+async def export_encaissements(
+    format: str = Query(default="csv", description="csv ou xlsx"),
+    date_debut: str | None = Query(default=None),
+    date_fin: str | None = Query(default=None),
+    statut_paiement: str | None = Query(default=None),
+    numero_recu: str | None = Query(default=None),
+    client: str | None = Query(default=None),
+    type_operation: str | None = Query(default=None),
+    type_client: str | None = Query(default=None),
+    mode_paiement: str | None = Query(default=None),
+    expert_comptable_id: str | None = Query(default=None),
+    order: str | None = Query(default=None, description="Ex: date_encaissement.desc"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """
+    Export CSV/XLSX de tous les encaissements correspondant aux filtres de la liste, sans limite.
+
+    Les lignes sont lues par curseur serveur et écrites au fil de l'eau : la mémoire reste
+    constante quelle que soit la période.
+    """
+    fmt = check_export_format(format)
+    date_start = parse_export_date(date_debut, "date_debut")
+    date_end = parse_export_date(date_fin, "date_fin")
+    start_dt = _start_of_day(date_start)
+    end_excl_dt = _end_exclusive(date_end)
+
+    query = select(
+        Encaissement.numero_recu,
+        Encaissement.date_encaissement,
+        Encaissement.type_client,
+        ExpertComptable.numero_ordre,
+        func.coalesce(ExpertComptable.nom_denomination, Encaissement.client_nom),
+        Encaissement.type_operation,
+        Encaissement.description,
+        Encaissement.montant_total,
+        Encaissement.montant_paye,
+        Encaissement.statut_paiement,
+        Encaissement.mode_paiement,
+        Encaissement.reference,
+    ).outerjoin(ExpertComptable, Encaissement.expert_comptable_id == ExpertComptable.id)
+    query = _apply_list_filters(
+        query,
+        start_dt=start_dt,
+        end_excl_dt=end_excl_dt,
+        statut_paiement=statut_paiement,
+        numero_recu=numero_recu,
+        client=client,
+        type_operation=type_operation,
+        type_client=type_client,
+        mode_paiement=mode_paiement,
+        expert_comptable_id=expert_comptable_id,
+    ).order_by(_parse_order(order), Encaissement.id)
+
+    logger.info(
+        "encaissements export format=%s date_debut=%s date_fin=%s user=%s",
+        fmt,
+        date_start,
+        date_end,
+        user.id,
+    )
+    return export_response(
+        fmt=fmt,
+        filename=export_filename("encaissements", date_start, date_end),
+        headers=EXPORT_HEADERS,
+        rows=stream_rows(db.bind, query),
+        sheet_title="Encaissements",
+    )
+
+
 @router.post("", response_model=EncaissementResponse, status_code=status.HTTP_201_CREATED)
 async def create_encaissement(
     payload: EncaissementCreate,
@@ -312,7 +441,11 @@ async def create_encaissement(
     last_error: Exception | None = None
 
     for attempt in range(5):
+        if provided_recu:
+            await lock_numeros_recu(db)
         numero_recu = provided_recu or await generate_numero_recu(user=user, db=db)
+        # Après le verrou des numéros (même ordre que la génération des cotisations)
+        await ensure_months_open(db, [date_encaissement])
         encaissement = Encaissement(
             numero_recu=numero_recu,
             type_client=payload.type_client,
@@ -331,6 +464,9 @@ async def create_encaissement(
         )
         db.add(encaissement)
         try:
+            if expert_uid and payload.type_operation in TYPES_COTISATION:
+                await db.flush()
+                await apply_cotisation_deltas(db, [(encaissement.id, montant_total, montant_paye)])
             await db.commit()
             await db.refresh(encaissement)
             last_error = None
@@ -354,6 +490,48 @@ async def create_encaissement(
     return _encaissement_to_response(encaissement, expert)
 
 
+@router.get("/recus/pdf")
+async def get_receipts_pdf(
+    date_jour: str = Query(..., alias="date", description="Jour des reçus (YYYY-MM-DD)"),
+    duplicata: bool = Query(default=False),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """Tous les reçus d'une journée dans un seul PDF (une page par reçu), par ordre de numéro."""
+    day = _parse_date_value(date_jour)
+    if not day:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="date invalide (YYYY-MM-DD)")
+
+    result = await db.execute(
+        select(Encaissement, ExpertComptable)
+        .outerjoin(ExpertComptable, Encaissement.expert_comptable_id == ExpertComptable.id)
+        .where(
+            Encaissement.date_encaissement >= _start_of_day(day),
+            Encaissement.date_encaissement < _end_exclusive(day),
+        )
+        .order_by(Encaissement.numero_recu)
+        .limit(PDF_BATCH_MAX + 1)
+    )
+    rows = result.all()
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Aucun encaissement ce jour")
+    if len(rows) > PDF_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Trop de reçus pour un seul PDF (max {PDF_BATCH_MAX})",
+        )
+
+    template = await get_print_template(db)
+    receipts = [_encaissement_to_response(enc, expert) for enc, expert in rows]
+    pdf_bytes = await render_pdf(render_receipts, template, receipts, duplicata)
+    logger.info("encaissements receipts pdf day=%s count=%s bytes=%s", day, len(receipts), len(pdf_bytes))
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="recus_{day.isoformat()}.pdf"'},
+    )
+
+
 @router.get("/{encaissement_id}", response_model=EncaissementResponse)
 async def get_encaissement(
     encaissement_id: str,
@@ -386,3 +564,35 @@ async def get_encaissement(
     if not encaissement:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Encaissement non trouvé")
     return _encaissement_to_response(encaissement)
+
+
+@router.get("/{encaissement_id}/pdf")
+async def get_receipt_pdf(
+    encaissement_id: str,
+    duplicata: bool = Query(default=False),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """Reçu de paiement au format PDF, rendu côté serveur avec les paramètres d'impression."""
+    try:
+        uid = uuid.UUID(encaissement_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid UUID")
+
+    result = await db.execute(
+        select(Encaissement, ExpertComptable)
+        .outerjoin(ExpertComptable, Encaissement.expert_comptable_id == ExpertComptable.id)
+        .where(Encaissement.id == uid)
+    )
+    row = result.first()
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Encaissement non trouvé")
+    enc, expert = row
+
+    template = await get_print_template(db)
+    pdf_bytes = await render_pdf(render_receipts, template, [_encaissement_to_response(enc, expert)], duplicata)
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="{enc.numero_recu}.pdf"'},
+    )
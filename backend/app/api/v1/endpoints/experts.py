@@ -1,22 +1,32 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
 import logging
 import re
 import uuid
-from datetime import date, datetime
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
+from itertools import islice
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
-from sqlalchemy import func, or_, select, update
+from sqlalchemy import String, any_, func, insert, literal, or_, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.exc import DataError, IntegrityError, ProgrammingError
 from sqlalchemy.ext.asyncio import AsyncSession
 from io import BytesIO
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, require_roles
+from app.core.config import settings
 from app.db.session import get_db
 from app.models.expert_comptable import ExpertComptable
 from app.models.category_changes_history import CategoryChangesHistory
+from app.models.import_expert_change import ImportExpertChange
 from app.models.imports_history import ImportsHistory
 from app.models.user import User
 from app.schemas.expert import (
@@ -25,10 +35,22 @@ from app.schemas.expert import (
     ExpertComptableCreate,
     ExpertComptableResponse,
     ExpertComptableUpdate,
+    ExpertImportDiff,
+    ExpertImportDiffLine,
+    ExpertImportFieldChange,
     ExpertImportRow,
     ExpertImportRequest,
     ExpertImportResponse,
+    ExpertImportRollbackResponse,
+    ExpertImportSheet,
+    ExpertReleveLigne,
+    ExpertReleveResponse,
+    ExpertSuggestion,
 )
+from app.services.expert_index import expert_index
+from app.services.csv_import import iter_csv_rows
+from app.services.import_files import ImportFileWriter, rows_to_jsonl, store_import_file
+from app.services.workbook_import import read_workbook_sheets
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -159,6 +181,31 @@ def _row_to_import_row(category: str, row: dict) -> ExpertImportRow:
     )
 
 
+# En-têtes propres à chaque catégorie (voir _row_to_import_row)
+_CATEGORY_HEADERS: dict[str, tuple[str, ...]] = {
+    "sec": ("Dénomination", "Raison sociale", "Associé gérant"),
+    "en_cabinet": ("Cabinet d'attache",),
+    "independant": ("NIF",),
+    "salarie": ("Nom de l'employeur",),
+}
+
+
+def _detect_category(headers: list[str]) -> str | None:
+    """Catégorie d'une feuille d'après ses en-têtes ; None si absente ou ambiguë."""
+    present = set(headers)
+    if "N° d'ordre" not in present:
+        return None
+    scores = {
+        category: sum(header in present for header in markers)
+        for category, markers in _CATEGORY_HEADERS.items()
+    }
+    best = max(scores.values())
+    matches = [category for category, score in scores.items() if score == best]
+    if best == 0 or len(matches) > 1:
+        return None
+    return matches[0]
+
+
 def _get_category_from_expert(expert: ExpertComptable) -> str | None:
     """Détermine la catégorie à partir des champs de l'expert."""
     if expert.type_ec == "SEC":
@@ -226,6 +273,33 @@ async def list_experts(
     return [_expert_to_response(e) for e in experts]
 
 
+@router.get("/suggest", response_model=list[ExpertSuggestion])
+async def suggest_experts(
+    q: str = Query(min_length=1, max_length=100, description="Début d'un mot du numéro d'ordre, du nom ou de la raison sociale"),
+    type_ec: str | None = Query(default=None, description="Filtrer par type (EC ou SEC)"),
+    active: bool | None = Query(default=True, description="Filtrer par statut actif"),
+    limit: int = Query(default=10, ge=1, le=50),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> list[ExpertSuggestion]:
+    """
+    Autocomplétion des experts, servie par l'index de préfixes en mémoire (sans accents ni
+    casse). Les correspondances en début de champ passent avant celles en milieu de champ.
+    """
+    await expert_index.ensure(db)
+    return [
+        ExpertSuggestion(
+            id=str(e.id),
+            numero_ordre=e.numero_ordre,
+            nom_denomination=e.nom_denomination,
+            raison_sociale=e.raison_sociale,
+            type_ec=e.type_ec,
+            active=e.active,
+        )
+        for e in expert_index.search(q, limit=limit, active=active, type_ec=type_ec)
+    ]
+
+
 @router.post("", response_model=ExpertComptableResponse, status_code=status.HTTP_201_CREATED)
 async def create_expert(
     payload: ExpertComptableCreate,
@@ -266,6 +340,7 @@ async def create_expert(
         logger.exception("Create expert failed: numero_ordre already exists (%s)", numero_ordre)
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="numero_ordre déjà existant")
     await db.refresh(expert)
+    expert_index.upsert(expert)
 
     return _expert_to_response(expert)
 
@@ -291,6 +366,192 @@ async def get_expert(
     return _expert_to_response(expert)
 
 
+# Lignes du relevé: débit = montant facturé, crédit = paiement initial (saisi avec
+# l'encaissement) ou versement de payment_history. `ordre` départage les lignes d'une
+# même date pour un tri total stable (clé de pagination: date_operation, ordre, id).
+_RELEVE_LEDGER_SQL = """
+WITH ledger AS (
+    SELECT e.date_encaissement AS date_operation, 0 AS ordre, e.id AS id,
+           e.id AS encaissement_id, e.numero_recu, 'encaissement' AS type_ligne,
+           e.type_operation AS libelle, e.montant_total AS debit, 0::numeric AS credit,
+           e.mode_paiement, e.reference
+    FROM public.encaissements e
+    WHERE e.expert_comptable_id = :expert_id
+    UNION ALL
+    SELECT e.date_encaissement, 1, e.id,
+           e.id, e.numero_recu, 'paiement_initial',
+           e.type_operation, 0::numeric, e.montant_paye - COALESCE(ph.total, 0),
+           e.mode_paiement, e.reference
+    FROM public.encaissements e
+    LEFT JOIN LATERAL (
+        SELECT SUM(p.montant) AS total FROM public.payment_history p WHERE p.encaissement_id = e.id
+    ) ph ON true
+    WHERE e.expert_comptable_id = :expert_id
+      AND e.montant_paye - COALESCE(ph.total, 0) > 0
+    UNION ALL
+    SELECT p.created_at, 2, p.id,
+           e.id, e.numero_recu, 'paiement',
+           e.type_operation, 0::numeric, p.montant,
+           p.mode_paiement, p.reference
+    FROM public.payment_history p
+    JOIN public.encaissements e ON e.id = p.encaissement_id
+    WHERE e.expert_comptable_id = :expert_id
+)
+"""
+
+
+def _sign_releve_cursor(expert_id: uuid.UUID, key: list[Any]) -> str:
+    # Signature HMAC de (expert, clé, solde) : le solde reporté ne peut pas être modifié par le client
+    message = json.dumps([str(expert_id), *key]).encode()
+    return hmac.new(settings.jwt_secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _encode_releve_cursor(expert_id: uuid.UUID, ligne: ExpertReleveLigne, ordre: int) -> str:
+    key = [ligne.date_operation.isoformat(), ordre, ligne.id, str(ligne.solde)]
+    raw = json.dumps([*key, _sign_releve_cursor(expert_id, key)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_releve_cursor(expert_id: uuid.UUID, cursor: str) -> tuple[datetime, int, uuid.UUID, Decimal]:
+    try:
+        *key, signature = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        date_op, ordre, row_id, solde = key
+        valid = hmac.compare_digest(str(signature), _sign_releve_cursor(expert_id, key))
+    except Exception:
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="cursor invalide")
+    try:
+        return datetime.fromisoformat(date_op), int(ordre), uuid.UUID(row_id), Decimal(solde)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="cursor invalide")
+
+
+@router.get("/{expert_id}/releve", response_model=ExpertReleveResponse)
+async def get_expert_releve(
+    expert_id: str,
+    date_debut: str | None = Query(default=None),
+    date_fin: str | None = Query(default=None),
+    cursor: str | None = Query(default=None, description="Curseur renvoyé par la page précédente"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> ExpertReleveResponse:
+    """
+    Relevé de compte chronologique d'un expert (encaissements et versements) avec solde dû.
+
+    Pagination par clé (date_operation, ordre, id) : le curseur reporte le solde à sa clé,
+    signé par HMAC et vérifié à la lecture ; seul le solde d'ouverture de la première page est
+    agrégé. Le solde courant est calculé par fonction de fenêtre sur la seule page lue.
+    """
+    try:
+        uid = uuid.UUID(expert_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid UUID")
+
+    exists = await db.execute(select(ExpertComptable.id).where(ExpertComptable.id == uid))
+    if exists.scalar_one_or_none() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Expert non trouvé")
+
+    start_dt = None
+    end_excl_dt = None
+    if date_debut:
+        try:
+            start_dt = datetime.combine(date.fromisoformat(date_debut[:10]), datetime.min.time(), tzinfo=timezone.utc)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="date_debut invalide")
+    if date_fin:
+        try:
+            end_excl_dt = datetime.combine(
+                date.fromisoformat(date_fin[:10]) + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc
+            )
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="date_fin invalide")
+
+    params: dict[str, Any] = {"expert_id": uid, "limit": limit + 1}
+    conditions: list[str] = []
+    if start_dt:
+        conditions.append("date_operation >= :start_dt")
+        params["start_dt"] = start_dt
+    if end_excl_dt:
+        conditions.append("date_operation < :end_excl_dt")
+        params["end_excl_dt"] = end_excl_dt
+
+    if cursor:
+        # Solde reporté par le curseur (signé) : pas de nouvel agrégat de l'historique
+        c_date, c_ordre, c_id, solde_ouverture = _decode_releve_cursor(uid, cursor)
+        conditions.append(
+            "(date_operation, ordre, id) > "
+            "(CAST(:c_date AS timestamptz), CAST(:c_ordre AS integer), CAST(:c_id AS uuid))"
+        )
+        params.update({"c_date": c_date, "c_ordre": c_ordre, "c_id": c_id})
+    elif start_dt:
+        # Solde reporté: tout ce qui précède la période, agrégé sans matérialiser les lignes
+        opening = await db.execute(
+            text(
+                _RELEVE_LEDGER_SQL
+                + "SELECT COALESCE(SUM(debit - credit), 0) FROM ledger WHERE date_operation < :start_dt"
+            ),
+            {"expert_id": uid, "start_dt": start_dt},
+        )
+        solde_ouverture = Decimal(str(opening.scalar_one()))
+    else:
+        solde_ouverture = Decimal("0")
+    params["opening"] = solde_ouverture
+
+    where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    result = await db.execute(
+        text(
+            _RELEVE_LEDGER_SQL
+            + f"""
+            SELECT page.*,
+                   CAST(:opening AS numeric)
+                     + SUM(debit - credit) OVER (ORDER BY date_operation, ordre, id) AS solde
+            FROM (
+                SELECT * FROM ledger
+                {where_sql}
+                ORDER BY date_operation, ordre, id
+                LIMIT :limit
+            ) page
+            ORDER BY date_operation, ordre, id
+            """
+        ),
+        params,
+    )
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    lignes = [
+        ExpertReleveLigne(
+            id=str(row.id),
+            date_operation=row.date_operation,
+            type_ligne=row.type_ligne,
+            encaissement_id=str(row.encaissement_id),
+            numero_recu=row.numero_recu,
+            libelle=row.libelle,
+            debit=row.debit,
+            credit=row.credit,
+            solde=row.solde,
+            mode_paiement=row.mode_paiement,
+            reference=row.reference,
+        )
+        for row in rows
+    ]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = _encode_releve_cursor(uid, lignes[-1], rows[-1].ordre)
+
+    return ExpertReleveResponse(
+        expert_id=str(uid),
+        solde_ouverture=solde_ouverture,
+        solde_cloture=lignes[-1].solde if lignes else solde_ouverture,
+        lignes=lignes,
+        next_cursor=next_cursor,
+    )
+
+
 @router.patch("/{expert_id}", response_model=ExpertComptableResponse)
 async def update_expert(
     expert_id: str,
@@ -317,139 +578,358 @@ async def update_expert(
             setattr(expert, key, value)
         await db.commit()
         await db.refresh(expert)
+        expert_index.upsert(expert)
 
     return _expert_to_response(expert)
 
 
-async def _import_experts_payload(
-    payload: ExpertImportRequest,
-    user: User,
-    db: AsyncSession,
-) -> ExpertImportResponse:
-    if not payload.rows:
-        return ExpertImportResponse(
-            success=False,
-            imported=0,
-            message="Aucune ligne à importer"
-        )
+def _expert_values(expert: ExpertComptable) -> dict[str, str]:
+    return {field: _normalize_value(getattr(expert, field)) for field in ExpertImportRow.model_fields}
 
-    # Créer l'enregistrement d'import (optionnel si table absente ou colonne trop courte)
-    import_record: ImportsHistory | None = None
+
+# Champs qu'un import peut modifier, restaurés par l'annulation de l'import
+_ROLLBACK_FIELDS = tuple(f for f in ExpertImportRow.model_fields if f != "numero_ordre") + ("import_id",)
+
+
+# État des champs importés d'un expert `e`, relevé après l'import puis comparé à l'annulation
+_AFTER_IMAGE_SQL = "jsonb_build_object({})".format(
+    ", ".join(f"'{field}', e.{field}" for field in _ROLLBACK_FIELDS if field != "import_id")
+)
+
+_IMPORT_AFTER_SQL = text(
+    f"""
+    UPDATE import_expert_changes c
+    SET after = {_AFTER_IMAGE_SQL}
+    FROM experts_comptables e
+    WHERE c.import_id = :import_id
+      AND e.id = c.expert_id
+    """
+)
+
+
+def _before_image(expert: ExpertComptable) -> dict[str, Any]:
+    before = {field: getattr(expert, field) for field in _ROLLBACK_FIELDS}
+    before["import_id"] = str(expert.import_id) if expert.import_id else None
+    return before
+
+
+# Lignes traitées par lot : recherche des experts existants, comparaison puis écriture
+IMPORT_BATCH_SIZE = 1000
+
+# Ligne à importer avec sa provenance : (ligne, feuille ou None, numéro de ligne dans le fichier)
+SourcedRow = tuple[ExpertImportRow, str | None, int]
+
+
+def _in_batches(rows: Iterable[SourcedRow], size: int = IMPORT_BATCH_SIZE) -> Iterator[list[SourcedRow]]:
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+async def _batches(rows: Iterable[SourcedRow]) -> AsyncIterator[list[SourcedRow]]:
+    # Lignes déjà en mémoire (JSON, classeur) : découpage sans lecture bloquante
+    for batch in _in_batches(rows):
+        yield batch
+
+
+async def _batches_in_thread(rows: Iterator[SourcedRow]) -> AsyncIterator[list[SourcedRow]]:
+    # Lignes lues depuis un fichier (CSV) : lecture et analyse de chaque lot dans un thread
+    batches = _in_batches(rows)
+    while batch := await asyncio.to_thread(next, batches, None):
+        yield batch
+
+
+def _new_expert(values: dict[str, str], import_record: ImportsHistory | None) -> ExpertComptable:
+    return ExpertComptable(
+        id=uuid.uuid4(),
+        numero_ordre=values["numero_ordre"],
+        nom_denomination=values.get("nom_denomination", ""),
+        type_ec=values.get("type_ec", "EC") or "EC",
+        categorie_personne=values.get("categorie_personne") or None,
+        statut_professionnel=values.get("statut_professionnel") or None,
+        sexe=values.get("sexe") or None,
+        telephone=values.get("telephone") or None,
+        email=values.get("email") or None,
+        nif=values.get("nif") or None,
+        cabinet_attache=values.get("cabinet_attache") or None,
+        nom_employeur=values.get("nom_employeur") or None,
+        raison_sociale=values.get("raison_sociale") or None,
+        associe_gerant=values.get("associe_gerant") or None,
+        import_id=import_record.id if import_record else None,
+    )
+
+
+def _merge_field_changes(line: ExpertImportDiffLine, field_changes: list[ExpertImportFieldChange]) -> None:
+    """Expert déjà modifié plus haut dans le fichier : une ligne de diff, valeur d'origine et valeur finale."""
+    by_champ = {change.champ: change for change in line.changes}
+    for change in field_changes:
+        previous = by_champ.get(change.champ)
+        if previous is None:
+            line.changes.append(change)
+            by_champ[change.champ] = change
+        else:
+            previous.apres = change.apres
+    line.changes = [change for change in line.changes if (change.avant or "") != change.apres]
+
+
+async def _create_import_record(
+    db: AsyncSession, filename: str, category: str, user: User
+) -> ImportsHistory | None:
+    # Enregistrement d'import optionnel (table absente ou colonne trop courte) ; créé avant toute
+    # lecture d'expert, le rollback éventuel n'expire donc aucun objet chargé
     try:
-        safe_filename = (payload.filename or "").strip()[:300]
-        safe_file_data = (
-            _coerce_json_value(payload.file_data) if payload.file_data is not None else None
-        )
+        safe_filename = (filename or "").strip()[:300]
         import_record = ImportsHistory(
             filename=safe_filename or "import.xlsx",
-            category=str(payload.category)[:50],
+            category=category[:50],
             imported_by=user.id,
             rows_imported=0,
             status="success",
-            file_data=safe_file_data,
         )
         db.add(import_record)
         await db.flush()
+        return import_record
     except (ProgrammingError, DataError) as exc:
         await db.rollback()
         logger.warning(
             "Import history skipped (table missing or data too large): %s",
             exc,
         )
-        import_record = None
+        return None
+
 
-    imported_count = 0
-    created_count = 0
-    updated_count = 0
+async def _import_expert_rows(
+    batches: AsyncIterator[list[SourcedRow]],
+    *,
+    category: str,
+    filename: str,
+    user: User,
+    db: AsyncSession,
+    dry_run: bool = False,
+    store_file: Callable[[AsyncSession, int], Awaitable[str]] | None = None,
+) -> ExpertImportResponse:
+    """
+    Pipeline commun aux imports JSON, Excel et CSV, lot par lot : validation, experts existants
+    du lot en une requête, comparaison avec le registre (lignes inchangées ignorées) puis écriture
+    et flush. L'import reste une seule transaction, validée après le dernier lot.
+
+    `store_file(db, total_lignes)` conserve le fichier source et renvoie son empreinte ; appelé
+    après le dernier lot, le fichier ayant alors été entièrement lu.
+    Un même N° d'ordre présent dans deux feuilles est signalé et sa seconde occurrence ignorée.
+    """
     skipped_count = 0
+    unchanged_count = 0
+    total_rows = 0
     errors: list[dict] = []
     phone_warnings: list[str] = []
-    total_rows = len(payload.rows)
-    for idx, row in enumerate(payload.rows):
-        row_data = {k: _normalize_value(v) for k, v in row.model_dump().items()}
-        numero_ordre = row_data.get("numero_ordre", "").strip()
-        if not numero_ordre:
-            skipped_count += 1
-            errors.append({
-                "ligne": idx + 2,
-                "champ": "numero_ordre",
-                "message": "N° d'ordre manquant",
-            })
-            continue
-        normalized_phone = _normalize_phone(row_data.get("telephone", ""))
-        if row_data.get("telephone") and not normalized_phone:
-            phone_warnings.append(numero_ordre or row_data.get("nom_denomination", "inconnu"))
-            errors.append({
-                "ligne": idx + 2,
-                "champ": "telephone",
-                "message": "Téléphone invalide (ignoré)",
-            })
-            logger.warning("Import experts: invalid phone at line %s (numero_ordre=%s)", idx + 2, numero_ordre)
-        row_data["telephone"] = normalized_phone or ""
-        email_value = _normalize_email(row_data.get("email", "")) or ""
-        if email_value and not _is_valid_email(email_value):
-            errors.append({
-                "ligne": idx + 2,
-                "champ": "email",
-                "message": "Format e-mail invalide",
-            })
-            email_value = ""
-            logger.warning("Import experts: invalid email at line %s (numero_ordre=%s)", idx + 2, numero_ordre)
-        row_data["email"] = email_value
-        # Vérifier si l'expert existe déjà (upsert)
-        result = await db.execute(
-            select(ExpertComptable).where(ExpertComptable.numero_ordre == numero_ordre)
-        )
-        existing = result.scalar_one_or_none()
-
-        if existing:
-            # Update
-            for key, value in row_data.items():
-                if key == "numero_ordre":
+    first_sheet: dict[str, tuple[str, int]] = {}
+    diff = ExpertImportDiff()
+    # État courant par numéro d'ordre : registre, puis lignes déjà vues du fichier
+    current: dict[str, dict[str, str]] = {}
+    experts: dict[str, ExpertComptable] = {}
+    created: set[str] = set()
+    # Experts existants modifiés, comptés une fois quel que soit le nombre de lignes
+    updated: set[str] = set()
+    modified: dict[str, ExpertImportDiffLine] = {}
+    import_record: ImportsHistory | None = None
+    record_created = False
+
+    async for batch in batches:
+        total_rows += len(batch)
+        valid_rows: list[tuple[int, str | None, str, dict[str, str]]] = []
+        for row, feuille, ligne in batch:
+            where: dict[str, Any] = {"feuille": feuille, "ligne": ligne} if feuille else {"ligne": ligne}
+            row_data = {k: _normalize_value(v) for k, v in row.model_dump().items()}
+            numero_ordre = row_data.get("numero_ordre", "").strip()
+            if not numero_ordre:
+                skipped_count += 1
+                errors.append({
+                    **where,
+                    "champ": "numero_ordre",
+                    "message": "N° d'ordre manquant",
+                })
+                continue
+            if feuille is not None:
+                first = first_sheet.setdefault(numero_ordre, (feuille, ligne))
+                if first[0] != feuille:
+                    skipped_count += 1
+                    errors.append({
+                        **where,
+                        "champ": "numero_ordre",
+                        "message": f"Doublon : N° d'ordre déjà présent dans la feuille « {first[0]} » (ligne {first[1]})",
+                    })
                     continue
-                if value != "":
-                    setattr(existing, key, value)
-            if import_record:
-                existing.import_id = import_record.id
-            updated_count += 1
-        else:
-            # Insert
-            new_expert = ExpertComptable(
-                numero_ordre=row_data.get("numero_ordre", ""),
-                nom_denomination=row_data.get("nom_denomination", ""),
-                type_ec=row_data.get("type_ec", "EC") or "EC",
-                categorie_personne=row_data.get("categorie_personne") or None,
-                statut_professionnel=row_data.get("statut_professionnel") or None,
-                sexe=row_data.get("sexe") or None,
-                telephone=row_data.get("telephone") or None,
-                email=row_data.get("email") or None,
-                nif=row_data.get("nif") or None,
-                cabinet_attache=row_data.get("cabinet_attache") or None,
-                nom_employeur=row_data.get("nom_employeur") or None,
-                raison_sociale=row_data.get("raison_sociale") or None,
-                associe_gerant=row_data.get("associe_gerant") or None,
-                import_id=import_record.id if import_record else None,
+            normalized_phone = _normalize_phone(row_data.get("telephone", ""))
+            if row_data.get("telephone") and not normalized_phone:
+                phone_warnings.append(numero_ordre or row_data.get("nom_denomination", "inconnu"))
+                errors.append({
+                    **where,
+                    "champ": "telephone",
+                    "message": "Téléphone invalide (ignoré)",
+                })
+                logger.warning("Import experts: invalid phone at line %s (numero_ordre=%s)", ligne, numero_ordre)
+            row_data["telephone"] = normalized_phone or ""
+            email_value = _normalize_email(row_data.get("email", "")) or ""
+            if email_value and not _is_valid_email(email_value):
+                errors.append({
+                    **where,
+                    "champ": "email",
+                    "message": "Format e-mail invalide",
+                })
+                email_value = ""
+                logger.warning("Import experts: invalid email at line %s (numero_ordre=%s)", ligne, numero_ordre)
+            row_data["email"] = email_value
+            row_data["numero_ordre"] = numero_ordre
+            valid_rows.append((ligne, feuille, numero_ordre, row_data))
+
+        if not dry_run and not record_created:
+            import_record = await _create_import_record(db, filename, category, user)
+            record_created = True
+
+        # Experts existants du lot non encore vus, en une requête (ANY : un seul paramètre)
+        numeros = list({numero for _, _, numero, _ in valid_rows if numero not in current})
+        if numeros:
+            result = await db.execute(
+                select(ExpertComptable).where(
+                    ExpertComptable.numero_ordre == any_(literal(numeros, ARRAY(String)))
+                )
             )
-            db.add(new_expert)
-            created_count += 1
+            for expert in result.scalars():
+                experts[expert.numero_ordre] = expert
+                current[expert.numero_ordre] = _expert_values(expert)
+
+        # Nouveaux, modifiés (champ par champ) et inchangés ; seuls les deux premiers sont écrits
+        changes: list[dict[str, Any]] = []
+        for ligne, feuille, numero_ordre, row_data in valid_rows:
+            before = current.get(numero_ordre)
+            if before is None:
+                current[numero_ordre] = dict(row_data)
+                created.add(numero_ordre)
+                if dry_run:
+                    diff.nouveaux.append(
+                        ExpertImportDiffLine(
+                            ligne=ligne,
+                            feuille=feuille,
+                            numero_ordre=numero_ordre,
+                            nom_denomination=row_data.get("nom_denomination"),
+                        )
+                    )
+                    continue
+                expert = _new_expert(row_data, import_record)
+                experts[numero_ordre] = expert
+                db.add(expert)
+                if import_record:
+                    changes.append({"import_id": import_record.id, "expert_id": expert.id, "action": "created", "before": None})
+                continue
+            # Mise à jour : seules les valeurs renseignées remplacent celles du registre
+            incoming = {k: v for k, v in row_data.items() if k != "numero_ordre" and v != ""}
+            if all(before[k] == v for k, v in incoming.items()):
+                unchanged_count += 1
+                continue
+            field_changes = [
+                ExpertImportFieldChange(champ=k, avant=before[k] or None, apres=v)
+                for k, v in incoming.items()
+                if before[k] != v
+            ]
+            before.update(incoming)
+            # Doublon d'une ligne nouvelle du même fichier : fusionné dans la création
+            first_update = numero_ordre not in created and numero_ordre not in updated
+            if numero_ordre not in created:
+                updated.add(numero_ordre)
+                if dry_run:
+                    line = modified.get(numero_ordre)
+                    if line is None:
+                        modified[numero_ordre] = ExpertImportDiffLine(
+                            ligne=ligne,
+                            feuille=feuille,
+                            numero_ordre=numero_ordre,
+                            nom_denomination=before.get("nom_denomination"),
+                            changes=field_changes,
+                        )
+                        diff.modifies.append(modified[numero_ordre])
+                    else:
+                        _merge_field_changes(line, field_changes)
+                        line.nom_denomination = before.get("nom_denomination")
+                    continue
+            if dry_run:
+                continue
+            expert = experts[numero_ordre]
+            if import_record and first_update:
+                # État antérieur relevé avant la première modification de l'expert
+                changes.append({
+                    "import_id": import_record.id,
+                    "expert_id": expert.id,
+                    "action": "updated",
+                    "before": _before_image(expert),
+                })
+            for key, value in incoming.items():
+                if value != _normalize_value(getattr(expert, key)):
+                    setattr(expert, key, value)
+            if import_record:
+                expert.import_id = import_record.id
+
+        if not dry_run:
+            if changes:
+                await db.execute(insert(ImportExpertChange), changes)
+            await db.flush()
+
+    if total_rows == 0:
+        return ExpertImportResponse(
+            success=False,
+            imported=0,
+            dry_run=dry_run,
+            message="Aucune ligne à importer"
+        )
 
-        imported_count += 1
+    created_count = len(created)
+    updated_count = len(updated)
+
+    if dry_run:
+        return ExpertImportResponse(
+            success=True,
+            imported=created_count,
+            updated=updated_count,
+            unchanged=unchanged_count,
+            skipped=skipped_count,
+            total_lignes=total_rows,
+            errors=errors,
+            dry_run=True,
+            diff=diff,
+            message=(
+                f"Simulation : {created_count} nouveau(x), {updated_count} modifié(s), "
+                f"{unchanged_count} inchangé(s), {skipped_count} invalide(s)"
+            ),
+        )
 
-    # Mettre à jour le nombre importé
     if import_record:
-        import_record.rows_imported = imported_count
+        # État postérieur des experts touchés, une fois tous les lots écrits
+        await db.execute(_IMPORT_AFTER_SQL, {"import_id": import_record.id})
+        if store_file is not None:
+            # Point de sauvegarde : un échec du stockage n'annule pas l'import
+            try:
+                async with db.begin_nested():
+                    import_record.file_hash = await store_file(db, total_rows)
+            except (ProgrammingError, DataError) as exc:
+                logger.warning("Import file not stored: %s", exc)
+        # Mettre à jour le nombre importé
+        import_record.rows_imported = created_count + updated_count
     await db.commit()
+    if created_count or updated_count:
+        await expert_index.rebuild(db)
 
     logger.info(
-        "Import experts: total=%s created=%s updated=%s skipped=%s errors=%s",
+        "Import experts: total=%s created=%s updated=%s unchanged=%s skipped=%s errors=%s",
         total_rows,
         created_count,
         updated_count,
+        unchanged_count,
         skipped_count,
         len(errors),
     )
 
     message = f"{created_count} expert(s)-comptable(s) importé(s) avec succès"
+    if unchanged_count:
+        message += f" | {unchanged_count} inchangé(s)"
     if phone_warnings:
         sample = ", ".join(phone_warnings[:5])
         suffix = f" | Téléphones invalides ignorés: {len(phone_warnings)}"
@@ -461,6 +941,7 @@ async def _import_experts_payload(
         success=True,
         imported=created_count,
         updated=updated_count,
+        unchanged=unchanged_count,
         skipped=skipped_count,
         total_lignes=total_rows,
         errors=errors,
@@ -469,13 +950,169 @@ async def _import_experts_payload(
     )
 
 
+async def _import_experts_payload(
+    payload: ExpertImportRequest,
+    user: User,
+    db: AsyncSession,
+    dry_run: bool = False,
+    raw_file: bytes | None = None,
+    raw_format: str = "xlsx",
+    raw_row_count: int | None = None,
+    sources: list[tuple[str, int]] | None = None,
+) -> ExpertImportResponse:
+    """
+    `raw_file` : fichier envoyé en multipart, conservé tel quel (compressé) dans import_files ;
+    à défaut, les lignes `payload.file_data` y sont conservées au format JSON Lines.
+    `sources` : (feuille, ligne) de chaque ligne pour un classeur multi-feuilles.
+    """
+    stored: tuple[bytes, str, int | None] | None = None
+    if raw_file is not None:
+        stored = (raw_file, raw_format, raw_row_count)
+    elif payload.file_data is not None:
+        stored = (rows_to_jsonl(_coerce_json_value(payload.file_data)), "jsonl", len(payload.file_data))
+
+    async def store_file(session: AsyncSession, total_rows: int) -> str:
+        content, fmt, row_count = stored
+        return await store_import_file(
+            session, content, fmt=fmt, row_count=row_count if row_count is not None else total_rows
+        )
+
+    rows = (
+        (row, *(sources[idx] if sources else (None, idx + 2)))
+        for idx, row in enumerate(payload.rows)
+    )
+    return await _import_expert_rows(
+        _batches(rows),
+        category=str(payload.category),
+        filename=payload.filename,
+        user=user,
+        db=db,
+        dry_run=dry_run,
+        store_file=store_file if stored is not None else None,
+    )
+
+
+async def _import_workbook(
+    file_bytes: bytes,
+    filename: str,
+    user: User,
+    db: AsyncSession,
+    dry_run: bool = False,
+) -> ExpertImportResponse:
+    """
+    Classeur multi-feuilles : les feuilles sont lues en parallèle (pool de processus), chacune
+    est rattachée à une catégorie d'après ses en-têtes, puis toutes les lignes sont importées
+    ensemble.
+    """
+    sheets = await read_workbook_sheets(file_bytes)
+    rows: list[ExpertImportRow] = []
+    sources: list[tuple[str, int]] = []
+    feuilles: list[ExpertImportSheet] = []
+    for name, headers, data_rows in sheets:
+        category = _detect_category(headers)
+        feuilles.append(ExpertImportSheet(nom=name, category=category, lignes=len(data_rows)))
+        if category is None:
+            continue
+        for offset, row in enumerate(data_rows):
+            rows.append(_row_to_import_row(category, row))
+            sources.append((name, offset + 2))
+
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Aucune feuille reconnue : en-têtes « N° d'ordre » et colonnes propres à une catégorie attendus",
+        )
+    ignored = [f.nom for f in feuilles if f.category is None]
+    if ignored:
+        logger.warning("Import experts: sheets ignored (unknown headers): %s", ", ".join(ignored))
+
+    payload = ExpertImportRequest(category="multi", filename=filename, rows=rows)
+    response = await _import_experts_payload(
+        payload,
+        user,
+        db,
+        dry_run=dry_run,
+        raw_file=file_bytes,
+        raw_format="xlsx_multi",
+        raw_row_count=sum(f.lignes for f in feuilles),
+        sources=sources,
+    )
+    response.feuilles = feuilles
+    return response
+
+
+# Extensions et types MIME traités par le chemin CSV (lecture au fil de l'eau)
+_CSV_EXTENSIONS = (".csv", ".tsv")
+_CSV_CONTENT_TYPES = ("text/csv", "text/tab-separated-values", "application/csv")
+
+
+def _is_csv_upload(upload: Any, filename: str) -> bool:
+    if filename.lower().endswith(_CSV_EXTENSIONS):
+        return True
+    content_type = (getattr(upload, "content_type", None) or "").split(";")[0].strip().lower()
+    return content_type in _CSV_CONTENT_TYPES
+
+
+async def _import_csv(
+    upload: Any,
+    category: str | None,
+    filename: str,
+    user: User,
+    db: AsyncSession,
+    dry_run: bool = False,
+) -> ExpertImportResponse:
+    """
+    Fichier CSV/TSV (UTF-8 ou Latin-1, séparateur « ; », « , » ou tabulation) lu au fil de
+    l'eau et importé par lots : ni le fichier ni ses lignes ne sont chargés en entier, et leur
+    lecture se fait dans un thread, hors de la boucle d'événements. Sans catégorie (ou
+    category=auto), elle est déduite des en-têtes comme pour un classeur.
+    """
+    writer = None if dry_run else ImportFileWriter()
+    headers, rows = await asyncio.to_thread(
+        iter_csv_rows, upload.file, filename=filename, sink=writer.write if writer else None
+    )
+    if category in (None, "", "auto"):
+        category = _detect_category(headers)
+        if category is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Catégorie non reconnue : en-têtes « N° d'ordre » et colonnes propres à une catégorie attendus",
+            )
+    elif category not in _CATEGORY_HEADERS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Catégorie inconnue : {category}")
+
+    async def store_file(session: AsyncSession, total_rows: int) -> str:
+        return await writer.store(session, fmt="csv", row_count=total_rows)
+
+    sourced = ((_row_to_import_row(category, row), None, ligne) for ligne, row in rows)
+    return await _import_expert_rows(
+        _batches_in_thread(sourced),
+        category=category,
+        filename=filename,
+        user=user,
+        db=db,
+        dry_run=dry_run,
+        store_file=store_file if writer else None,
+    )
+
+
 @router.post("/import", response_model=ExpertImportResponse)
 async def import_experts(
     request: Request,
+    dry_run: bool = Query(default=False, description="Calculer l'écart avec le registre sans rien écrire"),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> ExpertImportResponse:
-    """Import batch d'experts comptables depuis Excel (JSON ou multipart)."""
+    """
+    Import batch d'experts comptables depuis Excel (JSON ou multipart) ou CSV/TSV (multipart).
+
+    En multipart sans `category` (ou category=auto), toutes les feuilles du classeur sont
+    importées, chacune dans la catégorie reconnue d'après ses en-têtes ; pour un CSV, la
+    catégorie est déduite de ses en-têtes.
+
+    Les lignes identiques au registre ne sont pas réécrites. Avec dry_run=true, renvoie
+    l'écart (nouveaux, modifiés champ par champ, inchangés, invalides) sans rien écrire.
+    """
     content_type = (request.headers.get("content-type") or "").lower()
     try:
         if "multipart/form-data" in content_type:
@@ -483,22 +1120,39 @@ async def import_experts(
             upload = form.get("file")
             category = form.get("category")
             filename = form.get("filename")
-            if upload is None or category is None:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="file et category requis")
+            if upload is None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="file requis")
+            upload_name = str(filename or getattr(upload, "filename", "") or "")
+            if _is_csv_upload(upload, upload_name):
+                return await _import_csv(
+                    upload,
+                    str(category) if category is not None else None,
+                    upload_name or "import.csv",
+                    user,
+                    db,
+                    dry_run=dry_run,
+                )
             file_bytes = await upload.read()
+            if category is None or str(category) in ("", "auto"):
+                return await _import_workbook(
+                    file_bytes,
+                    str(filename or getattr(upload, "filename", "") or "import.xlsx"),
+                    user,
+                    db,
+                    dry_run=dry_run,
+                )
             rows = _read_excel_rows(file_bytes)
             mapped_rows = [_row_to_import_row(str(category), r) for r in rows]
             payload = ExpertImportRequest(
                 category=str(category),
                 filename=filename or getattr(upload, "filename", "import.xlsx"),
                 rows=mapped_rows,
-                file_data=rows,
             )
-            return await _import_experts_payload(payload, user, db)
+            return await _import_experts_payload(payload, user, db, dry_run=dry_run, raw_file=file_bytes)
 
         data = await request.json()
         payload = ExpertImportRequest.model_validate(data)
-        return await _import_experts_payload(payload, user, db)
+        return await _import_experts_payload(payload, user, db, dry_run=dry_run)
     except HTTPException:
         raise
     except Exception as exc:
@@ -506,6 +1160,132 @@ async def import_experts(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Import failed: {exc}") from exc
 
 
+_ROLLBACK_CHECK_SQL = text(
+    f"""
+    SELECT
+      count(*) FILTER (WHERE c.action = 'created') AS created,
+      count(*) FILTER (WHERE c.action = 'updated') AS updated,
+      count(*) FILTER (WHERE e.id IS NOT NULL AND e.import_id IS DISTINCT FROM c.import_id) AS retouches,
+      count(*) FILTER (
+        WHERE e.id IS NOT NULL
+          AND e.import_id IS NOT DISTINCT FROM c.import_id
+          AND (c.after IS NULL OR {_AFTER_IMAGE_SQL} IS DISTINCT FROM c.after)
+      ) AS modifies,
+      count(*) FILTER (
+        WHERE c.action = 'created'
+          AND EXISTS (SELECT 1 FROM encaissements x WHERE x.expert_comptable_id = c.expert_id)
+      ) AS utilises,
+      count(*) FILTER (
+        WHERE c.action = 'created'
+          AND EXISTS (SELECT 1 FROM participants_transport p WHERE p.expert_comptable_id = c.expert_id)
+      ) AS participants
+    FROM import_expert_changes c
+    LEFT JOIN experts_comptables e ON e.id = c.expert_id
+    WHERE c.import_id = :import_id
+    """
+)
+
+# Restauration des valeurs antérieures ; la condition sur import_id écarte un expert repris
+# entre-temps par un autre import
+_ROLLBACK_RESTORE_SQL = text(
+    f"""
+    UPDATE experts_comptables e
+    SET {", ".join(f"{field} = r.{field}" for field in _ROLLBACK_FIELDS)}
+    FROM import_expert_changes c
+    CROSS JOIN LATERAL jsonb_populate_record(NULL::experts_comptables, c.before) AS r
+    WHERE c.import_id = :import_id
+      AND c.action = 'updated'
+      AND e.id = c.expert_id
+      AND e.import_id = :import_id
+    """
+)
+
+_ROLLBACK_DELETE_SQL = text(
+    """
+    DELETE FROM experts_comptables e
+    USING import_expert_changes c
+    WHERE c.import_id = :import_id
+      AND c.action = 'created'
+      AND e.id = c.expert_id
+      AND e.import_id = :import_id
+    """
+)
+
+
+@router.post(
+    "/imports/{import_id}/rollback",
+    response_model=ExpertImportRollbackResponse,
+    dependencies=[Depends(require_roles(["admin"]))],
+)
+async def rollback_import(
+    import_id: str,
+    db: AsyncSession = Depends(get_db),
+) -> ExpertImportRollbackResponse:
+    """
+    Annule un import : supprime les experts qu'il a créés et rétablit l'état antérieur de ceux
+    qu'il a modifiés, en trois requêtes ensemblistes et une transaction.
+
+    Refusé (409) si un expert concerné a été repris par un import ultérieur ou modifié depuis
+    l'import (PATCH, changement de catégorie : comparaison avec l'état relevé après l'import), ou
+    si un expert créé par l'import est déjà référencé par un encaissement ou un remboursement
+    de transport.
+    """
+    try:
+        uid = uuid.UUID(import_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid UUID")
+
+    # Verrou sur l'import : deux annulations simultanées ne peuvent pas se chevaucher
+    result = await db.execute(select(ImportsHistory).where(ImportsHistory.id == uid).with_for_update())
+    import_record = result.scalar_one_or_none()
+    if not import_record:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import non trouvé")
+    if import_record.status == "rolled_back":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Import déjà annulé")
+
+    params = {"import_id": uid}
+    check = (await db.execute(_ROLLBACK_CHECK_SQL, params)).one()
+    if check.created == 0 and check.updated == 0 and import_record.rows_imported > 0:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Aucun état antérieur enregistré pour cet import",
+        )
+    if check.retouches:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{check.retouches} expert(s) modifié(s) depuis par un autre import",
+        )
+    if check.modifies:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{check.modifies} expert(s) modifié(s) depuis cet import",
+        )
+    if check.utilises:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{check.utilises} expert(s) créé(s) par cet import déjà utilisé(s) dans des encaissements",
+        )
+    if check.participants:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{check.participants} expert(s) créé(s) par cet import déjà utilisé(s) dans des remboursements de transport",
+        )
+
+    restored = (await db.execute(_ROLLBACK_RESTORE_SQL, params)).rowcount
+    deleted = (await db.execute(_ROLLBACK_DELETE_SQL, params)).rowcount
+    import_record.status = "rolled_back"
+    await db.commit()
+    await expert_index.rebuild(db)
+
+    logger.info("Rollback import %s: deleted=%s restored=%s", uid, deleted, restored)
+    return ExpertImportRollbackResponse(
+        import_id=str(uid),
+        deleted=deleted,
+        restored=restored,
+        message=f"Import annulé : {deleted} expert(s) supprimé(s), {restored} expert(s) restauré(s)",
+    )
+
+
 @router.post("/category-change", response_model=CategoryChangeResponse)
 async def change_category(
     payload: CategoryChangeRequest,
@@ -595,6 +1375,7 @@ async def change_category(
 
     await db.commit()
     await db.refresh(history)
+    expert_index.upsert(expert)
 
     return {
         "id": str(history.id),
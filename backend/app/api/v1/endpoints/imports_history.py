@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import JSON, case, cast, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_user
+from app.db.session import get_db
+from app.models.import_file import ImportFile
+from app.models.imports_history import ImportsHistory
+from app.models.user import User
+from app.schemas.imports import ImportsHistoryResponse, ImportsHistoryRows
+from app.services.import_files import read_import_rows
+
+router = APIRouter()
+
+# Imports antérieurs à import_files : lignes lues directement dans le JSON, page par page
+_LEGACY_ROWS_SQL = text(
+    """
+    SELECT t.elem::text
+    FROM imports_history h
+    CROSS JOIN LATERAL json_array_elements(h.file_data::json) WITH ORDINALITY AS t(elem, n)
+    WHERE h.id = :id
+    ORDER BY t.n
+    OFFSET :offset
+    LIMIT :limit
+    """
+)
+
+
+@router.get("", response_model=list[ImportsHistoryResponse])
+async def list_imports_history(
+    category: str | None = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> list[ImportsHistoryResponse]:
+    """Historique des imports, sans le contenu des fichiers (chargé à la demande via /rows)."""
+    query = (
+        select(ImportsHistory, ImportFile.format, ImportFile.row_count)
+        .outerjoin(ImportFile, ImportFile.content_hash == ImportsHistory.file_hash)
+        .order_by(ImportsHistory.created_at.desc(), ImportsHistory.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    if category:
+        query = query.where(ImportsHistory.category == category)
+
+    result = await db.execute(query)
+    return [
+        ImportsHistoryResponse(
+            id=str(h.id),
+            filename=h.filename,
+            category=h.category,
+            imported_by=str(h.imported_by) if h.imported_by else None,
+            rows_imported=h.rows_imported,
+            status=h.status,
+            created_at=h.created_at,
+            file_format=file_format,
+            file_rows=file_rows,
+        )
+        for h, file_format, file_rows in result.all()
+    ]
+
+
+@router.get("/{import_id}/rows", response_model=ImportsHistoryRows)
+async def get_import_rows(
+    import_id: str,
+    limit: int = Query(default=200, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> ImportsHistoryRows:
+    """Lignes du fichier d'origine d'un import, décompressées page par page."""
+    try:
+        uid = uuid.UUID(import_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid UUID")
+
+    res = await db.execute(
+        select(
+            ImportsHistory.file_hash,
+            ImportFile.row_count,
+            # Ancien contenu JSON compté seulement sans fichier stocké ; colonne jsonb en base, d'où le cast
+            case(
+                (ImportsHistory.file_hash.is_(None), func.json_array_length(cast(ImportsHistory.file_data, JSON))),
+                else_=None,
+            ),
+        )
+        .outerjoin(ImportFile, ImportFile.content_hash == ImportsHistory.file_hash)
+        .where(ImportsHistory.id == uid)
+    )
+    row = res.one_or_none()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import non trouvé")
+    file_hash, file_rows, legacy_rows = row
+
+    if file_hash is not None:
+        total = file_rows or 0
+        items = await read_import_rows(db, file_hash, offset=offset, limit=limit)
+    elif legacy_rows is not None:
+        total = legacy_rows
+        legacy = await db.execute(_LEGACY_ROWS_SQL, {"id": uid, "offset": offset, "limit": limit})
+        items = [json.loads(elem) for (elem,) in legacy.all()]
+    else:
+        total, items = 0, []
+
+    return ImportsHistoryRows(import_id=str(uid), total=total, offset=offset, limit=limit, items=items)
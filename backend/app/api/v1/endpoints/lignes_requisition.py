@@ -4,7 +4,7 @@ import uuid
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
@@ -51,23 +51,26 @@ async def create_lignes_requisition(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ) -> list[LigneRequisitionOut]:
-    lignes: list[LigneRequisition] = []
+    rows: list[dict[str, Any]] = []
     for item in payload:
         try:
             rid = uuid.UUID(item.requisition_id)
         except ValueError:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid requisition_id")
-        ligne = LigneRequisition(
-            requisition_id=rid,
-            rubrique=item.rubrique,
-            description=item.description,
-            quantite=item.quantite,
-            montant_unitaire=item.montant_unitaire,
-            montant_total=item.montant_total,
+        rows.append(
+            {
+                "id": uuid.uuid4(),
+                "requisition_id": rid,
+                "rubrique": item.rubrique,
+                "description": item.description,
+                "quantite": item.quantite,
+                "montant_unitaire": item.montant_unitaire,
+                "montant_total": item.montant_total,
+            }
         )
-        lignes.append(ligne)
-        db.add(ligne)
+    if not rows:
+        return []
+    # Un seul INSERT multi-lignes ... RETURNING au lieu d'un refresh par ligne
+    lignes = (await db.scalars(insert(LigneRequisition).returning(LigneRequisition), rows)).all()
     await db.commit()
-    for ligne in lignes:
-        await db.refresh(ligne)
     return [_ligne_out(l) for l in lignes]
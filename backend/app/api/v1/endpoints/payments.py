@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import uuid
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select, update
+from sqlalchemy import case, func, insert, literal, select, text, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
@@ -12,10 +13,46 @@ from app.db.session import get_db
 from app.models.encaissement import Encaissement
 from app.models.payment_history import PaymentHistory
 from app.models.user import User
-from app.schemas.payment import PaymentHistoryCreate, PaymentHistoryResponse
+from app.schemas.payment import (
+    PaymentBulkRequest,
+    PaymentBulkResponse,
+    PaymentBulkResult,
+    PaymentHistoryAggregate,
+    PaymentHistoryCreate,
+    PaymentHistoryGroup,
+    PaymentHistoryResponse,
+)
+from app.services.closed_months import closed_months, ensure_months_open, month_of
+from app.services.cotisations import apply_cotisation_deltas
 
 router = APIRouter()
 
+BATCH_MAX_IDS = 500
+# Période maximale d'une recherche par dates seules
+BATCH_MAX_DAYS = 366
+
+
+def _parse_date_value(value: str | None, field: str) -> date | None:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {field}")
+    return dt.date()
+
+
+def _start_of_day(value: date | None) -> datetime | None:
+    if not value:
+        return None
+    return datetime.combine(value, datetime.min.time(), tzinfo=timezone.utc)
+
+
+def _end_exclusive(value: date | None) -> datetime | None:
+    if not value:
+        return None
+    return datetime.combine(value + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+
 
 def _payment_to_response(payment: PaymentHistory) -> dict:
     """Convertit un modèle PaymentHistory en dict pour la réponse."""
@@ -31,6 +68,68 @@ def _payment_to_response(payment: PaymentHistory) -> dict:
     }
 
 
+def _statut_after(montant_paye_expr):
+    """Statut de paiement recalculé côté SQL à partir du nouveau montant payé."""
+    return case(
+        (montant_paye_expr >= Encaissement.montant_total, "complet"),
+        (montant_paye_expr > 0, "partiel"),
+        else_="non_paye",
+    )
+
+
+async def _apply_payment(
+    db: AsyncSession,
+    *,
+    enc_uid: uuid.UUID,
+    montant: Decimal,
+    mode_paiement: str,
+    reference: str | None,
+    notes: str | None,
+    created_by: uuid.UUID | None,
+) -> PaymentHistory | None:
+    """
+    Applique un paiement en une seule instruction SQL.
+
+    L'UPDATE conditionnel incrémente montant_paye uniquement si le restant dû le permet
+    (le verrou de ligne sérialise les encaisseurs concurrents), puis l'INSERT de
+    l'historique consomme la ligne RETURNING dans le même statement. Retourne None si
+    l'encaissement n'existe pas ou si le montant dépasse le restant dû ; 409 si
+    l'encaissement est daté dans un mois clôturé.
+    """
+    date_encaissement = await db.scalar(select(Encaissement.date_encaissement).where(Encaissement.id == enc_uid))
+    if date_encaissement is not None:
+        await ensure_months_open(db, [date_encaissement])
+
+    new_montant_paye = Encaissement.montant_paye + montant
+    applied = (
+        update(Encaissement)
+        .where(Encaissement.id == enc_uid, new_montant_paye <= Encaissement.montant_total)
+        .values(montant_paye=new_montant_paye, statut_paiement=_statut_after(new_montant_paye))
+        .returning(Encaissement.id)
+        .cte("applied")
+    )
+    values = {
+        PaymentHistory.id: uuid.uuid4(),
+        PaymentHistory.montant: montant,
+        PaymentHistory.mode_paiement: mode_paiement,
+        PaymentHistory.reference: reference,
+        PaymentHistory.notes: notes,
+        PaymentHistory.created_by: created_by,
+        PaymentHistory.created_at: datetime.now(timezone.utc),
+    }
+    stmt = (
+        insert(PaymentHistory)
+        .from_select(
+            [PaymentHistory.encaissement_id, *values.keys()],
+            select(applied.c.id, *(literal(v, col.type) for col, v in values.items())),
+        )
+        .add_cte(applied)
+        .returning(PaymentHistory)
+    )
+    result = await db.execute(stmt)
+    return result.scalars().first()
+
+
 @router.get("", response_model=list[PaymentHistoryResponse])
 async def list_payments(
     encaissement_id: str = Query(..., description="ID de l'encaissement"),
@@ -53,6 +152,106 @@ async def list_payments(
     return [_payment_to_response(p) for p in payments]
 
 
+@router.get("/batch", response_model=list[PaymentHistoryGroup])
+async def list_payments_batch(
+    encaissement_ids: str | None = Query(default=None, description="IDs d'encaissements séparés par des virgules"),
+    date_debut: str | None = Query(default=None),
+    date_fin: str | None = Query(default=None),
+    aggregate: bool = Query(default=False, description="Inclure count/total/dernier paiement par encaissement"),
+    limit: int = Query(default=1000, ge=1, le=5000, description="Nombre max de paiements renvoyés"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> list[dict]:
+    """
+    Historique des paiements de plusieurs encaissements, groupé par encaissement.
+
+    Une seule requête (index ix_payment_history_encaissement_id) ; les agrégats par
+    encaissement sont calculés par fonctions de fenêtre dans la même requête.
+    """
+    enc_uids: list[uuid.UUID] = []
+    for part in (encaissement_ids or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            enc_uids.append(uuid.UUID(part))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid encaissement_id UUID")
+    if len(enc_uids) > BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Trop d'encaissements (max {BATCH_MAX_IDS})",
+        )
+
+    date_start = _parse_date_value(date_debut, "date_debut")
+    date_end = _parse_date_value(date_fin, "date_fin")
+    if not enc_uids and not (date_start and date_end):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="encaissement_ids ou date_debut/date_fin requis",
+        )
+    if date_start and date_end:
+        if date_end < date_start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="date_fin antérieure à date_debut",
+            )
+        if not enc_uids and (date_end - date_start).days >= BATCH_MAX_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Période trop longue (max {BATCH_MAX_DAYS} jours)",
+            )
+    start_dt = _start_of_day(date_start)
+    end_excl_dt = _end_exclusive(date_end)
+
+    partition = PaymentHistory.encaissement_id
+    query = select(
+        PaymentHistory,
+        func.count().over(partition_by=partition).label("agg_count"),
+        func.sum(PaymentHistory.montant).over(partition_by=partition).label("agg_total"),
+        func.max(PaymentHistory.created_at).over(partition_by=partition).label("agg_last"),
+    )
+    if enc_uids:
+        query = query.where(PaymentHistory.encaissement_id.in_(enc_uids))
+    if start_dt:
+        query = query.where(PaymentHistory.created_at >= start_dt)
+    if end_excl_dt:
+        query = query.where(PaymentHistory.created_at < end_excl_dt)
+    # Les agrégats de fenêtre portent sur tous les paiements du groupe, avant la limite
+    query = query.order_by(PaymentHistory.encaissement_id, PaymentHistory.created_at.desc()).limit(limit)
+
+    result = await db.execute(query)
+
+    groups: dict[uuid.UUID, dict] = {}
+    for payment, agg_count, agg_total, agg_last in result.all():
+        group = groups.get(payment.encaissement_id)
+        if group is None:
+            group = {
+                "encaissement_id": str(payment.encaissement_id),
+                "payments": [],
+                "summary": PaymentHistoryAggregate(count=agg_count, total=agg_total, dernier_paiement=agg_last)
+                if aggregate
+                else None,
+            }
+            groups[payment.encaissement_id] = group
+        group["payments"].append(_payment_to_response(payment))
+
+    # Conserver l'ordre demandé et renvoyer un groupe vide pour les encaissements sans paiement
+    if enc_uids:
+        ordered: list[dict] = []
+        for enc_uid in dict.fromkeys(enc_uids):
+            group = groups.get(enc_uid)
+            if group is None:
+                group = {
+                    "encaissement_id": str(enc_uid),
+                    "payments": [],
+                    "summary": PaymentHistoryAggregate() if aggregate else None,
+                }
+            ordered.append(group)
+        return ordered
+    return list(groups.values())
+
+
 @router.post("", response_model=PaymentHistoryResponse, status_code=status.HTTP_201_CREATED)
 async def create_payment(
     payload: PaymentHistoryCreate,
@@ -65,50 +264,167 @@ async def create_payment(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid encaissement_id UUID")
 
-    # Vérifier que l'encaissement existe
-    result = await db.execute(select(Encaissement).where(Encaissement.id == enc_uid))
-    encaissement = result.scalar_one_or_none()
-
-    if not encaissement:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Encaissement non trouvé")
-
-    # Vérifier que le montant ne dépasse pas le restant dû
-    montant_restant = encaissement.montant_total - encaissement.montant_paye
-    if payload.montant > montant_restant:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Montant trop élevé. Restant dû: {montant_restant}"
-        )
-
-    # Créer le paiement
-    payment = PaymentHistory(
-        encaissement_id=enc_uid,
+    payment = await _apply_payment(
+        db,
+        enc_uid=enc_uid,
         montant=payload.montant,
         mode_paiement=payload.mode_paiement,
         reference=payload.reference,
         notes=payload.notes,
         created_by=user.id,
     )
-    db.add(payment)
 
-    # Mettre à jour l'encaissement
-    new_montant_paye = encaissement.montant_paye + payload.montant
-    encaissement.montant_paye = new_montant_paye
-
-    # Déterminer le nouveau statut
-    if new_montant_paye >= encaissement.montant_total:
-        encaissement.statut_paiement = "complet"
-    elif new_montant_paye > 0:
-        encaissement.statut_paiement = "partiel"
-    else:
-        encaissement.statut_paiement = "non_paye"
+    if payment is None:
+        await db.rollback()
+        # Le paiement n'a pas été appliqué: encaissement absent ou solde insuffisant
+        result = await db.execute(
+            select(Encaissement.montant_total, Encaissement.montant_paye).where(Encaissement.id == enc_uid)
+        )
+        row = result.first()
+        if not row:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Encaissement non trouvé")
+        montant_restant = row.montant_total - row.montant_paye
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Montant trop élevé. Restant dû: {montant_restant}"
+        )
 
+    await apply_cotisation_deltas(db, [(enc_uid, Decimal("0"), payload.montant)], paid_at=payment.created_at)
     await db.commit()
-    await db.refresh(payment)
 
     return _payment_to_response(payment)
 
 
+@router.post("/bulk", response_model=PaymentBulkResponse)
+async def create_payments_bulk(
+    payload: PaymentBulkRequest,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> PaymentBulkResponse:
+    """
+    Applique un lot de paiements (règlement bancaire ou mobile money) en une transaction.
+
+    Les restants dus sont lus et verrouillés en une requête, chaque entrée est validée
+    dans l'ordre du lot, puis les montants acceptés sont appliqués par un UPDATE
+    ensembliste et un INSERT multi-lignes. Les entrées refusées sont signalées
+    individuellement sans bloquer le reste du lot.
+    """
+    results: list[PaymentBulkResult] = []
+    parsed: list[tuple[int, uuid.UUID]] = []
+    for index, entry in enumerate(payload.entries):
+        try:
+            parsed.append((index, uuid.UUID(entry.encaissement_id)))
+        except ValueError:
+            results.append(
+                PaymentBulkResult(
+                    index=index,
+                    encaissement_id=entry.encaissement_id,
+                    status="rejected",
+                    detail="Invalid encaissement_id UUID",
+                )
+            )
+
+    enc_ids = sorted({enc_uid for _, enc_uid in parsed})
+    restants: dict[uuid.UUID, Decimal] = {}
+    enc_closed: set[uuid.UUID] = set()
+    if enc_ids:
+        # Verrouillage dans un ordre stable pour éviter les interblocages entre lots
+        res = await db.execute(
+            select(
+                Encaissement.id,
+                Encaissement.montant_total - Encaissement.montant_paye,
+                Encaissement.date_encaissement,
+            )
+            .where(Encaissement.id.in_(enc_ids))
+            .order_by(Encaissement.id)
+            .with_for_update()
+        )
+        rows = res.all()
+        restants = {row[0]: row[1] for row in rows}
+        # Encaissements datés dans un mois clôturé : rapport figé, paiement refusé
+        closed = await closed_months(db, [row[2] for row in rows])
+        enc_closed = {row[0] for row in rows if month_of(row[2]) in closed}
+
+    now = datetime.now(timezone.utc)
+    increments: dict[uuid.UUID, Decimal] = {}
+    history_rows: list[dict] = []
+    for index, enc_uid in parsed:
+        entry = payload.entries[index]
+        restant = restants.get(enc_uid)
+        if restant is None:
+            detail = "Encaissement non trouvé"
+        elif enc_uid in enc_closed:
+            detail = "Encaissement daté dans un mois clôturé"
+        elif entry.montant > restant:
+            detail = f"Montant trop élevé. Restant dû: {restant}"
+        else:
+            detail = None
+
+        if detail is not None:
+            results.append(
+                PaymentBulkResult(
+                    index=index,
+                    encaissement_id=entry.encaissement_id,
+                    status="rejected",
+                    detail=detail,
+                )
+            )
+            continue
+
+        restants[enc_uid] = restant - entry.montant
+        increments[enc_uid] = increments.get(enc_uid, Decimal("0")) + entry.montant
+        payment_id = uuid.uuid4()
+        history_rows.append(
+            {
+                "id": payment_id,
+                "encaissement_id": enc_uid,
+                "montant": entry.montant,
+                "mode_paiement": entry.mode_paiement,
+                "reference": entry.reference,
+                "notes": entry.notes,
+                "created_by": user.id,
+                "created_at": now,
+            }
+        )
+        results.append(
+            PaymentBulkResult(
+                index=index,
+                encaissement_id=entry.encaissement_id,
+                status="applied",
+                payment_id=str(payment_id),
+            )
+        )
+
+    if increments:
+        await db.execute(
+            text(
+                """
+                UPDATE public.encaissements AS e
+                SET montant_paye = e.montant_paye + v.montant,
+                    statut_paiement = CASE
+                        WHEN e.montant_paye + v.montant >= e.montant_total THEN 'complet'
+                        WHEN e.montant_paye + v.montant > 0 THEN 'partiel'
+                        ELSE 'non_paye'
+                    END
+                FROM unnest(CAST(:ids AS uuid[]), CAST(:montants AS numeric[])) AS v(id, montant)
+                WHERE e.id = v.id
+                """
+            ),
+            {"ids": list(increments.keys()), "montants": list(increments.values())},
+        )
+        await db.execute(insert(PaymentHistory), history_rows)
+        await apply_cotisation_deltas(
+            db,
+            ((enc_uid, Decimal("0"), montant) for enc_uid, montant in increments.items()),
+            paid_at=now,
+        )
+    await db.commit()
+
+    results.sort(key=lambda r: r.index)
+    applied = sum(1 for r in results if r.status == "applied")
+    return PaymentBulkResponse(applied=applied, rejected=len(results) - applied, results=results)
+
+
 @router.get("/{payment_id}", response_model=PaymentHistoryResponse)
 async def get_payment(
     payment_id: str,
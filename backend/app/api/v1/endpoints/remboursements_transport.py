@@ -5,12 +5,13 @@ from datetime import datetime, timezone
 from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
 from app.db.session import get_db
-from app.models.requisition import Requisition
+from app.models.expert_comptable import ExpertComptable
 from app.models.remboursement_transport import ParticipantTransport, RemboursementTransport
 from app.models.user import User
 from app.schemas.remboursement_transport import (
@@ -18,6 +19,7 @@ from app.schemas.remboursement_transport import (
     ParticipantTransportResponse,
     RemboursementTransportCreate,
     RemboursementTransportResponse,
+    RemboursementTransportWithParticipantsCreate,
 )
 
 router = APIRouter()
@@ -27,45 +29,84 @@ def _rt_number() -> str:
     return f"RT-{uuid.uuid4().hex[:8].upper()}"
 
 
-def _user_info(user: User | None) -> dict[str, str | None] | None:
-    if not user:
-        return None
-    return {
-        "id": str(user.id),
-        "prenom": user.prenom,
-        "nom": user.nom,
-        "email": user.email,
-    }
-
-
-def _requisition_payload(req: Requisition, users_map: dict[uuid.UUID, User]) -> dict[str, object]:
-    return {
-        "id": str(req.id),
-        "numero_requisition": req.numero_requisition,
-        "objet": req.objet,
-        "mode_paiement": req.mode_paiement,
-        "type_requisition": req.type_requisition,
-        "montant_total": float(req.montant_total or 0),
-        "status": req.status,
-        "statut": req.status,
-        "created_by": str(req.created_by) if req.created_by else None,
-        "validee_par": str(req.validee_par) if req.validee_par else None,
-        "validee_le": req.validee_le,
-        "approuvee_par": str(req.approuvee_par) if req.approuvee_par else None,
-        "approuvee_le": req.approuvee_le,
-        "payee_par": str(req.payee_par) if req.payee_par else None,
-        "payee_le": req.payee_le,
-        "motif_rejet": req.motif_rejet,
-        "a_valoir": req.a_valoir,
-        "instance_beneficiaire": req.instance_beneficiaire,
-        "notes_a_valoir": req.notes_a_valoir,
-        "created_at": req.created_at,
-        "updated_at": req.updated_at,
-        "demandeur": _user_info(users_map.get(req.created_by)) if req.created_by else None,
-        "validateur": _user_info(users_map.get(req.validee_par)) if req.validee_par else None,
-        "approbateur": _user_info(users_map.get(req.approuvee_par)) if req.approuvee_par else None,
-        "caissier": _user_info(users_map.get(req.payee_par)) if req.payee_par else None,
-    }
+def _participant_out(p: ParticipantTransport) -> ParticipantTransportResponse:
+    return ParticipantTransportResponse(
+        id=str(p.id),
+        remboursement_id=str(p.remboursement_id),
+        nom=p.nom,
+        titre_fonction=p.titre_fonction,
+        montant=p.montant,
+        type_participant=p.type_participant,
+        expert_comptable_id=str(p.expert_comptable_id) if p.expert_comptable_id else None,
+        created_at=p.created_at,
+    )
+
+
+def _user_json(column: str) -> str:
+    return f"""(
+        SELECT json_build_object('id', u.id, 'prenom', u.prenom, 'nom', u.nom, 'email', u.email)
+        FROM public.users u
+        WHERE u.id = {column}
+    )"""
+
+
+# Fragments de la requête de liste : chaque inclusion est une jointure LATERAL agrégée en JSON
+_PARTICIPANTS_JOIN = """
+    LEFT JOIN LATERAL (
+        SELECT json_agg(
+                   json_build_object(
+                       'id', p.id,
+                       'remboursement_id', p.remboursement_id,
+                       'nom', p.nom,
+                       'titre_fonction', p.titre_fonction,
+                       'montant', p.montant,
+                       'type_participant', p.type_participant,
+                       'expert_comptable_id', p.expert_comptable_id,
+                       'created_at', p.created_at
+                   )
+                   ORDER BY p.created_at, p.id
+               ) AS participants
+        FROM public.participants_transport p
+        WHERE p.remboursement_id = r.id
+    ) parts ON true
+"""
+_REQUISITION_JOIN = f"""
+    LEFT JOIN LATERAL (
+        SELECT json_build_object(
+                   'id', q.id,
+                   'numero_requisition', q.numero_requisition,
+                   'objet', q.objet,
+                   'mode_paiement', q.mode_paiement,
+                   'type_requisition', q.type_requisition,
+                   'montant_total', q.montant_total,
+                   'montant_paye_cumule', q.montant_paye_cumule,
+                   'reste_a_payer', q.montant_total - q.montant_paye_cumule,
+                   'status', q.status,
+                   'statut', q.status,
+                   'created_by', q.created_by,
+                   'validee_par', q.validee_par,
+                   'validee_le', q.validee_le,
+                   'approuvee_par', q.approuvee_par,
+                   'approuvee_le', q.approuvee_le,
+                   'payee_par', q.payee_par,
+                   'payee_le', q.payee_le,
+                   'motif_rejet', q.motif_rejet,
+                   'a_valoir', q.a_valoir,
+                   'instance_beneficiaire', q.instance_beneficiaire,
+                   'notes_a_valoir', q.notes_a_valoir,
+                   'created_at', q.created_at,
+                   'updated_at', q.updated_at,
+                   'demandeur', {_user_json("q.created_by")},
+                   'validateur', {_user_json("q.validee_par")},
+                   'approbateur', {_user_json("q.approuvee_par")},
+                   'caissier', {_user_json("q.payee_par")}
+               ) AS requisition
+        FROM public.requisitions q
+        WHERE q.id = r.requisition_id
+    ) rq ON true
+"""
+
+_RESPONSE_LIST = TypeAdapter(list[RemboursementTransportResponse])
 
 
 @router.get("", response_model=list[RemboursementTransportResponse])
@@ -77,90 +118,66 @@ async def list_remboursements_transport(
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> list[RemboursementTransportResponse]:
-    query = select(RemboursementTransport).order_by(RemboursementTransport.created_at.desc()).offset(offset).limit(limit)
+    """
+    Liste paginée, inclusions (participants, requisition) comprises, en une seule requête.
+
+    Les inclusions sont résolues par jointures LATERAL et agrégées en un tableau JSON décodé
+    directement en modèles de réponse. Le filtre requisition_id est appliqué avant la pagination.
+    """
+    params: dict[str, object] = {"limit": limit, "offset": offset}
+    where = ""
     if requisition_id:
         try:
-            rid = uuid.UUID(requisition_id)
+            params["requisition_id"] = uuid.UUID(requisition_id)
         except ValueError:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid requisition_id")
-        query = query.where(RemboursementTransport.requisition_id == rid)
-
-    res = await db.execute(query)
-    remboursements = res.scalars().all()
+        where = "WHERE requisition_id = :requisition_id"
 
     include_parts = {p.strip() for p in include.split(",")} if include else set()
-    participants_map: dict[str, list[ParticipantTransportResponse]] = {}
-    if "participants" in include_parts:
-        ids = [r.id for r in remboursements]
-        if ids:
-            p_res = await db.execute(select(ParticipantTransport).where(ParticipantTransport.remboursement_id.in_(ids)))
-            participants = p_res.scalars().all()
-            for p in participants:
-                participants_map.setdefault(str(p.remboursement_id), []).append(
-                    ParticipantTransportResponse(
-                        id=str(p.id),
-                        remboursement_id=str(p.remboursement_id),
-                        nom=p.nom,
-                        titre_fonction=p.titre_fonction,
-                        montant=p.montant,
-                        type_participant=p.type_participant,
-                        expert_comptable_id=str(p.expert_comptable_id) if p.expert_comptable_id else None,
-                        created_at=p.created_at,
-                    )
-                )
-
-    requisitions_map: dict[uuid.UUID, Requisition] = {}
-    users_map: dict[uuid.UUID, User] = {}
-    if "requisition" in include_parts:
-        req_ids = [r.requisition_id for r in remboursements if r.requisition_id]
-        if req_ids:
-            req_res = await db.execute(select(Requisition).where(Requisition.id.in_(req_ids)))
-            requisitions = req_res.scalars().all()
-            requisitions_map = {r.id: r for r in requisitions}
-
-            user_ids: set[uuid.UUID] = set()
-            for r in requisitions:
-                if r.created_by:
-                    user_ids.add(r.created_by)
-                if r.validee_par:
-                    user_ids.add(r.validee_par)
-                if r.approuvee_par:
-                    user_ids.add(r.approuvee_par)
-                if r.payee_par:
-                    user_ids.add(r.payee_par)
-            if user_ids:
-                users_res = await db.execute(select(User).where(User.id.in_(list(user_ids))))
-                users_map = {u.id: u for u in users_res.scalars().all()}
-
-    responses: list[RemboursementTransportResponse] = []
-    for r in remboursements:
-        requisition_payload = None
-        if "requisition" in include_parts and r.requisition_id:
-            req = requisitions_map.get(r.requisition_id)
-            if req:
-                requisition_payload = _requisition_payload(req, users_map)
-        responses.append(
-            RemboursementTransportResponse(
-                id=str(r.id),
-                numero_remboursement=r.numero_remboursement,
-                instance=r.instance,
-                type_reunion=r.type_reunion,
-                nature_reunion=r.nature_reunion,
-                nature_travail=r.nature_travail or [],
-                lieu=r.lieu,
-                date_reunion=r.date_reunion,
-                heure_debut=r.heure_debut,
-                heure_fin=r.heure_fin,
-                montant_total=r.montant_total or Decimal(0),
-                requisition_id=str(r.requisition_id) if r.requisition_id else None,
-                created_at=r.created_at,
-                created_by=str(r.created_by) if r.created_by else None,
-                participants=participants_map.get(str(r.id)),
-                requisition=requisition_payload,
-            )
-        )
-
-    return responses
+    with_participants = "participants" in include_parts
+    with_requisition = "requisition" in include_parts
+
+    res = await db.execute(
+        text(
+            f"""
+            SELECT COALESCE(
+                       json_agg(
+                           json_build_object(
+                               'id', r.id,
+                               'numero_remboursement', r.numero_remboursement,
+                               'instance', r.instance,
+                               'type_reunion', r.type_reunion,
+                               'nature_reunion', r.nature_reunion,
+                               'nature_travail', COALESCE(r.nature_travail, '[]'::jsonb),
+                               'lieu', r.lieu,
+                               'date_reunion', r.date_reunion,
+                               'heure_debut', r.heure_debut,
+                               'heure_fin', r.heure_fin,
+                               'montant_total', r.montant_total,
+                               'requisition_id', r.requisition_id,
+                               'created_at', r.created_at,
+                               'created_by', r.created_by,
+                               'participants', {"parts.participants" if with_participants else "NULL"},
+                               'requisition', {"rq.requisition" if with_requisition else "NULL"}
+                           )
+                           ORDER BY r.created_at DESC, r.id
+                       ),
+                       '[]'::json
+                   )::text
+            FROM (
+                SELECT *
+                FROM public.remboursements_transport
+                {where}
+                ORDER BY created_at DESC, id
+                LIMIT :limit OFFSET :offset
+            ) r
+            {_PARTICIPANTS_JOIN if with_participants else ""}
+            {_REQUISITION_JOIN if with_requisition else ""}
+            """
+        ),
+        params,
+    )
+    return _RESPONSE_LIST.validate_json(res.scalar_one())
 
 
 @router.post("", response_model=RemboursementTransportResponse, status_code=status.HTTP_201_CREATED)
@@ -220,6 +237,109 @@ async def create_remboursement_transport(
     )
 
 
+@router.post(
+    "/with-participants",
+    response_model=RemboursementTransportResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_remboursement_transport_with_participants(
+    payload: RemboursementTransportWithParticipantsCreate,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> RemboursementTransportResponse:
+    """
+    Crée un remboursement de transport et ses participants dans une seule transaction.
+
+    Les experts référencés sont vérifiés en une requête IN, les participants insérés par un
+    INSERT multi-lignes ... RETURNING, et montant_total est la somme de leurs montants.
+    """
+    requisition_id = None
+    if payload.requisition_id:
+        try:
+            requisition_id = uuid.UUID(payload.requisition_id)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid requisition_id")
+
+    created_by = None
+    if payload.created_by:
+        try:
+            created_by = uuid.UUID(payload.created_by)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid created_by")
+
+    rows: list[dict[str, object]] = []
+    for item in payload.participants:
+        expert_id = None
+        if item.expert_comptable_id:
+            try:
+                expert_id = uuid.UUID(item.expert_comptable_id)
+            except ValueError:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid expert_comptable_id")
+        rows.append(
+            {
+                "id": uuid.uuid4(),
+                "nom": item.nom,
+                "titre_fonction": item.titre_fonction,
+                "montant": item.montant or Decimal(0),
+                "type_participant": item.type_participant,
+                "expert_comptable_id": expert_id,
+            }
+        )
+
+    expert_ids = {row["expert_comptable_id"] for row in rows if row["expert_comptable_id"]}
+    if expert_ids:
+        res = await db.execute(select(ExpertComptable.id).where(ExpertComptable.id.in_(expert_ids)))
+        unknown = expert_ids - set(res.scalars().all())
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown expert_comptable_id: {', '.join(sorted(str(u) for u in unknown))}",
+            )
+
+    r = RemboursementTransport(
+        numero_remboursement=_rt_number(),
+        instance=payload.instance,
+        type_reunion=payload.type_reunion,
+        nature_reunion=payload.nature_reunion,
+        nature_travail=payload.nature_travail,
+        lieu=payload.lieu,
+        date_reunion=payload.date_reunion,
+        heure_debut=payload.heure_debut,
+        heure_fin=payload.heure_fin,
+        montant_total=sum((row["montant"] for row in rows), Decimal(0)),
+        requisition_id=requisition_id,
+        created_by=created_by or user.id,
+    )
+    db.add(r)
+    await db.flush()
+    participants: list[ParticipantTransport] = []
+    if rows:
+        for row in rows:
+            row["remboursement_id"] = r.id
+        participants = list(
+            (await db.scalars(insert(ParticipantTransport).returning(ParticipantTransport), rows)).all()
+        )
+    await db.commit()
+
+    return RemboursementTransportResponse(
+        id=str(r.id),
+        numero_remboursement=r.numero_remboursement,
+        instance=r.instance,
+        type_reunion=r.type_reunion,
+        nature_reunion=r.nature_reunion,
+        nature_travail=r.nature_travail or [],
+        lieu=r.lieu,
+        date_reunion=r.date_reunion,
+        heure_debut=r.heure_debut,
+        heure_fin=r.heure_fin,
+        montant_total=r.montant_total,
+        requisition_id=str(r.requisition_id) if r.requisition_id else None,
+        created_at=r.created_at,
+        created_by=str(r.created_by) if r.created_by else None,
+        participants=[_participant_out(p) for p in participants],
+    )
+
+
 @router.get("/participants", response_model=list[ParticipantTransportResponse])
 async def list_participants_transport(
     remboursement_id: str | None = Query(default=None),
@@ -237,20 +357,7 @@ async def list_participants_transport(
         query = query.where(ParticipantTransport.remboursement_id == rid)
 
     res = await db.execute(query)
-    participants = res.scalars().all()
-    return [
-        ParticipantTransportResponse(
-            id=str(p.id),
-            remboursement_id=str(p.remboursement_id),
-            nom=p.nom,
-            titre_fonction=p.titre_fonction,
-            montant=p.montant,
-            type_participant=p.type_participant,
-            expert_comptable_id=str(p.expert_comptable_id) if p.expert_comptable_id else None,
-            created_at=p.created_at,
-        )
-        for p in participants
-    ]
+    return [_participant_out(p) for p in res.scalars().all()]
 
 
 @router.post("/participants", response_model=list[ParticipantTransportResponse])
@@ -259,7 +366,7 @@ async def create_participants_transport(
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> list[ParticipantTransportResponse]:
-    created: list[ParticipantTransport] = []
+    rows: list[dict[str, object]] = []
     for item in payload:
         try:
             rid = uuid.UUID(item.remboursement_id)
@@ -273,31 +380,21 @@ async def create_participants_transport(
             except ValueError:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid expert_comptable_id")
 
-        p = ParticipantTransport(
-            remboursement_id=rid,
-            nom=item.nom,
-            titre_fonction=item.titre_fonction,
-            montant=item.montant or Decimal(0),
-            type_participant=item.type_participant,
-            expert_comptable_id=expert_id,
+        rows.append(
+            {
+                "id": uuid.uuid4(),
+                "remboursement_id": rid,
+                "nom": item.nom,
+                "titre_fonction": item.titre_fonction,
+                "montant": item.montant or Decimal(0),
+                "type_participant": item.type_participant,
+                "expert_comptable_id": expert_id,
+            }
         )
-        db.add(p)
-        created.append(p)
+    if not rows:
+        return []
 
+    # Un seul INSERT multi-lignes ... RETURNING au lieu d'un refresh par participant
+    created = (await db.scalars(insert(ParticipantTransport).returning(ParticipantTransport), rows)).all()
     await db.commit()
-    for p in created:
-        await db.refresh(p)
-
-    return [
-        ParticipantTransportResponse(
-            id=str(p.id),
-            remboursement_id=str(p.remboursement_id),
-            nom=p.nom,
-            titre_fonction=p.titre_fonction,
-            montant=p.montant,
-            type_participant=p.type_participant,
-            expert_comptable_id=str(p.expert_comptable_id) if p.expert_comptable_id else None,
-            created_at=p.created_at,
-        )
-        for p in created
-    ]
+    return [_participant_out(p) for p in created]
@@ -1,29 +1,57 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
+import time
+import uuid
+from collections import OrderedDict
 from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import text
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, require_roles
+from app.core.config import settings
 from app.db.session import get_db
+from app.models.report_job import ReportJob
+from app.models.report_snapshot import ReportSnapshot
 from app.models.user import User
 from app.schemas.reports import (
     PeriodInfo,
+    ReportAgingBuckets,
+    ReportAgingResponse,
+    ReportAgingRow,
     ReportAvailability,
     ReportBreakdownCount,
     ReportBreakdownCountTotal,
     ReportBreakdowns,
+    ReportCubeResponse,
+    ReportCubeRow,
+    ReportJobCreate,
+    ReportJobOut,
     ReportDailyStats,
     ReportModePaiementBreakdown,
     ReportRequisitionsSummary,
+    ReportSnapshotCreate,
+    ReportSnapshotOut,
     ReportSummaryResponse,
     ReportSummaryStats,
     ReportTotals,
 )
+from app.services.closed_months import lock_month_for_close
+from app.services.exports import (
+    check_export_format,
+    export_filename,
+    export_response,
+    parse_export_date,
+    stream_rows,
+)
+from app.services.report_jobs import load_result, submit_job
 
 router = APIRouter()
 logger = logging.getLogger("onec_cpk_reports")
@@ -34,6 +62,64 @@ REQUISITION_STATUT_APPROUVEE = ("VALIDEE", "APPROUVEE", "VALIDATED", "APPROVED")
 REQUISITION_STATUT_REJETEE = ("REJETEE", "REJECTED")
 REQUISITION_STATUT_ANNULEE = ("ANNULEE", "CANCELED", "CANCELLED")
 
+_SOLDE_INITIAL_SQL = """
+SELECT
+    (SELECT COALESCE(SUM(montant_paye), 0)
+     FROM public.encaissements
+     WHERE UPPER(statut_paiement) = ANY(:statuts)
+       AND date_encaissement::date < :date_start)
+  -
+    (SELECT COALESCE(SUM(montant_paye), 0)
+     FROM public.sorties_fonds
+     WHERE date_paiement::date < :date_start)
+AS solde_initial
+"""
+
+# Journal de trésorerie: mouvements retenus par /summary, dans l'ordre chronologique
+_JOURNAL_SQL = """
+SELECT e.date_encaissement AS date_operation,
+       'encaissement' AS sens,
+       e.numero_recu AS piece,
+       COALESCE(ec.nom_denomination, e.client_nom) AS tiers,
+       e.type_operation AS libelle,
+       e.mode_paiement,
+       e.montant_paye AS entree,
+       0::numeric AS sortie,
+       e.id
+FROM public.encaissements e
+LEFT JOIN public.experts_comptables ec ON ec.id = e.expert_comptable_id
+WHERE UPPER(e.statut_paiement) = ANY(:statuts)
+  AND (CAST(:date_start AS date) IS NULL OR e.date_encaissement::date >= CAST(:date_start AS date))
+  AND (CAST(:date_end_excl AS date) IS NULL OR e.date_encaissement::date < CAST(:date_end_excl AS date))
+UNION ALL
+SELECT s.date_paiement,
+       'sortie',
+       COALESCE(r.numero_requisition, s.reference),
+       s.beneficiaire,
+       s.motif,
+       s.mode_paiement,
+       0::numeric,
+       s.montant_paye,
+       s.id
+FROM public.sorties_fonds s
+LEFT JOIN public.requisitions r ON r.id = s.requisition_id
+WHERE (CAST(:date_start AS date) IS NULL OR s.date_paiement::date >= CAST(:date_start AS date))
+  AND (CAST(:date_end_excl AS date) IS NULL OR s.date_paiement::date < CAST(:date_end_excl AS date))
+ORDER BY date_operation, sens, id
+"""
+
+JOURNAL_EXPORT_HEADERS = (
+    "Date",
+    "Sens",
+    "Pièce",
+    "Tiers",
+    "Libellé",
+    "Mode paiement",
+    "Entrée",
+    "Sortie",
+    "Solde",
+)
+
 
 def _parse_date_value(value: str | None) -> date | None:
     if not value:
@@ -65,15 +151,30 @@ def _to_decimal(value: object | None) -> Decimal:
     return Decimal(str(value))
 
 
-@router.get("/summary", response_model=ReportSummaryResponse)
-async def summary(
-    date_debut: str | None = None,
-    date_fin: str | None = None,
-    user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
-) -> ReportSummaryResponse:
-    date_start = _parse_date_value(date_debut)
-    date_end = _parse_date_value(date_fin)
+ENC_GROUPING_DIMENSIONS = ("statut", "mode", "type_operation", "day")
+SORTIES_GROUPING_DIMENSIONS = ("mode", "day")
+
+
+def _decode_grouping_sets(rows, dimensions: tuple[str, ...]) -> dict[str | None, list]:
+    """
+    Répartit les lignes d'une requête GROUPING SETS par dimension groupée.
+
+    `grp` est le masque GROUPING(dim1, ..., dimN) : le bit de poids fort correspond à dim1 et
+    vaut 0 quand la dimension fait partie de l'ensemble. Chaque ensemble ne groupe qu'une
+    dimension ; la clé None reçoit la ligne du total général. Les listes sont triées par clé.
+    """
+    decoded: dict[str | None, list] = {}
+    width = len(dimensions)
+    for row in rows:
+        grouped = [dim for idx, dim in enumerate(dimensions) if not (row.grp >> (width - 1 - idx)) & 1]
+        decoded.setdefault(grouped[0] if grouped else None, []).append(row)
+    for dim, dim_rows in decoded.items():
+        if dim is not None:
+            dim_rows.sort(key=lambda r, d=dim: (getattr(r, d) is None, getattr(r, d) or ""))
+    return decoded
+
+
+async def _compute_summary(db: AsyncSession, date_start: date | None, date_end: date | None) -> ReportSummaryResponse:
     date_end_excl = _end_exclusive(date_end)
     daily_start, daily_end = _daily_range(date_start, date_end)
 
@@ -96,243 +197,142 @@ async def summary(
     try:
         if date_start:
             q_init = await db.execute(
-                text(
-                    """
-                    SELECT
-                        (SELECT COALESCE(SUM(montant_paye), 0)
-                         FROM public.encaissements
-                         WHERE UPPER(statut_paiement) = ANY(:statuts)
-                           AND date_encaissement::date < :date_start)
-                      -
-                        (SELECT COALESCE(SUM(montant_paye), 0)
-                         FROM public.sorties_fonds
-                         WHERE date_paiement::date < :date_start)
-                    AS solde_initial
-                    """
-                ),
+                text(_SOLDE_INITIAL_SQL),
                 {"statuts": list(STATUT_PAIEMENT_INCLUS), "date_start": date_start},
             )
             totals.solde_initial = _to_decimal(q_init.scalar_one())
     except Exception as exc:
         logger.error("Solde initial error: %s", exc)
 
+    enc_daily_map: dict[str, Decimal] = {}
+    sorties_daily_map: dict[str, Decimal] = {}
+    daily_end_excl = _end_exclusive(daily_end)
+
+    # Encaissements: totaux, ventilations et série journalière en un seul parcours.
+    # Les filtres propres à chaque section sont portés par des FILTER sur les agrégats.
     try:
-        enc_res = await db.execute(
+        enc_rows = await db.execute(
             text(
                 """
-                SELECT COALESCE(SUM(montant_paye), 0) AS encaissements_total
-                FROM public.encaissements
-                WHERE UPPER(statut_paiement) = ANY(:statuts)
-                  AND (:date_start IS NULL OR date_encaissement::date >= :date_start)
-                  AND (:date_end_excl IS NULL OR date_encaissement::date < :date_end_excl)
+                WITH base AS (
+                    SELECT UPPER(statut_paiement) AS statut,
+                           mode_paiement AS mode,
+                           type_operation,
+                           date_encaissement::date AS day,
+                           montant_paye,
+                           UPPER(statut_paiement) = ANY(:statuts) AS inclus,
+                           ((CAST(:date_start AS date) IS NULL OR date_encaissement::date >= CAST(:date_start AS date))
+                            AND (CAST(:date_end_excl AS date) IS NULL OR date_encaissement::date < CAST(:date_end_excl AS date))) AS in_range,
+                           (date_encaissement::date >= CAST(:daily_start AS date)
+                            AND date_encaissement::date < CAST(:daily_end_excl AS date)) AS in_daily
+                    FROM public.encaissements
+                    WHERE ((CAST(:date_start AS date) IS NULL OR date_encaissement::date >= CAST(:date_start AS date))
+                           AND (CAST(:date_end_excl AS date) IS NULL OR date_encaissement::date < CAST(:date_end_excl AS date)))
+                       OR (date_encaissement::date >= CAST(:daily_start AS date)
+                           AND date_encaissement::date < CAST(:daily_end_excl AS date))
+                )
+                SELECT GROUPING(statut, mode, type_operation, day) AS grp,
+                       statut, mode, type_operation, day,
+                       COUNT(*) FILTER (WHERE in_range) AS count_all,
+                       COALESCE(SUM(montant_paye) FILTER (WHERE in_range), 0) AS total_all,
+                       COUNT(*) FILTER (WHERE in_range AND inclus) AS count,
+                       COALESCE(SUM(montant_paye) FILTER (WHERE in_range AND inclus), 0) AS total,
+                       COALESCE(SUM(montant_paye) FILTER (WHERE in_daily AND inclus), 0) AS total_daily
+                FROM base
+                GROUP BY GROUPING SETS ((statut), (mode), (type_operation), (day), ())
                 """
             ),
             {
                 "statuts": list(STATUT_PAIEMENT_INCLUS),
                 "date_start": date_start,
                 "date_end_excl": date_end_excl,
+                "daily_start": daily_start,
+                "daily_end_excl": daily_end_excl,
             },
         )
-        totals.encaissements_total = _to_decimal(enc_res.scalar_one())
-
-        sor_res = await db.execute(
-            text(
-                """
-                SELECT COALESCE(SUM(montant_paye), 0) AS sorties_total
-                FROM public.sorties_fonds
-                WHERE (:date_start IS NULL OR date_paiement::date >= :date_start)
-                  AND (:date_end_excl IS NULL OR date_paiement::date < :date_end_excl)
-                """
-            ),
-            {"date_start": date_start, "date_end_excl": date_end_excl},
-        )
-        totals.sorties_total = _to_decimal(sor_res.scalar_one())
-    except Exception as exc:
-        availability.encaissements = False
-        availability.sorties = False
-        logger.error("Flux financiers error: %s", exc)
-
-    totals.flux_periode = totals.encaissements_total - totals.sorties_total
-    totals.solde_final = totals.solde_initial + totals.flux_periode
-
-    try:
-        enc_statut = await db.execute(
-            text(
-                """
-                SELECT UPPER(statut_paiement) AS statut,
-                       COUNT(*) AS count,
-                       COALESCE(SUM(montant_paye),0) AS total
-                FROM public.encaissements
-                WHERE (:date_start IS NULL OR date_encaissement::date >= :date_start)
-                  AND (:date_end_excl IS NULL OR date_encaissement::date < :date_end_excl)
-                GROUP BY UPPER(statut_paiement)
-                ORDER BY UPPER(statut_paiement)
-                """
-            ),
-            {"date_start": date_start, "date_end_excl": date_end_excl},
-        )
+        enc_sets = _decode_grouping_sets(enc_rows, ENC_GROUPING_DIMENSIONS)
+        for row in enc_sets.get(None, []):
+            totals.encaissements_total = _to_decimal(row.total)
         par_statut_paiement = [
-            ReportBreakdownCountTotal(
-                key=row.statut,
-                count=int(row.count or 0),
-                total=_to_decimal(row.total),
-            )
-            for row in enc_statut
+            ReportBreakdownCountTotal(key=row.statut, count=int(row.count_all), total=_to_decimal(row.total_all))
+            for row in enc_sets.get("statut", [])
+            if row.count_all
         ]
-    except Exception as exc:
-        availability.encaissements = False
-        par_statut_paiement = []
-        logger.error("Encaissements par statut error: %s", exc)
-
-    try:
-        enc_modes = await db.execute(
-            text(
-                """
-                SELECT mode_paiement AS mode,
-                       COUNT(*) AS count,
-                       COALESCE(SUM(montant_paye),0) AS total
-                FROM public.encaissements
-                WHERE UPPER(statut_paiement) = ANY(:statuts)
-                  AND (:date_start IS NULL OR date_encaissement::date >= :date_start)
-                  AND (:date_end_excl IS NULL OR date_encaissement::date < :date_end_excl)
-                GROUP BY mode_paiement
-                ORDER BY mode_paiement
-                """
-            ),
-            {
-                "statuts": list(STATUT_PAIEMENT_INCLUS),
-                "date_start": date_start,
-                "date_end_excl": date_end_excl,
-            },
-        )
         par_mode_paiement_enc = [
-            ReportBreakdownCountTotal(
-                key=row.mode,
-                count=int(row.count or 0),
-                total=_to_decimal(row.total),
-            )
-            for row in enc_modes
-        ]
-    except Exception as exc:
-        availability.encaissements = False
-        par_mode_paiement_enc = []
-        logger.error("Encaissements par mode error: %s", exc)
-
-    try:
-        sorties_modes = await db.execute(
-            text(
-                """
-                SELECT mode_paiement AS mode,
-                       COUNT(*) AS count,
-                       COALESCE(SUM(montant_paye),0) AS total
-                FROM public.sorties_fonds
-                WHERE (:date_start IS NULL OR date_paiement::date >= :date_start)
-                  AND (:date_end_excl IS NULL OR date_paiement::date < :date_end_excl)
-                GROUP BY mode_paiement
-                ORDER BY mode_paiement
-                """
-            ),
-            {"date_start": date_start, "date_end_excl": date_end_excl},
-        )
-        par_mode_paiement_sorties = [
-            ReportBreakdownCountTotal(
-                key=row.mode,
-                count=int(row.count or 0),
-                total=_to_decimal(row.total),
-            )
-            for row in sorties_modes
+            ReportBreakdownCountTotal(key=row.mode, count=int(row.count), total=_to_decimal(row.total))
+            for row in enc_sets.get("mode", [])
+            if row.count
         ]
-    except Exception as exc:
-        availability.sorties = False
-        par_mode_paiement_sorties = []
-        logger.error("Sorties par mode error: %s", exc)
-
-    try:
-        enc_types = await db.execute(
-            text(
-                """
-                SELECT type_operation AS type,
-                       COUNT(*) AS count,
-                       COALESCE(SUM(montant_paye),0) AS total
-                FROM public.encaissements
-                WHERE UPPER(statut_paiement) = ANY(:statuts)
-                  AND (:date_start IS NULL OR date_encaissement::date >= :date_start)
-                  AND (:date_end_excl IS NULL OR date_encaissement::date < :date_end_excl)
-                GROUP BY type_operation
-                ORDER BY type_operation
-                """
-            ),
-            {
-                "statuts": list(STATUT_PAIEMENT_INCLUS),
-                "date_start": date_start,
-                "date_end_excl": date_end_excl,
-            },
-        )
         par_type_operation = [
-            ReportBreakdownCountTotal(
-                key=row.type,
-                count=int(row.count or 0),
-                total=_to_decimal(row.total),
-            )
-            for row in enc_types
+            ReportBreakdownCountTotal(key=row.type_operation, count=int(row.count), total=_to_decimal(row.total))
+            for row in enc_sets.get("type_operation", [])
+            if row.count
         ]
+        for row in enc_sets.get("day", []):
+            if row.day and daily_start <= row.day <= daily_end:
+                enc_daily_map[row.day.isoformat()] = _to_decimal(row.total_daily)
     except Exception as exc:
         availability.encaissements = False
+        par_statut_paiement = []
+        par_mode_paiement_enc = []
         par_type_operation = []
-        logger.error("Encaissements par type error: %s", exc)
-
-    enc_daily_map: dict[str, Decimal] = {}
-    sorties_daily_map: dict[str, Decimal] = {}
-    daily_end_excl = _end_exclusive(daily_end)
+        enc_daily_map = {}
+        logger.error("Encaissements grouping sets error: %s", exc)
 
+    # Sorties: total, ventilation par mode et série journalière en un seul parcours
     try:
-        enc_daily = await db.execute(
+        sorties_rows = await db.execute(
             text(
                 """
-                SELECT date_encaissement::date AS day, COALESCE(SUM(montant_paye),0) AS total
-                FROM public.encaissements
-                WHERE UPPER(statut_paiement) = ANY(:statuts)
-                  AND date_encaissement::date >= :daily_start
-                  AND date_encaissement::date < :daily_end_excl
-                GROUP BY day
-                ORDER BY day
+                WITH base AS (
+                    SELECT mode_paiement AS mode,
+                           date_paiement::date AS day,
+                           montant_paye,
+                           ((CAST(:date_start AS date) IS NULL OR date_paiement::date >= CAST(:date_start AS date))
+                            AND (CAST(:date_end_excl AS date) IS NULL OR date_paiement::date < CAST(:date_end_excl AS date))) AS in_range,
+                           (date_paiement::date >= CAST(:daily_start AS date)
+                            AND date_paiement::date < CAST(:daily_end_excl AS date)) AS in_daily
+                    FROM public.sorties_fonds
+                    WHERE ((CAST(:date_start AS date) IS NULL OR date_paiement::date >= CAST(:date_start AS date))
+                           AND (CAST(:date_end_excl AS date) IS NULL OR date_paiement::date < CAST(:date_end_excl AS date)))
+                       OR (date_paiement::date >= CAST(:daily_start AS date)
+                           AND date_paiement::date < CAST(:daily_end_excl AS date))
+                )
+                SELECT GROUPING(mode, day) AS grp,
+                       mode, day,
+                       COUNT(*) FILTER (WHERE in_range) AS count,
+                       COALESCE(SUM(montant_paye) FILTER (WHERE in_range), 0) AS total,
+                       COALESCE(SUM(montant_paye) FILTER (WHERE in_daily), 0) AS total_daily
+                FROM base
+                GROUP BY GROUPING SETS ((mode), (day), ())
                 """
             ),
             {
-                "statuts": list(STATUT_PAIEMENT_INCLUS),
+                "date_start": date_start,
+                "date_end_excl": date_end_excl,
                 "daily_start": daily_start,
                 "daily_end_excl": daily_end_excl,
             },
         )
-        for row in enc_daily:
-            if row.day:
-                enc_daily_map[row.day.isoformat()] = _to_decimal(row.total)
-    except Exception as exc:
-        availability.encaissements = False
-        enc_daily_map = {}
-        logger.error("Encaissements daily error: %s", exc)
-
-    try:
-        sorties_daily = await db.execute(
-            text(
-                """
-                SELECT date_paiement::date AS day, COALESCE(SUM(montant_paye),0) AS total
-                FROM public.sorties_fonds
-                WHERE date_paiement::date >= :daily_start
-                  AND date_paiement::date < :daily_end_excl
-                GROUP BY day
-                ORDER BY day
-                """
-            ),
-            {"daily_start": daily_start, "daily_end_excl": daily_end_excl},
-        )
-        for row in sorties_daily:
-            if row.day:
-                sorties_daily_map[row.day.isoformat()] = _to_decimal(row.total)
+        sorties_sets = _decode_grouping_sets(sorties_rows, SORTIES_GROUPING_DIMENSIONS)
+        for row in sorties_sets.get(None, []):
+            totals.sorties_total = _to_decimal(row.total)
+        par_mode_paiement_sorties = [
+            ReportBreakdownCountTotal(key=row.mode, count=int(row.count), total=_to_decimal(row.total))
+            for row in sorties_sets.get("mode", [])
+            if row.count
+        ]
+        for row in sorties_sets.get("day", []):
+            if row.day and daily_start <= row.day <= daily_end:
+                sorties_daily_map[row.day.isoformat()] = _to_decimal(row.total_daily)
     except Exception as exc:
         availability.sorties = False
+        par_mode_paiement_sorties = []
         sorties_daily_map = {}
-        logger.error("Sorties daily error: %s", exc)
+        logger.error("Sorties grouping sets error: %s", exc)
+
+    totals.flux_periode = totals.encaissements_total - totals.sorties_total
+    totals.solde_final = totals.solde_initial + totals.flux_periode
 
     current = daily_start
     while current <= daily_end:
@@ -355,8 +355,8 @@ async def summary(
                 """
                 SELECT UPPER(status) AS statut, COUNT(*) AS count
                 FROM public.requisitions
-                WHERE (:date_start IS NULL OR created_at::date >= :date_start)
-                  AND (:date_end_excl IS NULL OR created_at::date < :date_end_excl)
+                WHERE (CAST(:date_start AS date) IS NULL OR created_at::date >= CAST(:date_start AS date))
+                  AND (CAST(:date_end_excl AS date) IS NULL OR created_at::date < CAST(:date_end_excl AS date))
                 GROUP BY UPPER(status)
                 ORDER BY UPPER(status)
                 """
@@ -409,3 +409,602 @@ async def summary(
         daily_stats=par_jour,
         period=PeriodInfo(start=daily_start, end=daily_end, label="custom"),
     )
+
+
+def _month_end(month_start: date) -> date:
+    return (month_start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def _snapshot_hash(payload: dict) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _merge_count_totals(groups: list[list[ReportBreakdownCountTotal]]) -> list[ReportBreakdownCountTotal]:
+    merged: dict[str, ReportBreakdownCountTotal] = {}
+    for group in groups:
+        for item in group:
+            acc = merged.setdefault(item.key, ReportBreakdownCountTotal(key=item.key))
+            acc.count += item.count
+            acc.total += item.total
+    return [merged[key] for key in sorted(merged)]
+
+
+def _merge_summaries(
+    parts: list[ReportSummaryResponse],
+    date_start: date,
+    date_end: date,
+) -> ReportSummaryResponse:
+    """Assemble des synthèses de périodes contiguës, dans l'ordre chronologique."""
+    totals = ReportTotals(solde_initial=parts[0].stats.totals.solde_initial)
+    availability = ReportAvailability(encaissements=True, sorties=True, requisitions=True)
+    req_summary = ReportRequisitionsSummary()
+    req_counts: dict[str, int] = {}
+    par_jour: list[ReportDailyStats] = []
+    for part in parts:
+        totals.encaissements_total += part.stats.totals.encaissements_total
+        totals.sorties_total += part.stats.totals.sorties_total
+        availability.encaissements &= part.stats.availability.encaissements
+        availability.sorties &= part.stats.availability.sorties
+        availability.requisitions &= part.stats.availability.requisitions
+        for field in ("total", "en_attente", "approuvees", "rejetees", "annulees"):
+            setattr(req_summary, field, getattr(req_summary, field) + getattr(part.stats.breakdowns.requisitions, field))
+        for item in part.stats.breakdowns.par_statut_requisition:
+            req_counts[item.key] = req_counts.get(item.key, 0) + item.count
+        par_jour.extend(part.daily_stats)
+    totals.flux_periode = totals.encaissements_total - totals.sorties_total
+    totals.solde_final = totals.solde_initial + totals.flux_periode
+
+    breakdowns = [part.stats.breakdowns for part in parts]
+    return ReportSummaryResponse(
+        stats=ReportSummaryStats(
+            totals=totals,
+            breakdowns=ReportBreakdowns(
+                par_statut_paiement=_merge_count_totals([b.par_statut_paiement for b in breakdowns]),
+                par_mode_paiement=ReportModePaiementBreakdown(
+                    encaissements=_merge_count_totals([b.par_mode_paiement.encaissements for b in breakdowns]),
+                    sorties=_merge_count_totals([b.par_mode_paiement.sorties for b in breakdowns]),
+                ),
+                par_type_operation=_merge_count_totals([b.par_type_operation for b in breakdowns]),
+                par_statut_requisition=[
+                    ReportBreakdownCount(key=key, count=req_counts[key]) for key in sorted(req_counts)
+                ],
+                requisitions=req_summary,
+            ),
+            availability=availability,
+        ),
+        daily_stats=par_jour,
+        period=PeriodInfo(start=date_start, end=date_end, label="custom"),
+    )
+
+
+async def _closed_months_prefix(db: AsyncSession, date_start: date, date_end: date) -> list[ReportSummaryResponse]:
+    """
+    Synthèses figées des mois clôturés consécutifs qui ouvrent la période [date_start, date_end].
+
+    S'arrête au premier mois non clôturé, partiellement couvert, ou dont l'empreinte ne
+    correspond plus au contenu stocké.
+    """
+    if date_start.day != 1:
+        return []
+    try:
+        rows = (
+            await db.execute(
+                text(
+                    """
+                    SELECT mois, payload, content_hash
+                    FROM public.report_snapshots
+                    WHERE mois >= :date_start AND mois <= :date_end
+                    ORDER BY mois
+                    """
+                ),
+                {"date_start": date_start, "date_end": date_end},
+            )
+        ).all()
+    except Exception as exc:
+        logger.error("Report snapshots error: %s", exc)
+        return []
+
+    parts: list[ReportSummaryResponse] = []
+    expected = date_start
+    for row in rows:
+        if row.mois != expected or _month_end(row.mois) > date_end:
+            break
+        if _snapshot_hash(row.payload) != row.content_hash:
+            logger.error("Report snapshot %s: empreinte invalide, recalcul", row.mois)
+            break
+        parts.append(ReportSummaryResponse.model_validate(row.payload))
+        expected = _month_end(row.mois) + timedelta(days=1)
+    return parts
+
+
+@router.get("/summary", response_model=ReportSummaryResponse)
+async def summary(
+    date_debut: str | None = None,
+    date_fin: str | None = None,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> ReportSummaryResponse:
+    """
+    Synthèse de trésorerie de la période.
+
+    Les mois clôturés en tête de période sont lus depuis report_snapshots ; seule la fin de
+    période encore ouverte est calculée.
+    """
+    return await _summary_for_period(db, _parse_date_value(date_debut), _parse_date_value(date_fin))
+
+
+async def _summary_for_period(db: AsyncSession, date_start: date | None, date_end: date | None) -> ReportSummaryResponse:
+    if not (date_start and date_end and date_start <= date_end):
+        return await _compute_summary(db, date_start, date_end)
+
+    parts = await _closed_months_prefix(db, date_start, date_end)
+    if not parts:
+        return await _compute_summary(db, date_start, date_end)
+
+    tail_start = parts[-1].period.end + timedelta(days=1)
+    if tail_start <= date_end:
+        parts.append(await _compute_summary(db, tail_start, date_end))
+    logger.info("reports summary snapshots=%s tail_start=%s", len(parts), tail_start)
+    return _merge_summaries(parts, date_start, date_end)
+
+
+@router.get("/snapshots", response_model=list[ReportSnapshotOut])
+async def list_snapshots(
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> list[ReportSnapshotOut]:
+    rows = (await db.execute(select(ReportSnapshot).order_by(ReportSnapshot.mois))).scalars().all()
+    return [_snapshot_out(snap) for snap in rows]
+
+
+def _snapshot_out(snap: ReportSnapshot) -> ReportSnapshotOut:
+    return ReportSnapshotOut(
+        mois=snap.mois,
+        content_hash=snap.content_hash,
+        closed_by=str(snap.closed_by) if snap.closed_by else None,
+        closed_at=snap.closed_at,
+    )
+
+
+@router.post("/snapshots", response_model=ReportSnapshotOut, status_code=status.HTTP_201_CREATED)
+async def close_month(
+    payload: ReportSnapshotCreate,
+    user: User = Depends(require_roles(["admin"])),
+    db: AsyncSession = Depends(get_db),
+) -> ReportSnapshotOut:
+    """
+    Clôture un mois échu : sa synthèse est calculée une fois puis figée dans report_snapshots.
+
+    Les écritures datées dans un mois clôturé sont ensuite refusées (409) ; le verrou du mois
+    attend celles en cours avant le calcul.
+    """
+    mois = date.fromisoformat(f"{payload.mois}-01")
+    if _month_end(mois) >= datetime.now(timezone.utc).date():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Seul un mois échu peut être clôturé")
+
+    await lock_month_for_close(db, mois)
+
+    report = await _compute_summary(db, mois, _month_end(mois))
+    availability = report.stats.availability
+    if not (availability.encaissements and availability.sorties and availability.requisitions):
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Données indisponibles, clôture impossible",
+        )
+
+    data = report.model_dump(mode="json")
+    result = await db.execute(
+        pg_insert(ReportSnapshot)
+        .values(mois=mois, payload=data, content_hash=_snapshot_hash(data), closed_by=user.id)
+        .on_conflict_do_nothing(index_elements=[ReportSnapshot.mois])
+        .returning(ReportSnapshot)
+    )
+    snap = result.scalar_one_or_none()
+    if snap is None:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Mois déjà clôturé")
+    await db.commit()
+    logger.info("reports month closed mois=%s hash=%s user=%s", mois, snap.content_hash, user.id)
+    return _snapshot_out(snap)
+
+
+@router.get("/aging", response_model=ReportAgingResponse)
+async def receivables_aging(
+    as_of: str | None = Query(default=None, description="Date de référence (YYYY-MM-DD), défaut: aujourd'hui"),
+    expert_limit: int = Query(default=100, ge=1, le=5000, description="Nombre max d'experts (plus gros restants dus)"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> ReportAgingResponse:
+    """
+    Balance âgée des encaissements non soldés (non_paye / partiel).
+
+    Une seule requête agrégée (GROUPING SETS) sur l'index partiel ix_encaissements_unpaid_date
+    produit les totaux et les ventilations par type_client, type_operation et expert ; seuls
+    les `expert_limit` experts les plus débiteurs sont renvoyés.
+    """
+    ref_day = _parse_date_value(as_of) or datetime.now(timezone.utc).date()
+
+    result = await db.execute(
+        text(
+            """
+            WITH base AS (
+                SELECT e.type_client,
+                       e.type_operation,
+                       e.expert_comptable_id,
+                       GREATEST(e.montant_total - e.montant_paye, 0) AS restant,
+                       CAST(:as_of AS date) - e.date_encaissement::date AS age
+                FROM public.encaissements e
+                WHERE e.statut_paiement IN ('non_paye','partiel')
+                  AND e.date_encaissement < CAST(:as_of_excl AS date)
+            ),
+            agg AS (
+                SELECT GROUPING(type_client) AS g_type_client,
+                       GROUPING(type_operation) AS g_type_operation,
+                       GROUPING(expert_comptable_id) AS g_expert,
+                       type_client,
+                       type_operation,
+                       expert_comptable_id,
+                       COUNT(*) AS count,
+                       COALESCE(SUM(restant), 0) AS total,
+                       COALESCE(SUM(restant) FILTER (WHERE age <= 30), 0) AS jours_0_30,
+                       COALESCE(SUM(restant) FILTER (WHERE age BETWEEN 31 AND 60), 0) AS jours_31_60,
+                       COALESCE(SUM(restant) FILTER (WHERE age BETWEEN 61 AND 90), 0) AS jours_61_90,
+                       COALESCE(SUM(restant) FILTER (WHERE age > 90), 0) AS jours_plus_90
+                FROM base
+                GROUP BY GROUPING SETS ((type_client), (type_operation), (expert_comptable_id), ())
+            ),
+            ranked AS (
+                SELECT agg.*,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY g_type_client, g_type_operation, g_expert
+                           ORDER BY total DESC
+                       ) AS rang
+                FROM agg
+                WHERE NOT (g_expert = 0 AND expert_comptable_id IS NULL)
+            )
+            SELECT r.*, ec.numero_ordre, ec.nom_denomination
+            FROM ranked r
+            LEFT JOIN public.experts_comptables ec
+              ON r.g_expert = 0 AND ec.id = r.expert_comptable_id
+            WHERE r.g_expert = 1 OR r.rang <= :expert_limit
+            ORDER BY r.g_type_client, r.g_type_operation, r.g_expert, r.rang
+            """
+        ),
+        {"as_of": ref_day, "as_of_excl": _end_exclusive(ref_day), "expert_limit": expert_limit},
+    )
+
+    response = ReportAgingResponse(as_of=ref_day)
+    for row in result:
+        buckets = {
+            "count": int(row.count or 0),
+            "total": _to_decimal(row.total),
+            "jours_0_30": _to_decimal(row.jours_0_30),
+            "jours_31_60": _to_decimal(row.jours_31_60),
+            "jours_61_90": _to_decimal(row.jours_61_90),
+            "jours_plus_90": _to_decimal(row.jours_plus_90),
+        }
+        if row.g_type_client == 0:
+            response.par_type_client.append(ReportAgingRow(key=row.type_client, **buckets))
+        elif row.g_type_operation == 0:
+            response.par_type_operation.append(ReportAgingRow(key=row.type_operation, **buckets))
+        elif row.g_expert == 0:
+            response.par_expert.append(
+                ReportAgingRow(
+                    key=row.numero_ordre or str(row.expert_comptable_id),
+                    label=row.nom_denomination,
+                    **buckets,
+                )
+            )
+        else:
+            response.totals = ReportAgingBuckets(**buckets)
+
+    return response
+
+
+# Cube: dimension -> expression SQL sur le CTE `flux` (liste blanche, comme _parse_order).
+# L'ordre de ce dict est l'ordre canonique des colonnes et du tri des lignes.
+CUBE_DIMENSIONS = {
+    "sens": "sens",
+    "month": "to_char(date_op, 'YYYY-MM')",
+    "week": "to_char(date_op, 'IYYY-\"W\"IW')",
+    "day": "to_char(date_op, 'YYYY-MM-DD')",
+    "type_operation": "type_operation",
+    "mode_paiement": "mode_paiement",
+    "statut_paiement": "statut_paiement",
+    "type_client": "type_client",
+    "rubrique_code": "rubrique_code",
+    "type_sortie": "type_sortie",
+}
+CUBE_MEASURES = {
+    "count": "COUNT(*)",
+    "montant_paye": "COALESCE(SUM(montant_paye), 0)",
+    "montant_total": "COALESCE(SUM(montant_total), 0)",
+}
+# Dimensions propres à un seul côté du flux
+_CUBE_DIMENSIONS_ENCAISSEMENT = ("statut_paiement", "type_client", "type_operation")
+_CUBE_DIMENSIONS_SORTIE = ("rubrique_code", "type_sortie")
+_CUBE_CACHE_MAX_ENTRIES = 128
+
+_CUBE_ENCAISSEMENTS_SQL = """
+    SELECT 'encaissement' AS sens,
+           e.date_encaissement::date AS date_op,
+           e.type_operation,
+           e.mode_paiement,
+           e.statut_paiement,
+           e.type_client,
+           NULL::varchar AS rubrique_code,
+           NULL::varchar AS type_sortie,
+           e.montant_paye,
+           e.montant_total
+    FROM public.encaissements e
+    WHERE (CAST(:date_start AS date) IS NULL OR e.date_encaissement::date >= CAST(:date_start AS date))
+      AND (CAST(:date_end_excl AS date) IS NULL OR e.date_encaissement::date < CAST(:date_end_excl AS date))
+"""
+# Une sortie est réglée en une fois : son montant total est le montant payé
+_CUBE_SORTIES_SQL = """
+    SELECT 'sortie' AS sens,
+           s.date_paiement::date AS date_op,
+           NULL::varchar AS type_operation,
+           s.mode_paiement,
+           NULL::varchar AS statut_paiement,
+           NULL::varchar AS type_client,
+           s.rubrique_code,
+           s.type_sortie,
+           s.montant_paye,
+           s.montant_paye AS montant_total
+    FROM public.sorties_fonds s
+    WHERE (CAST(:date_start AS date) IS NULL OR s.date_paiement::date >= CAST(:date_start AS date))
+      AND (CAST(:date_end_excl AS date) IS NULL OR s.date_paiement::date < CAST(:date_end_excl AS date))
+"""
+
+_cube_cache: OrderedDict[str, tuple[float, ReportCubeResponse]] = OrderedDict()
+
+
+def _parse_cube_list(value: str | None, allowed: dict[str, str], label: str) -> list[str]:
+    """Valide une liste séparée par des virgules et la ramène à l'ordre canonique de `allowed`."""
+    requested = {part.strip() for part in (value or "").split(",") if part.strip()}
+    unknown = sorted(requested - allowed.keys())
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{label} inconnue(s): {', '.join(unknown)} (autorisées: {', '.join(allowed)})",
+        )
+    return [name for name in allowed if name in requested]
+
+
+def _cube_sql(sens: str, dimensions: list[str], measures: list[str]) -> str:
+    parts = []
+    if sens in ("encaissement", "tous"):
+        parts.append(_CUBE_ENCAISSEMENTS_SQL)
+    if sens in ("sortie", "tous"):
+        parts.append(_CUBE_SORTIES_SQL)
+    aliases = [f"d_{name}" for name in dimensions]
+    base_columns = [f"{CUBE_DIMENSIONS[name]} AS d_{name}" for name in dimensions]
+    measure_columns = [f"{CUBE_MEASURES[name]} AS m_{name}" for name in measures]
+    if aliases:
+        grouping = f"GROUPING({', '.join(aliases)}) AS grp"
+        # sens=tous : sous-totaux par sens au lieu d'un total qui additionnerait entrées et sorties
+        # (aucun si `sens` est la seule dimension : les lignes sont déjà ces sous-totaux)
+        if sens != "tous":
+            grouping_sets = f"({', '.join(aliases)}), ()"
+        elif aliases != ["d_sens"]:
+            grouping_sets = f"({', '.join(aliases)}), (d_sens)"
+        else:
+            grouping_sets = "(d_sens)"
+        group_by = f"GROUP BY GROUPING SETS ({grouping_sets})"
+        order_by = f"ORDER BY grp, {', '.join(f'{alias} NULLS LAST' for alias in aliases)}"
+    else:
+        grouping, group_by, order_by = "1 AS grp", "", ""
+    return f"""
+        WITH flux AS ({' UNION ALL '.join(parts)}),
+        cube_base AS (
+            SELECT {', '.join(base_columns + ['montant_paye', 'montant_total'])}
+            FROM flux
+        )
+        SELECT {', '.join(aliases + [grouping] + measure_columns)}
+        FROM cube_base
+        {group_by}
+        {order_by}
+    """
+
+
+@router.get("/cube", response_model=ReportCubeResponse)
+async def treasury_cube(
+    dimensions: str | None = Query(default="month", description=f"Dimensions séparées par des virgules: {', '.join(CUBE_DIMENSIONS)}"),
+    measures: str | None = Query(default="count,montant_paye", description=f"Mesures: {', '.join(CUBE_MEASURES)}"),
+    sens: str = Query(default="encaissement", description="encaissement, sortie ou tous"),
+    date_debut: str | None = None,
+    date_fin: str | None = None,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> ReportCubeResponse:
+    """
+    Tableau croisé des flux de trésorerie, calculé en une requête GROUPING SETS.
+
+    Dimensions et mesures sont validées contre CUBE_DIMENSIONS / CUBE_MEASURES puis remises dans
+    l'ordre canonique ; la requête normalisée sert de clé au cache mémoire
+    (`report_cube_cache_seconds`). Avec sens=tous, la dimension `sens` est ajoutée pour ne jamais
+    additionner entrées et sorties : `totals` reste vide et `totals_by_sens` donne le total de
+    chaque sens.
+    """
+    if sens not in ("encaissement", "sortie", "tous"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="sens invalide (encaissement, sortie ou tous)")
+    dims = _parse_cube_list(dimensions, CUBE_DIMENSIONS, "dimension")
+    if sens == "tous" and "sens" not in dims:
+        dims.insert(0, "sens")
+    other_side = _CUBE_DIMENSIONS_SORTIE if sens == "encaissement" else _CUBE_DIMENSIONS_ENCAISSEMENT if sens == "sortie" else ()
+    invalid = [name for name in dims if name in other_side]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"dimension(s) sans objet pour sens={sens}: {', '.join(invalid)}",
+        )
+    meas = _parse_cube_list(measures, CUBE_MEASURES, "mesure")
+    if not meas:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="au moins une mesure est requise")
+
+    date_start = _parse_date_value(date_debut)
+    date_end = _parse_date_value(date_fin)
+    cache_key = json.dumps(
+        {"sens": sens, "dimensions": dims, "measures": meas, "start": str(date_start), "end": str(date_end)},
+        sort_keys=True,
+    )
+    now = time.monotonic()
+    cached = _cube_cache.get(cache_key)
+    if cached is not None and cached[0] > now:
+        _cube_cache.move_to_end(cache_key)
+        return cached[1]
+
+    result = await db.execute(
+        text(_cube_sql(sens, dims, meas)),
+        {"date_start": date_start, "date_end_excl": _end_exclusive(date_end)},
+    )
+    response = ReportCubeResponse(
+        period=PeriodInfo(start=date_start, end=date_end),
+        sens=sens,
+        dimensions=dims,
+        measures=meas,
+    )
+    for row in result.mappings():
+        cube_row = ReportCubeRow(
+            dimensions={name: row[f"d_{name}"] for name in dims} if row["grp"] == 0 else {},
+            **{name: row[f"m_{name}"] for name in meas},
+        )
+        if row["grp"] == 0:
+            response.rows.append(cube_row)
+            if dims == ["sens"]:
+                response.totals_by_sens[row["d_sens"]] = cube_row.model_copy(update={"dimensions": {}})
+        elif sens == "tous":
+            response.totals_by_sens[row["d_sens"]] = cube_row
+        else:
+            response.totals = cube_row
+
+    _cube_cache[cache_key] = (now + settings.report_cube_cache_seconds, response)
+    while len(_cube_cache) > _CUBE_CACHE_MAX_ENTRIES:
+        _cube_cache.popitem(last=False)
+    logger.info("reports cube dims=%s measures=%s sens=%s rows=%s", dims, meas, sens, len(response.rows))
+    return response
+
+
+async def _journal_with_solde(rows, solde: Decimal):
+    async for row in rows:
+        solde += _to_decimal(row.entree) - _to_decimal(row.sortie)
+        yield (
+            row.date_operation,
+            row.sens,
+            row.piece,
+            row.tiers,
+            row.libelle,
+            row.mode_paiement,
+            row.entree,
+            row.sortie,
+            solde,
+        )
+
+
+@router.get("/export")
+async def export_journal(
+    date_debut: str | None = None,
+    date_fin: str | None = None,
+    format: str = Query(default="csv", description="csv ou xlsx"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """
+    Journal de trésorerie de la période (encaissements retenus par /summary et sorties de fonds)
+    avec solde cumulé à partir du solde initial, exporté en CSV/XLSX par curseur serveur.
+    """
+    fmt = check_export_format(format)
+    date_start = parse_export_date(date_debut, "date_debut")
+    date_end = parse_export_date(date_fin, "date_fin")
+    date_end_excl = _end_exclusive(date_end)
+
+    solde_initial = Decimal("0")
+    if date_start:
+        q_init = await db.execute(
+            text(_SOLDE_INITIAL_SQL),
+            {"statuts": list(STATUT_PAIEMENT_INCLUS), "date_start": date_start},
+        )
+        solde_initial = _to_decimal(q_init.scalar_one())
+
+    logger.info(
+        "reports export format=%s date_debut=%s date_fin=%s solde_initial=%s",
+        fmt,
+        date_start,
+        date_end,
+        solde_initial,
+    )
+    rows = stream_rows(
+        db.bind,
+        text(_JOURNAL_SQL),
+        {
+            "statuts": list(STATUT_PAIEMENT_INCLUS),
+            "date_start": date_start,
+            "date_end_excl": date_end_excl,
+        },
+    )
+    return export_response(
+        fmt=fmt,
+        filename=export_filename("journal_tresorerie", date_start, date_end),
+        headers=JOURNAL_EXPORT_HEADERS,
+        rows=_journal_with_solde(rows, solde_initial),
+        sheet_title="Journal",
+    )
+
+
+def _job_out(job: ReportJob) -> ReportJobOut:
+    return ReportJobOut(
+        id=str(job.id),
+        kind=job.kind,
+        status=job.status,
+        params=job.params,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        expires_at=job.expires_at,
+        error=job.error,
+        result=load_result(job),
+    )
+
+
+@router.post("/jobs", response_model=ReportJobOut, status_code=status.HTTP_202_ACCEPTED)
+async def create_report_job(
+    payload: ReportJobCreate,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> ReportJobOut:
+    """
+    Lance le calcul d'une synthèse en arrière-plan ; le résultat se récupère via GET /reports/jobs/{id}.
+
+    Les demandes identiques en cours ou récentes sont regroupées sur le même job.
+    """
+    date_start = _parse_date_value(payload.date_debut)
+    date_end = _parse_date_value(payload.date_fin)
+    params = {
+        "date_debut": date_start.isoformat() if date_start else None,
+        "date_fin": date_end.isoformat() if date_end else None,
+    }
+
+    async def compute(session: AsyncSession) -> ReportSummaryResponse:
+        return await _summary_for_period(session, date_start, date_end)
+
+    job = await submit_job(db, kind=payload.kind, params=params, created_by=user.id, compute=compute)
+    return _job_out(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobOut)
+async def get_report_job(
+    job_id: str,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> ReportJobOut:
+    try:
+        job_uid = uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid job_id UUID")
+    job = await db.get(ReportJob, job_uid)
+    if job is None or (job.expires_at is not None and job.expires_at <= datetime.now(timezone.utc)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job introuvable ou expiré")
+    return _job_out(job)
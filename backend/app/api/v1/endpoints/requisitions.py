@@ -2,22 +2,45 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime, timezone
+from decimal import Decimal
 import logging
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func, select, update
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
 from app.db.session import get_db
+from app.models.ligne_requisition import LigneRequisition
 from app.models.requisition import Requisition
 from app.models.user import User
-from app.schemas.requisition import RequisitionCreate, RequisitionOut, RequisitionUpdate, RequisitionWithUserOut
+from app.schemas.requisition import (
+    RequisitionBulkActionRequest,
+    RequisitionBulkActionResponse,
+    RequisitionBulkSkipped,
+    RequisitionCreate,
+    RequisitionOut,
+    RequisitionUpdate,
+    RequisitionWithLignesCreate,
+    RequisitionWithLignesOut,
+    RequisitionWithUserOut,
+)
+from app.services.budgets import apply_engagement, is_engagee
+from app.services.pdf import get_print_template, render_pdf, render_requisition
 
 router = APIRouter()
 logger = logging.getLogger("onec_cpk_api.requisitions")
 
+# Actions groupées de la file de validation: statuts de départ admis et statut d'arrivée
+_PENDING_STATUSES = ("EN_ATTENTE", "A_VALIDER", "brouillon")
+BULK_ACTIONS: dict[str, tuple[tuple[str, ...], str]] = {
+    "validate": (_PENDING_STATUSES, "VALIDEE"),
+    "reject": (_PENDING_STATUSES + ("VALIDEE",), "REJETEE"),
+    "approve": (("VALIDEE",), "APPROUVEE"),
+}
+
 
 def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
@@ -71,6 +94,8 @@ def _requisition_out(
         "mode_paiement": req.mode_paiement,
         "type_requisition": req.type_requisition,
         "montant_total": float(req.montant_total or 0),
+        "montant_paye_cumule": float(req.montant_paye_cumule or 0),
+        "reste_a_payer": float((req.montant_total or 0) - (req.montant_paye_cumule or 0)),
         "status": req.status,
         "statut": req.status,
         "created_by": str(req.created_by) if req.created_by else None,
@@ -117,6 +142,14 @@ def _parse_order(order: str | None):
     return col.desc() if direction.lower() == "desc" else col.asc()
 
 
+async def _sync_engagement(db: AsyncSession, req: Requisition, previous_status: str | None) -> None:
+    # Engage / désengage les lignes sur le budget des rubriques au changement de statut. L'appelant
+    # verrouille la réquisition (FOR UPDATE) : deux transitions concurrentes ne comptent pas deux fois.
+    was, now = is_engagee(previous_status), is_engagee(req.status)
+    if was != now:
+        await apply_engagement(db, [req.id], 1 if now else -1)
+
+
 @router.post("/generate-numero")
 async def generate_numero_requisition(
     user: User = Depends(get_current_user),
@@ -254,6 +287,81 @@ async def create_requisition(
     return _requisition_out(req)
 
 
+@router.post("/with-lignes", response_model=RequisitionWithLignesOut, status_code=status.HTTP_201_CREATED)
+async def create_requisition_with_lignes(
+    payload: RequisitionWithLignesCreate,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> RequisitionWithLignesOut:
+    """
+    Crée une réquisition et ses lignes dans une seule transaction.
+
+    Le montant de chaque ligne et le montant_total de la réquisition sont calculés ici ; les lignes
+    sont écrites par un INSERT multi-lignes ... RETURNING.
+    """
+    status_value = _status_from_payload(payload) or "EN_ATTENTE"
+    created_by = None
+    if payload.created_by:
+        try:
+            created_by = uuid.UUID(payload.created_by)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid created_by")
+
+    rows = [
+        {
+            "rubrique": item.rubrique,
+            "description": item.description,
+            "quantite": item.quantite,
+            "montant_unitaire": item.montant_unitaire,
+            "montant_total": (item.montant_unitaire * item.quantite).quantize(Decimal("0.01")),
+        }
+        for item in payload.lignes
+    ]
+    req = Requisition(
+        numero_requisition=payload.numero_requisition,
+        objet=payload.objet,
+        mode_paiement=payload.mode_paiement,
+        type_requisition=payload.type_requisition,
+        montant_total=sum((row["montant_total"] for row in rows), Decimal("0")),
+        status=status_value,
+        created_by=created_by,
+        a_valoir=bool(payload.a_valoir),
+        instance_beneficiaire=payload.instance_beneficiaire,
+        notes_a_valoir=payload.notes_a_valoir,
+        created_at=_utcnow(),
+        updated_at=_utcnow(),
+    )
+    db.add(req)
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="numero_requisition already exists")
+
+    for row in rows:
+        row["id"] = uuid.uuid4()
+        row["requisition_id"] = req.id
+    lignes = (await db.scalars(insert(LigneRequisition).returning(LigneRequisition), rows)).all()
+    await _sync_engagement(db, req, None)
+    await db.commit()
+
+    return RequisitionWithLignesOut(
+        **_requisition_out(req),
+        lignes=[
+            {
+                "id": str(l.id),
+                "requisition_id": str(l.requisition_id),
+                "rubrique": l.rubrique,
+                "description": l.description,
+                "quantite": l.quantite,
+                "montant_unitaire": l.montant_unitaire,
+                "montant_total": l.montant_total,
+            }
+            for l in lignes
+        ],
+    )
+
+
 @router.put("/{requisition_id}", response_model=RequisitionOut)
 async def update_requisition(
     requisition_id: str,
@@ -266,10 +374,11 @@ async def update_requisition(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid requisition_id")
 
-    res = await db.execute(select(Requisition).where(Requisition.id == rid))
+    res = await db.execute(select(Requisition).where(Requisition.id == rid).with_for_update())
     req = res.scalar_one_or_none()
     if not req:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requisition not found")
+    previous_status = req.status
 
     if payload.objet is not None:
         req.objet = payload.objet
@@ -308,11 +417,91 @@ async def update_requisition(
 
     req.updated_at = payload.updated_at or _utcnow()
 
+    await _sync_engagement(db, req, previous_status)
     await db.commit()
     await db.refresh(req)
     return _requisition_out(req)
 
 
+@router.post("/bulk", response_model=RequisitionBulkActionResponse)
+async def bulk_requisition_action(
+    payload: RequisitionBulkActionRequest,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> RequisitionBulkActionResponse:
+    """
+    Valide, rejette ou approuve un lot de réquisitions en un seul UPDATE ensembliste.
+
+    Seules les réquisitions dont le statut admet l'action sont modifiées (condition portée par
+    l'UPDATE, donc sûre face aux traitements concurrents) ; les autres sont renvoyées dans
+    `skipped` avec leur statut courant.
+    """
+    allowed, target = BULK_ACTIONS[payload.action]
+    skipped: list[RequisitionBulkSkipped] = []
+    ids: list[uuid.UUID] = []
+    for raw in dict.fromkeys(payload.ids):
+        try:
+            ids.append(uuid.UUID(raw))
+        except ValueError:
+            skipped.append(RequisitionBulkSkipped(id=raw, reason="invalid_id"))
+
+    now = _utcnow()
+    values: dict[str, Any] = {"status": target, "updated_at": now}
+    if payload.action == "approve":
+        values.update(approuvee_par=user.id, approuvee_le=now)
+    else:
+        values.update(validee_par=user.id, validee_le=now)
+    if payload.action == "reject":
+        values["motif_rejet"] = payload.motif_rejet
+
+    # Verrouillage dans l'ordre des ids (pas d'interblocage entre deux lots) et statut précédent
+    # conservé pour l'engagement budgétaire
+    prev = (
+        select(Requisition.id, Requisition.status.label("previous_status"))
+        .where(Requisition.id.in_(ids), Requisition.status.in_(allowed))
+        .order_by(Requisition.id)
+        .with_for_update()
+        .cte("prev")
+    )
+    result = await db.execute(
+        update(Requisition)
+        .where(Requisition.id == prev.c.id, Requisition.status.in_(allowed))
+        .values(**values)
+        .returning(Requisition.id, prev.c.previous_status),
+        execution_options={"synchronize_session": False},
+    )
+    changed = result.all()
+    engaged = [row.id for row in changed if not is_engagee(row.previous_status) and is_engagee(target)]
+    released = [row.id for row in changed if is_engagee(row.previous_status) and not is_engagee(target)]
+    await apply_engagement(db, engaged, 1)
+    await apply_engagement(db, released, -1)
+    await db.commit()
+
+    updated_ids = {row.id for row in changed}
+    res = await db.execute(
+        select(Requisition).where(Requisition.id.in_(ids)).execution_options(populate_existing=True)
+    )
+    found = {req.id: req for req in res.scalars().all()}
+    updated: list[dict[str, Any]] = []
+    for rid in ids:
+        req = found.get(rid)
+        if req is None:
+            skipped.append(RequisitionBulkSkipped(id=str(rid), reason="not_found"))
+        elif rid in updated_ids:
+            updated.append(_requisition_out(req))
+        else:
+            skipped.append(RequisitionBulkSkipped(id=str(rid), reason="status_conflict", status=req.status))
+
+    logger.info(
+        "requisitions bulk action=%s updated=%s skipped=%s user=%s",
+        payload.action,
+        len(updated),
+        len(skipped),
+        user.id,
+    )
+    return RequisitionBulkActionResponse(action=payload.action, updated=updated, skipped=skipped)
+
+
 @router.post("/{requisition_id}/validate", response_model=RequisitionOut)
 async def validate_requisition(
     requisition_id: str,
@@ -324,15 +513,17 @@ async def validate_requisition(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid requisition_id")
 
-    res = await db.execute(select(Requisition).where(Requisition.id == rid))
+    res = await db.execute(select(Requisition).where(Requisition.id == rid).with_for_update())
     req = res.scalar_one_or_none()
     if not req:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requisition not found")
+    previous_status = req.status
 
     req.status = "VALIDEE"
     req.validee_par = user.id
     req.validee_le = _utcnow()
     req.updated_at = _utcnow()
+    await _sync_engagement(db, req, previous_status)
     await db.commit()
     await db.refresh(req)
     return _requisition_out(req)
@@ -350,16 +541,62 @@ async def reject_requisition(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid requisition_id")
 
-    res = await db.execute(select(Requisition).where(Requisition.id == rid))
+    res = await db.execute(select(Requisition).where(Requisition.id == rid).with_for_update())
     req = res.scalar_one_or_none()
     if not req:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requisition not found")
+    previous_status = req.status
 
     req.status = "REJETEE"
     req.motif_rejet = payload.get("motif_rejet")
     req.validee_par = user.id
     req.validee_le = _utcnow()
     req.updated_at = _utcnow()
+    await _sync_engagement(db, req, previous_status)
     await db.commit()
     await db.refresh(req)
     return _requisition_out(req)
+
+
+@router.get("/{requisition_id}/pdf")
+async def get_requisition_pdf(
+    requisition_id: str,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> Response:
+    """Bon de réquisition au format PDF, rendu côté serveur avec les paramètres d'impression."""
+    try:
+        rid = uuid.UUID(requisition_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid requisition_id")
+
+    req = (await db.execute(select(Requisition).where(Requisition.id == rid))).scalar_one_or_none()
+    if not req:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requisition not found")
+    lignes = (
+        await db.execute(
+            select(LigneRequisition).where(LigneRequisition.requisition_id == rid).order_by(LigneRequisition.rubrique, LigneRequisition.id)
+        )
+    ).scalars().all()
+
+    template = await get_print_template(db)
+    pdf_bytes = await render_pdf(
+        render_requisition,
+        template,
+        _requisition_out(req),
+        [
+            {
+                "rubrique": ligne.rubrique,
+                "description": ligne.description,
+                "quantite": ligne.quantite,
+                "montant_unitaire": ligne.montant_unitaire,
+                "montant_total": ligne.montant_total,
+            }
+            for ligne in lignes
+        ],
+    )
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="{req.numero_requisition}.pdf"'},
+    )
@@ -12,6 +12,7 @@ from app.db.session import get_db
 from app.models.print_settings import PrintSettings
 from app.models.user import User
 from app.schemas.settings import PrintSettingsResponse, PrintSettingsUpdate
+from app.services.pdf import invalidate_print_template
 
 router = APIRouter()
 
@@ -100,5 +101,6 @@ async def update_print_settings(
 
     await db.commit()
     await db.refresh(settings)
+    invalidate_print_template()
 
     return _settings_to_response(settings)
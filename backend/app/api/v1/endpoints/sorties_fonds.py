@@ -7,7 +7,8 @@ import logging
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
@@ -17,10 +18,34 @@ from app.models.sortie_fonds import SortieFonds
 from app.models.user import User
 from app.schemas.requisition import RequisitionOut
 from app.schemas.sortie_fonds import SortieFondsCreate, SortieFondsOut
+from app.services.budgets import apply_engagement, apply_paiement, is_engagee
+from app.services.closed_months import ensure_months_open
+from app.services.exports import (
+    check_export_format,
+    export_filename,
+    export_response,
+    parse_export_date,
+    stream_rows,
+)
 
 router = APIRouter()
 logger = logging.getLogger("onec_cpk_api.sorties_fonds")
 
+# Réquisitions qui ne peuvent plus recevoir de décaissement
+REQUISITION_STATUTS_CLOS = ("REJETEE", "REJECTED", "ANNULEE", "CANCELED", "CANCELLED")
+
+EXPORT_HEADERS = (
+    "Date paiement",
+    "Type sortie",
+    "N° réquisition",
+    "Rubrique",
+    "Bénéficiaire",
+    "Motif",
+    "Mode paiement",
+    "Référence",
+    "Montant payé",
+)
+
 
 def _parse_datetime(value: str | None, end_of_day: bool = False) -> datetime | None:
     if not value:
@@ -74,6 +99,8 @@ def _requisition_out(req: Requisition) -> RequisitionOut:
         mode_paiement=req.mode_paiement,
         type_requisition=req.type_requisition,
         montant_total=_to_decimal(req.montant_total),
+        montant_paye_cumule=_to_decimal(req.montant_paye_cumule),
+        reste_a_payer=_to_decimal(req.montant_total) - _to_decimal(req.montant_paye_cumule),
         status=req.status,
         statut=req.status,
         created_by=str(req.created_by) if req.created_by else None,
@@ -129,6 +156,37 @@ def _parse_order(order: str | None):
     return col.desc() if direction.lower() == "desc" else col.asc()
 
 
+def _apply_list_filters(
+    query,
+    *,
+    start_dt: datetime | None,
+    end_excl_dt: datetime | None,
+    type_sortie: str | None,
+    mode_paiement: str | None,
+    requisition_id: str | None,
+    reference: str | None,
+):
+    """Filtres communs à la liste et à l'export."""
+    if start_dt:
+        query = query.where(SortieFonds.date_paiement >= start_dt)
+    if end_excl_dt:
+        query = query.where(SortieFonds.date_paiement < end_excl_dt)
+
+    if type_sortie:
+        query = query.where(SortieFonds.type_sortie == type_sortie)
+    if mode_paiement:
+        query = query.where(SortieFonds.mode_paiement == mode_paiement)
+    if reference:
+        query = query.where(SortieFonds.reference.ilike(f"%{reference}%"))
+    if requisition_id:
+        try:
+            req_uid = uuid.UUID(requisition_id)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid requisition_id UUID")
+        query = query.where(SortieFonds.requisition_id == req_uid)
+    return query
+
+
 @router.get("", response_model=list[SortieFondsOut])
 async def list_sorties_fonds(
     include: str | None = Query(default=None, description="Relations à inclure (requisition)"),
@@ -176,23 +234,15 @@ async def list_sorties_fonds(
     else:
         query = select(SortieFonds)
 
-    if start_dt:
-        query = query.where(SortieFonds.date_paiement >= start_dt)
-    if end_excl_dt:
-        query = query.where(SortieFonds.date_paiement < end_excl_dt)
-
-    if type_sortie:
-        query = query.where(SortieFonds.type_sortie == type_sortie)
-    if mode_paiement:
-        query = query.where(SortieFonds.mode_paiement == mode_paiement)
-    if reference:
-        query = query.where(SortieFonds.reference.ilike(f"%{reference}%"))
-    if requisition_id:
-        try:
-            req_uid = uuid.UUID(requisition_id)
-        except ValueError:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid requisition_id UUID")
-        query = query.where(SortieFonds.requisition_id == req_uid)
+    query = _apply_list_filters(
+        query,
+        start_dt=start_dt,
+        end_excl_dt=end_excl_dt,
+        type_sortie=type_sortie,
+        mode_paiement=mode_paiement,
+        requisition_id=requisition_id,
+        reference=reference,
+    )
 
     query = query.order_by(_parse_order(order)).offset(offset).limit(limit)
 
@@ -212,6 +262,122 @@ async def list_sorties_fonds(
     return [_sortie_out(sortie) for sortie in sorties]
 
 
+@router.get("/export")
+async def export_sorties_fonds(
+    format: str = Query(default="csv", description="csv ou xlsx"),
+    date_debut: str | None = Query(default=None),
+    date_fin: str | None = Query(default=None),
+    type_sortie: str | None = Query(default=None),
+    mode_paiement: str | None = Query(default=None),
+    requisition_id: str | None = Query(default=None),
+    reference: str | None = Query(default=None),
+    order: str | None = Query(default=None, description="Ex: date_paiement.desc"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """Export CSV/XLSX des sorties de fonds filtrées comme la liste, lu par curseur serveur."""
+    fmt = check_export_format(format)
+    date_start = parse_export_date(date_debut, "date_debut")
+    date_end = parse_export_date(date_fin, "date_fin")
+    start_dt = _start_of_day(date_start)
+    end_excl_dt = _end_exclusive(date_end)
+
+    query = select(
+        SortieFonds.date_paiement,
+        SortieFonds.type_sortie,
+        Requisition.numero_requisition,
+        SortieFonds.rubrique_code,
+        SortieFonds.beneficiaire,
+        SortieFonds.motif,
+        SortieFonds.mode_paiement,
+        SortieFonds.reference,
+        SortieFonds.montant_paye,
+    ).outerjoin(Requisition, SortieFonds.requisition_id == Requisition.id)
+    query = _apply_list_filters(
+        query,
+        start_dt=start_dt,
+        end_excl_dt=end_excl_dt,
+        type_sortie=type_sortie,
+        mode_paiement=mode_paiement,
+        requisition_id=requisition_id,
+        reference=reference,
+    ).order_by(_parse_order(order), SortieFonds.id)
+
+    logger.info(
+        "sorties_fonds export format=%s date_debut=%s date_fin=%s user=%s",
+        fmt,
+        date_start,
+        date_end,
+        user.id,
+    )
+    return export_response(
+        fmt=fmt,
+        filename=export_filename("sorties_fonds", date_start, date_end),
+        headers=EXPORT_HEADERS,
+        rows=stream_rows(db.bind, query),
+        sheet_title="Sorties de fonds",
+    )
+
+
+async def _record_requisition_payout(
+    db: AsyncSession,
+    requisition_id: uuid.UUID,
+    montant: Decimal,
+    user: User,
+) -> None:
+    """
+    Impute un décaissement sur la réquisition, dans la transaction de la sortie.
+
+    L'UPDATE conditionnel incrémente montant_paye_cumule seulement si le reste à payer le permet,
+    et passe la réquisition en PAYEE lorsqu'elle est soldée : deux décaissements simultanés ne
+    peuvent pas dépasser le montant total. En cas de refus, la transaction est annulée.
+    """
+    result = await db.execute(
+        text(
+            """
+            WITH prev AS (
+                SELECT id, status FROM public.requisitions WHERE id = :requisition_id FOR UPDATE
+            )
+            UPDATE public.requisitions q
+            SET montant_paye_cumule = q.montant_paye_cumule + :montant,
+                status = CASE WHEN q.montant_paye_cumule + :montant >= q.montant_total THEN 'PAYEE' ELSE q.status END,
+                payee_par = CASE WHEN q.montant_paye_cumule + :montant >= q.montant_total THEN :user_id ELSE q.payee_par END,
+                payee_le = CASE WHEN q.montant_paye_cumule + :montant >= q.montant_total THEN now() ELSE q.payee_le END,
+                updated_at = now()
+            FROM prev
+            WHERE q.id = prev.id
+              AND q.montant_paye_cumule + :montant <= q.montant_total
+              AND UPPER(q.status) <> ALL(:statuts_clos)
+            RETURNING prev.status AS previous_status, q.status
+            """
+        ),
+        {
+            "requisition_id": requisition_id,
+            "montant": montant,
+            "user_id": user.id,
+            "statuts_clos": list(REQUISITION_STATUTS_CLOS),
+        },
+    )
+    row = result.one_or_none()
+    if row is not None:
+        if not is_engagee(row.previous_status) and is_engagee(row.status):
+            await apply_engagement(db, [requisition_id], 1)
+        return
+
+    await db.rollback()
+    res = await db.execute(select(Requisition).where(Requisition.id == requisition_id))
+    req = res.scalar_one_or_none()
+    if not req:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requisition not found")
+    if (req.status or "").upper() in REQUISITION_STATUTS_CLOS:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Requisition {req.status.lower()}")
+    reste = _to_decimal(req.montant_total) - _to_decimal(req.montant_paye_cumule)
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Montant supérieur au reste à payer ({reste})",
+    )
+
+
 @router.post("", response_model=SortieFondsOut, status_code=status.HTTP_201_CREATED)
 async def create_sortie_fonds(
     payload: SortieFondsCreate,
@@ -257,7 +423,16 @@ async def create_sortie_fonds(
         sortie.date_paiement,
         sortie.requisition_id,
     )
+    if requisition_uid is not None and sortie.montant_paye <= 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="montant_paye must be positive")
+    if date_paiement is not None:
+        # Sortie antidatée dans un mois clôturé : rapport figé, refusée
+        await ensure_months_open(db, [date_paiement])
     db.add(sortie)
+    await db.flush()
+    if requisition_uid is not None:
+        await _record_requisition_payout(db, requisition_uid, sortie.montant_paye, user)
+    await apply_paiement(db, sortie.id)
     await db.commit()
     await db.refresh(sortie)
 
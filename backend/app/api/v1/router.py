@@ -3,11 +3,13 @@ from fastapi import APIRouter
 from app.api.v1.endpoints import (
     admin,
     auth,
+    cotisations,
     dashboard,
     debug,
     domain,
     encaissements,
     experts,
+    imports_history,
     health,
     participants_transport,
     remboursements_transport,
@@ -33,6 +35,7 @@ api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
 
 # Routes métier
 api_router.include_router(experts.router, prefix="/experts-comptables", tags=["experts-comptables"])
+api_router.include_router(imports_history.router, prefix="/imports-history", tags=["imports-history"])
 api_router.include_router(payments.router, prefix="/payment-history", tags=["payment-history"])
 api_router.include_router(settings.router, prefix="/print-settings", tags=["print-settings"])
 api_router.include_router(domain.router, tags=["domain"])
@@ -44,3 +47,4 @@ api_router.include_router(requisition_approvers.router, prefix="/requisition-app
 api_router.include_router(remboursements_transport.router, prefix="/remboursements-transport", tags=["remboursements-transport"])
 api_router.include_router(participants_transport.router, prefix="/participants-transport", tags=["participants-transport"])
 api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
+api_router.include_router(cotisations.router, prefix="/cotisations", tags=["cotisations"])
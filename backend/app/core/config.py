@@ -51,6 +51,20 @@ class Settings(BaseSettings):
     refresh_cookie_samesite: str = "lax"  # lax/strict/none
     refresh_cookie_domain: str | None = None
 
+    # Rapports asynchrones: calculs simultanés et durée de conservation des résultats
+    report_jobs_workers: int = 2
+    report_jobs_ttl_minutes: int = 60
+    # Cube de trésorerie (/reports/cube): durée de conservation des résultats en mémoire
+    report_cube_cache_seconds: int = 60
+
+    # Rendu PDF (reçus, bons de réquisition): processus du pool
+    pdf_workers: int = 2
+
+    # Autocomplétion des experts: reconstruction périodique de l'index en mémoire
+    expert_suggest_refresh_seconds: int = 300
+    # Import de classeurs multi-feuilles: processus lisant les feuilles en parallèle
+    import_workers: int = 2
+
     # CORS
     cors_origins: str = Field(default="", alias="CORS_ORIGINS")
 
@@ -7,6 +7,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.router import router
 from app.core.config import settings
+from app.services import pdf, report_jobs, workbook_import
 
 app = FastAPI(title="ONEC/CPK Tresorerie API")
 logger = logging.getLogger("onec_cpk_api")
@@ -34,6 +35,21 @@ async def log_database_url() -> None:
     logger.info("DATABASE_URL (runtime): %s", settings.database_url)
 
 
+@app.on_event("shutdown")
+async def drain_report_jobs() -> None:
+    await report_jobs.drain()
+
+
+@app.on_event("shutdown")
+def shutdown_pdf_pool() -> None:
+    pdf.shutdown_pdf_pool()
+
+
+@app.on_event("shutdown")
+def shutdown_import_pool() -> None:
+    workbook_import.shutdown_import_pool()
+
+
 @app.get("/")
 async def root() -> dict:
     return {"name": "onec-cpk-api", "version": "v1"}
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import DateTime, ForeignKey, Integer, Numeric
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class CotisationStatut(Base):
+    """Situation des cotisations par expert et par exercice, maintenue à chaque encaissement/paiement."""
+
+    __tablename__ = "cotisations_statut"
+
+    expert_comptable_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("experts_comptables.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    annee: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    montant_facture: Mapped[Decimal] = mapped_column(Numeric(15, 2), nullable=False, default=0)
+    montant_paye: Mapped[Decimal] = mapped_column(Numeric(15, 2), nullable=False, default=0)
+    dernier_paiement: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import uuid
+
+from sqlalchemy import ForeignKey, String
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ImportExpertChange(Base):
+    """Expert créé ou modifié par un import, avec son état antérieur (annulation de l'import)."""
+
+    __tablename__ = "import_expert_changes"
+
+    import_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("imports_history.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    expert_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+
+    # created ou updated
+    action: Mapped[str] = mapped_column(String(10), nullable=False)
+
+    # Valeurs des champs importés (et import_id) avant l'import ; NULL pour une création
+    before: Mapped[dict | None] = mapped_column(JSONB(none_as_null=True), nullable=True)
+
+    # Valeurs des champs importés juste après l'import : l'annulation est refusée si l'expert
+    # a été modifié depuis (PATCH, changement de catégorie)
+    after: Mapped[dict | None] = mapped_column(JSONB(none_as_null=True), nullable=True)
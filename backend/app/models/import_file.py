@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger, DateTime, Integer, LargeBinary, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ImportFile(Base):
+    """Fichier d'import brut, compressé et adressé par son contenu (un même fichier n'est stocké qu'une fois)."""
+
+    __tablename__ = "import_files"
+
+    # SHA-256 du contenu brut (avant compression)
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # xlsx / xlsx_multi (fichier envoyé tel quel, une ou toutes les feuilles importées)
+    # csv (fichier CSV/TSV envoyé tel quel) ou jsonl (lignes envoyées en JSON, une par ligne)
+    format: Mapped[str] = mapped_column(String(10), nullable=False)
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Contenu brut compressé par zlib ; chargé uniquement à la demande
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False, deferred=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
@@ -3,7 +3,7 @@ from __future__ import annotations
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import DateTime, Integer, String
+from sqlalchemy import DateTime, ForeignKey, Integer, String
 from sqlalchemy.dialects.postgresql import JSON, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -27,10 +27,18 @@ class ImportsHistory(Base):
     imported_by: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
     rows_imported: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     
-    # success, error, partial
+    # success, error, partial, rolled_back (annulé via /experts-comptables/imports/{id}/rollback)
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="success")
     
-    # Données brutes du fichier importé (pour audit/rollback)
-    file_data: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    # Fichier importé, compressé dans import_files (voir app.services.import_files)
+    file_hash: Mapped[str | None] = mapped_column(
+        String(64),
+        ForeignKey("import_files.content_hash"),
+        nullable=True,
+        index=True,
+    )
+
+    # Ancien stockage des lignes brutes en JSON : lu seulement pour les imports antérieurs à import_files
+    file_data: Mapped[list | None] = mapped_column(JSON, nullable=True, deferred=True)
     
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
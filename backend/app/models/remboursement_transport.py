@@ -29,7 +29,7 @@ class RemboursementTransport(Base):
     heure_debut: Mapped[str | None] = mapped_column(String(20), nullable=True)
     heure_fin: Mapped[str | None] = mapped_column(String(20), nullable=True)
     montant_total: Mapped[Decimal] = mapped_column(Numeric(15, 2), nullable=False, default=0)
-    requisition_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+    requisition_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True, index=True)
     created_by: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
 
@@ -42,6 +42,7 @@ class ParticipantTransport(Base):
         UUID(as_uuid=True),
         ForeignKey("remboursements_transport.id", ondelete="CASCADE"),
         nullable=False,
+        index=True,
     )
     nom: Mapped[str] = mapped_column(String(200), nullable=False)
     titre_fonction: Mapped[str] = mapped_column(String(200), nullable=False)
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import uuid
+from datetime import date, datetime, timezone
+
+from sqlalchemy import Date, DateTime, String
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ReportSnapshot(Base):
+    """Rapport de synthèse figé d'un mois clôturé. Immuable : un trigger refuse toute mise à jour."""
+
+    __tablename__ = "report_snapshots"
+
+    # Premier jour du mois clôturé
+    mois: Mapped[date] = mapped_column(Date, primary_key=True)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    # SHA-256 du payload sérialisé de façon canonique (clés triées, sans espaces)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    closed_by: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+    closed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
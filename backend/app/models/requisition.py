@@ -24,6 +24,8 @@ class Requisition(Base):
     type_requisition: Mapped[str] = mapped_column(String(50), nullable=False, default="classique")
     status: Mapped[str] = mapped_column(String(30), nullable=False, default="EN_ATTENTE", index=True)
     montant_total: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    # Somme des sorties de fonds rattachées, maintenue à chaque décaissement
+    montant_paye_cumule: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False, default=0)
 
     created_by: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True, index=True)
     validee_par: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
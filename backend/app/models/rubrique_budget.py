@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import DateTime, ForeignKey, Integer, Numeric, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class RubriqueBudget(Base):
+    """Budget annuel d'une rubrique et compteurs de consommation (engagé / payé), maintenus à l'écriture."""
+
+    __tablename__ = "rubrique_budgets"
+
+    rubrique_code: Mapped[str] = mapped_column(
+        String(50),
+        ForeignKey("rubriques.code", onupdate="CASCADE", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    annee: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    budget: Mapped[Decimal] = mapped_column(Numeric(15, 2), nullable=False, default=0)
+    montant_engage: Mapped[Decimal] = mapped_column(Numeric(15, 2), nullable=False, default=0)
+    montant_paye: Mapped[Decimal] = mapped_column(Numeric(15, 2), nullable=False, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from decimal import Decimal
+
 from pydantic import BaseModel, EmailStr, Field
 
 
@@ -79,6 +81,36 @@ class RubriqueOut(BaseModel):
     active: bool
 
 
+class RubriqueBudgetUpsertRequest(BaseModel):
+    annee: int = Field(ge=2000, le=2100)
+    budget: Decimal = Field(ge=0)
+
+
+class RubriqueBudgetOut(BaseModel):
+    rubrique_code: str
+    libelle: str
+    annee: int
+    budget: Decimal = Decimal("0")
+    montant_engage: Decimal = Decimal("0")
+    montant_paye: Decimal = Decimal("0")
+    disponible: Decimal = Decimal("0")
+
+
+class RubriqueBudgetDrift(BaseModel):
+    rubrique_code: str
+    annee: int
+    montant_engage: Decimal
+    montant_engage_attendu: Decimal
+    montant_paye: Decimal
+    montant_paye_attendu: Decimal
+
+
+class RubriqueBudgetReconcileResponse(BaseModel):
+    annee: int | None = None
+    fixed: bool
+    drifts: list[RubriqueBudgetDrift] = Field(default_factory=list)
+
+
 # ----------------------
 # Print settings
 # ----------------------
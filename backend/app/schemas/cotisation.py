@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+StatutCotisation = Literal["non_facture", "impaye", "partiel", "solde"]
+
+
+class CotisationStatutOut(BaseModel):
+    expert_comptable_id: str
+    numero_ordre: str
+    nom_denomination: str
+    type_ec: str
+    annee: int
+    montant_facture: Decimal = Decimal("0")
+    montant_paye: Decimal = Decimal("0")
+    restant: Decimal = Decimal("0")
+    dernier_paiement: datetime | None = None
+    statut: StatutCotisation
+
+
+class CotisationRebuildResponse(BaseModel):
+    rows: int
+
+
+class CotisationGenerateRequest(BaseModel):
+    annee: int = Field(ge=2000, le=2100)
+    montant_ec: Decimal = Field(gt=0)
+    montant_sec: Decimal = Field(gt=0)
+    date_encaissement: datetime | None = None
+    dry_run: bool = False
+
+
+class CotisationGenerateResponse(BaseModel):
+    dry_run: bool
+    annee: int
+    count: int = 0
+    count_ec: int = 0
+    count_sec: int = 0
+    montant_total: Decimal = Decimal("0")
+    premier_numero: str | None = None
+    dernier_numero: str | None = None
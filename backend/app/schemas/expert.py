@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
+from decimal import Decimal
 from typing import Literal
 
 from pydantic import BaseModel, EmailStr, Field
@@ -65,6 +66,16 @@ class ExpertComptableSearchParams(BaseModel):
     offset: int = 0
 
 
+class ExpertSuggestion(BaseModel):
+    """Résultat d'autocomplétion (/experts-comptables/suggest)"""
+    id: str
+    numero_ordre: str
+    nom_denomination: str
+    raison_sociale: str | None = None
+    type_ec: str
+    active: bool
+
+
 # Import batch (depuis Excel)
 class ExpertImportRow(BaseModel):
     numero_ordre: str
@@ -83,20 +94,58 @@ class ExpertImportRow(BaseModel):
 
 
 class ExpertImportRequest(BaseModel):
-    category: CategoryType
+    # multi : classeur dont chaque feuille est rattachée à une catégorie d'après ses en-têtes
+    category: CategoryType | Literal["multi"]
     filename: str
     rows: list[ExpertImportRow]
     file_data: list[dict] | None = None  # données brutes pour audit
 
 
+class ExpertImportFieldChange(BaseModel):
+    champ: str
+    avant: str | None = None
+    apres: str
+
+
+class ExpertImportDiffLine(BaseModel):
+    ligne: int
+    feuille: str | None = None
+    numero_ordre: str
+    nom_denomination: str | None = None
+    changes: list[ExpertImportFieldChange] = []
+
+
+class ExpertImportDiff(BaseModel):
+    """Écart entre le fichier et le registre (import en mode dry_run)"""
+    nouveaux: list[ExpertImportDiffLine] = []
+    modifies: list[ExpertImportDiffLine] = []
+
+
+class ExpertImportSheet(BaseModel):
+    nom: str
+    category: CategoryType | None = None  # None : en-têtes non reconnus, feuille ignorée
+    lignes: int
+
+
 class ExpertImportResponse(BaseModel):
     success: bool
     imported: int
     updated: int = 0
+    unchanged: int = 0
     skipped: int = 0
     total_lignes: int = 0
     errors: list[dict] = []
     import_id: str | None = None
+    dry_run: bool = False
+    diff: ExpertImportDiff | None = None
+    feuilles: list[ExpertImportSheet] | None = None
+    message: str
+
+
+class ExpertImportRollbackResponse(BaseModel):
+    import_id: str
+    deleted: int
+    restored: int
     message: str
 
 
@@ -127,3 +176,26 @@ class CategoryChangeResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# Relevé de compte
+class ExpertReleveLigne(BaseModel):
+    id: str  # id de l'encaissement ou du versement (payment_history) selon type_ligne
+    date_operation: datetime
+    type_ligne: Literal["encaissement", "paiement_initial", "paiement"]
+    encaissement_id: str
+    numero_recu: str
+    libelle: str | None = None
+    debit: Decimal = Decimal("0")
+    credit: Decimal = Decimal("0")
+    solde: Decimal = Decimal("0")
+    mode_paiement: str | None = None
+    reference: str | None = None
+
+
+class ExpertReleveResponse(BaseModel):
+    expert_id: str
+    solde_ouverture: Decimal = Decimal("0")
+    solde_cloture: Decimal = Decimal("0")
+    lignes: list[ExpertReleveLigne] = []
+    next_cursor: str | None = None
@@ -18,6 +18,9 @@ class ImportsHistoryResponse(BaseModel):
     rows_imported: int
     status: str
     created_at: datetime
+    # Fichier d'origine stocké (xlsx ou jsonl) et son nombre de lignes
+    file_format: str | None = None
+    file_rows: int | None = None
 
     class Config:
         from_attributes = True
@@ -26,3 +29,12 @@ class ImportsHistoryResponse(BaseModel):
 class ImportsHistoryList(BaseModel):
     items: list[ImportsHistoryResponse]
     total: int
+
+
+class ImportsHistoryRows(BaseModel):
+    """Page de lignes du fichier d'origine d'un import"""
+    import_id: str
+    total: int
+    offset: int
+    limit: int
+    items: list[dict]
@@ -22,6 +22,24 @@ class PaymentHistoryCreate(PaymentHistoryBase):
     encaissement_id: str
 
 
+class PaymentBulkRequest(BaseModel):
+    entries: list[PaymentHistoryCreate] = Field(min_length=1, max_length=1000)
+
+
+class PaymentBulkResult(BaseModel):
+    index: int
+    encaissement_id: str
+    status: Literal["applied", "rejected"]
+    payment_id: str | None = None
+    detail: str | None = None
+
+
+class PaymentBulkResponse(BaseModel):
+    applied: int = 0
+    rejected: int = 0
+    results: list[PaymentBulkResult] = Field(default_factory=list)
+
+
 class PaymentHistoryResponse(PaymentHistoryBase):
     id: str
     encaissement_id: str
@@ -32,6 +50,18 @@ class PaymentHistoryResponse(PaymentHistoryBase):
         from_attributes = True
 
 
+class PaymentHistoryAggregate(BaseModel):
+    count: int = 0
+    total: Decimal = Decimal("0")
+    dernier_paiement: datetime | None = None
+
+
+class PaymentHistoryGroup(BaseModel):
+    encaissement_id: str
+    payments: list[PaymentHistoryResponse] = Field(default_factory=list)
+    summary: PaymentHistoryAggregate | None = None
+
+
 class EncaissementBase(BaseModel):
     numero_recu: str = Field(max_length=50)
     type_client: str
@@ -21,6 +21,10 @@ class ParticipantTransportCreate(ParticipantTransportBase):
     remboursement_id: str
 
 
+class ParticipantTransportItem(ParticipantTransportBase):
+    pass
+
+
 class ParticipantTransportResponse(ParticipantTransportBase):
     id: str
     remboursement_id: str
@@ -47,6 +51,11 @@ class RemboursementTransportCreate(RemboursementTransportBase):
     created_by: str | None = None
 
 
+class RemboursementTransportWithParticipantsCreate(RemboursementTransportCreate):
+    # Montant total recalculé depuis les participants ; la valeur transmise est ignorée
+    participants: list[ParticipantTransportItem] = Field(default_factory=list, max_length=1000)
+
+
 class RemboursementTransportResponse(RemboursementTransportBase):
     id: str
     numero_remboursement: str
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-from datetime import date
+from datetime import date, datetime
 from decimal import Decimal
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
 
@@ -74,3 +76,73 @@ class ReportSummaryResponse(BaseModel):
     stats: ReportSummaryStats
     daily_stats: list[ReportDailyStats]
     period: PeriodInfo | None = None
+
+
+class ReportAgingBuckets(BaseModel):
+    count: int = 0
+    total: Decimal = Decimal("0")
+    jours_0_30: Decimal = Decimal("0")
+    jours_31_60: Decimal = Decimal("0")
+    jours_61_90: Decimal = Decimal("0")
+    jours_plus_90: Decimal = Decimal("0")
+
+
+class ReportAgingRow(ReportAgingBuckets):
+    key: str
+    label: str | None = None
+
+
+class ReportAgingResponse(BaseModel):
+    as_of: date
+    totals: ReportAgingBuckets = Field(default_factory=ReportAgingBuckets)
+    par_type_client: list[ReportAgingRow] = Field(default_factory=list)
+    par_type_operation: list[ReportAgingRow] = Field(default_factory=list)
+    par_expert: list[ReportAgingRow] = Field(default_factory=list)
+
+
+class ReportCubeRow(BaseModel):
+    dimensions: dict[str, str | None] = Field(default_factory=dict)
+    count: int | None = None
+    montant_paye: Decimal | None = None
+    montant_total: Decimal | None = None
+
+
+class ReportCubeResponse(BaseModel):
+    period: PeriodInfo
+    sens: Literal["encaissement", "sortie", "tous"]
+    dimensions: list[str]
+    measures: list[str]
+    rows: list[ReportCubeRow] = Field(default_factory=list)
+    totals: ReportCubeRow = Field(default_factory=ReportCubeRow)
+    # sens=tous : total de chaque sens (encaissement, sortie), jamais additionnés
+    totals_by_sens: dict[str, ReportCubeRow] = Field(default_factory=dict)
+
+
+class ReportSnapshotCreate(BaseModel):
+    mois: str = Field(pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Mois à clôturer (YYYY-MM)")
+
+
+class ReportSnapshotOut(BaseModel):
+    mois: date
+    content_hash: str
+    closed_by: str | None = None
+    closed_at: datetime
+
+
+class ReportJobCreate(BaseModel):
+    kind: Literal["summary"] = "summary"
+    date_debut: str | None = None
+    date_fin: str | None = None
+
+
+class ReportJobOut(BaseModel):
+    id: str
+    kind: str
+    status: Literal["pending", "running", "done", "failed"]
+    params: dict
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    expires_at: datetime | None = None
+    error: str | None = None
+    result: ReportSummaryResponse | None = None
@@ -2,9 +2,9 @@ from __future__ import annotations
 
 from datetime import datetime
 from decimal import Decimal
-from typing import Any
+from typing import Any, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class RequisitionCreate(BaseModel):
@@ -49,6 +49,8 @@ class RequisitionOut(BaseModel):
     mode_paiement: str
     type_requisition: str
     montant_total: Decimal
+    montant_paye_cumule: Decimal = Decimal("0")
+    reste_a_payer: Decimal = Decimal("0")
     status: str
     statut: str
     created_by: str | None = None
@@ -85,6 +87,23 @@ class LigneRequisitionOut(BaseModel):
     montant_total: Decimal
 
 
+class LigneRequisitionItem(BaseModel):
+    rubrique: str
+    description: str
+    quantite: int = Field(default=1, ge=1)
+    montant_unitaire: Decimal = Field(ge=0)
+
+
+class RequisitionWithLignesCreate(RequisitionCreate):
+    # Recalculé depuis les lignes ; la valeur transmise est ignorée
+    montant_total: Decimal | None = None
+    lignes: list[LigneRequisitionItem] = Field(min_length=1, max_length=500)
+
+
+class RequisitionWithLignesOut(RequisitionOut):
+    lignes: list[LigneRequisitionOut] = Field(default_factory=list)
+
+
 class RequisitionListResponse(BaseModel):
     items: list[RequisitionOut]
     total: int | None = None
@@ -102,3 +121,21 @@ class RequisitionWithUserOut(RequisitionOut):
     validateur: UserInfo | None = None
     approbateur: UserInfo | None = None
     caissier: UserInfo | None = None
+
+
+class RequisitionBulkActionRequest(BaseModel):
+    ids: list[str] = Field(min_length=1, max_length=500)
+    action: Literal["validate", "reject", "approve"]
+    motif_rejet: str | None = None
+
+
+class RequisitionBulkSkipped(BaseModel):
+    id: str
+    reason: Literal["invalid_id", "not_found", "status_conflict"]
+    status: str | None = None
+
+
+class RequisitionBulkActionResponse(BaseModel):
+    action: str
+    updated: list[RequisitionOut] = Field(default_factory=list)
+    skipped: list[RequisitionBulkSkipped] = Field(default_factory=list)
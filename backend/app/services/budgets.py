@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import uuid
+from decimal import Decimal
+from typing import Any, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Statuts de réquisition pour lesquels les lignes sont engagées sur le budget des rubriques
+STATUTS_ENGAGES = ("VALIDEE", "APPROUVEE", "VALIDATED", "APPROVED", "PAYEE", "PAID")
+
+# Consommation attendue par rubrique et exercice, recalculée depuis les mouvements.
+# Engagé: lignes des réquisitions approuvées (exercice de création de la réquisition) ;
+# payé: sorties de fonds portant un rubrique_code (exercice du paiement).
+_EXPECTED_SQL = """
+SELECT rubrique_code, annee, SUM(engage) AS engage, SUM(paye) AS paye
+FROM (
+    SELECT r.code AS rubrique_code,
+           EXTRACT(YEAR FROM q.created_at)::int AS annee,
+           l.montant_total AS engage,
+           0 AS paye
+    FROM public.lignes_requisition l
+    JOIN public.requisitions q ON q.id = l.requisition_id
+    JOIN public.rubriques r ON r.code = l.rubrique
+    WHERE UPPER(q.status) = ANY(:statuts)
+    UNION ALL
+    SELECT r.code,
+           EXTRACT(YEAR FROM COALESCE(s.date_paiement, s.created_at))::int,
+           0,
+           s.montant_paye
+    FROM public.sorties_fonds s
+    JOIN public.rubriques r ON r.code = s.rubrique_code
+) flux
+WHERE CAST(:annee AS integer) IS NULL OR annee = CAST(:annee AS integer)
+GROUP BY 1, 2
+"""
+
+
+def is_engagee(status: str | None) -> bool:
+    return (status or "").upper() in STATUTS_ENGAGES
+
+
+async def apply_engagement(db: AsyncSession, requisition_ids: Sequence[uuid.UUID], sign: int) -> None:
+    """
+    Ajoute (sign=1) ou retire (sign=-1) les lignes des réquisitions du montant engagé des rubriques.
+
+    Les lignes dont la rubrique n'est pas référencée sont ignorées par la jointure. S'exécute dans
+    la transaction de l'appelant.
+    """
+    if not requisition_ids:
+        return
+    await db.execute(
+        text(
+            """
+            INSERT INTO public.rubrique_budgets AS rb
+                (rubrique_code, annee, budget, montant_engage, montant_paye, updated_at)
+            SELECT r.code,
+                   EXTRACT(YEAR FROM q.created_at)::int,
+                   0,
+                   CAST(:sign AS integer) * SUM(l.montant_total),
+                   0,
+                   now()
+            FROM public.lignes_requisition l
+            JOIN public.requisitions q ON q.id = l.requisition_id
+            JOIN public.rubriques r ON r.code = l.rubrique
+            WHERE l.requisition_id = ANY(:requisition_ids)
+            GROUP BY 1, 2
+            ON CONFLICT (rubrique_code, annee) DO UPDATE
+            SET montant_engage = rb.montant_engage + EXCLUDED.montant_engage,
+                updated_at = EXCLUDED.updated_at
+            """
+        ),
+        {"requisition_ids": list(requisition_ids), "sign": sign},
+    )
+
+
+async def apply_paiement(db: AsyncSession, sortie_id: uuid.UUID) -> None:
+    """Ajoute une sortie de fonds au montant payé de sa rubrique. S'exécute dans la transaction de l'appelant."""
+    await db.execute(
+        text(
+            """
+            INSERT INTO public.rubrique_budgets AS rb
+                (rubrique_code, annee, budget, montant_engage, montant_paye, updated_at)
+            SELECT r.code,
+                   EXTRACT(YEAR FROM COALESCE(s.date_paiement, s.created_at))::int,
+                   0,
+                   0,
+                   s.montant_paye,
+                   now()
+            FROM public.sorties_fonds s
+            JOIN public.rubriques r ON r.code = s.rubrique_code
+            WHERE s.id = :sortie_id
+            ON CONFLICT (rubrique_code, annee) DO UPDATE
+            SET montant_paye = rb.montant_paye + EXCLUDED.montant_paye,
+                updated_at = EXCLUDED.updated_at
+            """
+        ),
+        {"sortie_id": sortie_id},
+    )
+
+
+def disponible(budget: Decimal, engage: Decimal, paye: Decimal) -> Decimal:
+    # Les paiements d'une réquisition approuvée sont déjà engagés : on retient le plus grand des deux
+    return budget - max(engage, paye)
+
+
+async def reconcile_rubrique_budgets(db: AsyncSession, *, annee: int | None = None, fix: bool = False) -> list[dict[str, Any]]:
+    """
+    Compare les compteurs de rubrique_budgets à la consommation recalculée en une requête ensembliste.
+
+    Renvoie les écarts (valeurs stockées et attendues) ; avec `fix`, les compteurs concernés sont
+    corrigés dans la même instruction. Le budget saisi n'est jamais modifié. Ne commit pas.
+    """
+    fix_sql = """,
+        fixed AS (
+            INSERT INTO public.rubrique_budgets AS rb
+                (rubrique_code, annee, budget, montant_engage, montant_paye, updated_at)
+            SELECT rubrique_code, annee, 0, engage_attendu, paye_attendu, now()
+            FROM drift
+            ON CONFLICT (rubrique_code, annee) DO UPDATE
+            SET montant_engage = EXCLUDED.montant_engage,
+                montant_paye = EXCLUDED.montant_paye,
+                updated_at = EXCLUDED.updated_at
+            RETURNING 1
+        )"""
+    result = await db.execute(
+        text(
+            f"""
+            WITH expected AS ({_EXPECTED_SQL}),
+            drift AS (
+                SELECT COALESCE(e.rubrique_code, b.rubrique_code) AS rubrique_code,
+                       COALESCE(e.annee, b.annee) AS annee,
+                       COALESCE(b.montant_engage, 0) AS engage,
+                       COALESCE(e.engage, 0) AS engage_attendu,
+                       COALESCE(b.montant_paye, 0) AS paye,
+                       COALESCE(e.paye, 0) AS paye_attendu
+                FROM expected e
+                FULL JOIN (
+                    SELECT * FROM public.rubrique_budgets
+                    WHERE CAST(:annee AS integer) IS NULL OR annee = CAST(:annee AS integer)
+                ) b ON b.rubrique_code = e.rubrique_code AND b.annee = e.annee
+                WHERE COALESCE(b.montant_engage, 0) <> COALESCE(e.engage, 0)
+                   OR COALESCE(b.montant_paye, 0) <> COALESCE(e.paye, 0)
+            ){fix_sql if fix else ""}
+            SELECT * FROM drift ORDER BY annee, rubrique_code
+            """
+        ),
+        {"statuts": list(STATUTS_ENGAGES), "annee": annee},
+    )
+    return [dict(row) for row in result.mappings()]
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from typing import Iterable
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Verrou consultatif par mois (clé aaaamm) : partagé par les écritures datées dans le mois,
+# exclusif pendant sa clôture, de sorte qu'aucune écriture ne s'intercale entre le calcul
+# du snapshot et son enregistrement. Libéré en fin de transaction.
+_LOCK_SHARED_SQL = "SELECT pg_advisory_xact_lock_shared(hashtext('report_snapshots'), :mois_key)"
+_LOCK_EXCLUSIVE_SQL = "SELECT pg_advisory_xact_lock(hashtext('report_snapshots'), :mois_key)"
+
+
+def month_of(value: date | datetime) -> date:
+    """Premier jour du mois de `value` (les dates-heures sont ramenées en UTC)."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def _month_key(mois: date) -> int:
+    return mois.year * 100 + mois.month
+
+
+async def lock_month_for_close(db: AsyncSession, mois: date) -> None:
+    """Attend la fin des écritures en cours dans `mois` et bloque les suivantes jusqu'au commit."""
+    await db.execute(text(_LOCK_EXCLUSIVE_SQL), {"mois_key": _month_key(mois)})
+
+
+async def closed_months(db: AsyncSession, values: Iterable[date | datetime]) -> set[date]:
+    """
+    Mois clôturés (présents dans report_snapshots) parmi ceux de `values`.
+
+    Prend le verrou partagé de chaque mois : la réponse reste vraie jusqu'à la fin de la
+    transaction de l'appelant, une clôture concurrente attendant son commit.
+    """
+    months = sorted({month_of(value) for value in values})
+    if not months:
+        return set()
+    for mois in months:
+        await db.execute(text(_LOCK_SHARED_SQL), {"mois_key": _month_key(mois)})
+    rows = await db.execute(
+        text("SELECT mois FROM public.report_snapshots WHERE mois = ANY(:months)"),
+        {"months": months},
+    )
+    return {row.mois for row in rows}
+
+
+async def ensure_months_open(db: AsyncSession, values: Iterable[date | datetime]) -> None:
+    """Refuse (409) une écriture datée dans un mois clôturé, dont le rapport est figé."""
+    closed = await closed_months(db, values)
+    if closed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Mois clôturé : {', '.join(f'{mois:%Y-%m}' for mois in sorted(closed))}",
+        )
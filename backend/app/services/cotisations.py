@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.closed_months import ensure_months_open
+
+# Types d'opération comptabilisés comme cotisations dans cotisations_statut
+TYPES_COTISATION = ("cotisation_annuelle", "cotisation_trimestrielle")
+
+# Dernier paiement par encaissement: versement le plus récent, ou la date de l'encaissement
+# si une partie a été payée à la saisie (montant_paye non couvert par payment_history).
+_AGGREGATE_SQL = """
+SELECT e.expert_comptable_id,
+       EXTRACT(YEAR FROM e.date_encaissement)::int AS annee,
+       SUM(e.montant_total) AS montant_facture,
+       SUM(e.montant_paye) AS montant_paye,
+       MAX(GREATEST(ph.dernier, CASE WHEN e.montant_paye > COALESCE(ph.total, 0) THEN e.date_encaissement END))
+           AS dernier_paiement
+FROM public.encaissements e
+LEFT JOIN LATERAL (
+    SELECT SUM(p.montant) AS total, MAX(p.created_at) AS dernier
+    FROM public.payment_history p
+    WHERE p.encaissement_id = e.id
+) ph ON true
+WHERE e.type_operation = ANY(:types)
+  AND e.expert_comptable_id IS NOT NULL
+GROUP BY 1, 2
+"""
+
+
+async def lock_numeros_recu(db: AsyncSession) -> None:
+    """
+    Verrou consultatif sur l'attribution des numéros de reçu (REC-YYYYMMDD-n), pris par la
+    génération en bloc et par chaque création d'encaissement ; libéré en fin de transaction.
+    """
+    await db.execute(text("SELECT pg_advisory_xact_lock(hashtext('encaissements.numero_recu'))"))
+
+
+async def apply_cotisation_deltas(
+    db: AsyncSession,
+    deltas: Iterable[tuple[uuid.UUID, Decimal, Decimal]],
+    paid_at: datetime | None = None,
+) -> None:
+    """
+    Répercute des variations (encaissement_id, montant facturé, montant payé) sur cotisations_statut.
+
+    Les encaissements qui ne sont pas des cotisations d'un expert sont ignorés par la jointure ;
+    l'appelant n'a donc pas à relire l'encaissement. `paid_at` vaut la date du versement,
+    ou None à la création (la date de l'encaissement est alors retenue). S'exécute dans la
+    transaction de l'appelant.
+    """
+    ids: list[uuid.UUID] = []
+    factures: list[Decimal] = []
+    payes: list[Decimal] = []
+    for enc_id, facture, paye in deltas:
+        ids.append(enc_id)
+        factures.append(facture)
+        payes.append(paye)
+    if not ids:
+        return
+
+    await db.execute(
+        text(
+            """
+            INSERT INTO public.cotisations_statut AS cs
+                (expert_comptable_id, annee, montant_facture, montant_paye, dernier_paiement, updated_at)
+            SELECT e.expert_comptable_id,
+                   EXTRACT(YEAR FROM e.date_encaissement)::int,
+                   SUM(v.facture),
+                   SUM(v.paye),
+                   MAX(CASE WHEN v.paye > 0 THEN COALESCE(CAST(:paid_at AS timestamptz), e.date_encaissement) END),
+                   now()
+            FROM unnest(CAST(:ids AS uuid[]), CAST(:factures AS numeric[]), CAST(:payes AS numeric[]))
+                AS v(id, facture, paye)
+            JOIN public.encaissements e ON e.id = v.id
+            WHERE e.type_operation = ANY(:types)
+              AND e.expert_comptable_id IS NOT NULL
+            GROUP BY 1, 2
+            ON CONFLICT (expert_comptable_id, annee) DO UPDATE
+            SET montant_facture = cs.montant_facture + EXCLUDED.montant_facture,
+                montant_paye = cs.montant_paye + EXCLUDED.montant_paye,
+                dernier_paiement = GREATEST(cs.dernier_paiement, EXCLUDED.dernier_paiement),
+                updated_at = EXCLUDED.updated_at
+            """
+        ),
+        {
+            "ids": ids,
+            "factures": factures,
+            "payes": payes,
+            "paid_at": paid_at,
+            "types": list(TYPES_COTISATION),
+        },
+    )
+
+
+async def rebuild_cotisations_statut(db: AsyncSession) -> int:
+    """Recalcule entièrement cotisations_statut depuis encaissements/payment_history. Ne commit pas."""
+    await db.execute(text("DELETE FROM public.cotisations_statut"))
+    result = await db.execute(
+        text(
+            f"""
+            INSERT INTO public.cotisations_statut
+                (expert_comptable_id, annee, montant_facture, montant_paye, dernier_paiement, updated_at)
+            SELECT agg.*, now() FROM ({_AGGREGATE_SQL}) agg
+            """
+        ),
+        {"types": list(TYPES_COTISATION)},
+    )
+    return result.rowcount or 0
+
+
+# Colonnes alimentées par COPY lors de la facturation annuelle en masse
+_ENCAISSEMENT_COPY_COLUMNS = (
+    "id",
+    "numero_recu",
+    "type_client",
+    "expert_comptable_id",
+    "type_operation",
+    "description",
+    "montant",
+    "montant_total",
+    "montant_paye",
+    "statut_paiement",
+    "mode_paiement",
+    "date_encaissement",
+    "created_by",
+    "created_at",
+)
+
+
+@dataclass
+class CotisationGeneration:
+    count_ec: int = 0
+    count_sec: int = 0
+    montant_total: Decimal = Decimal("0")
+    premier_numero: str | None = None
+    dernier_numero: str | None = None
+
+
+async def generate_cotisations_annuelles(
+    db: AsyncSession,
+    *,
+    annee: int,
+    montant_ec: Decimal,
+    montant_sec: Decimal,
+    date_encaissement: datetime,
+    created_by: uuid.UUID | None,
+    dry_run: bool = False,
+) -> CotisationGeneration:
+    """
+    Facture la cotisation annuelle de chaque expert actif pas encore facturé pour `annee`.
+
+    Les numéros de reçu sont réservés en bloc sous verrou consultatif, les lignes sont
+    envoyées par COPY (asyncpg copy_records_to_table) sur la connexion de la session, puis
+    cotisations_statut est mis à jour en une instruction. En dry_run rien n'est écrit.
+    Ne commit pas.
+    """
+    # Sérialise les générations concurrentes et les créations d'encaissements
+    await lock_numeros_recu(db)
+    await ensure_months_open(db, [date_encaissement])
+
+    experts = (
+        await db.execute(
+            text(
+                """
+                SELECT ec.id, ec.type_ec
+                FROM public.experts_comptables ec
+                WHERE ec.active
+                  AND NOT EXISTS (
+                      SELECT 1 FROM public.encaissements e
+                      WHERE e.expert_comptable_id = ec.id
+                        AND e.type_operation = 'cotisation_annuelle'
+                        AND e.date_encaissement >= make_timestamptz(:annee, 1, 1, 0, 0, 0, 'UTC')
+                        AND e.date_encaissement < make_timestamptz(:annee + 1, 1, 1, 0, 0, 0, 'UTC')
+                  )
+                ORDER BY ec.numero_ordre
+                """
+            ),
+            {"annee": annee},
+        )
+    ).all()
+
+    summary = CotisationGeneration()
+    if not experts:
+        return summary
+
+    now = datetime.now(timezone.utc)
+    prefix = f"REC-{now:%Y%m%d}-"
+    last_index = (
+        await db.execute(
+            text(
+                """
+                SELECT COALESCE(MAX(CAST(substring(numero_recu FROM '^' || :prefix || '([0-9]+)$') AS integer)), 0)
+                FROM public.encaissements
+                WHERE numero_recu LIKE :prefix || '%'
+                """
+            ),
+            {"prefix": prefix},
+        )
+    ).scalar_one()
+
+    description = f"Cotisation annuelle {annee}"
+    records: list[tuple] = []
+    deltas: list[tuple[uuid.UUID, Decimal, Decimal]] = []
+    for offset, (expert_id, type_ec) in enumerate(experts, start=1):
+        montant = montant_sec if type_ec == "SEC" else montant_ec
+        if type_ec == "SEC":
+            summary.count_sec += 1
+        else:
+            summary.count_ec += 1
+        summary.montant_total += montant
+        enc_id = uuid.uuid4()
+        records.append(
+            (
+                enc_id,
+                f"{prefix}{last_index + offset:04d}",
+                "expert_comptable",
+                expert_id,
+                "cotisation_annuelle",
+                description,
+                montant,
+                montant,
+                Decimal("0"),
+                "non_paye",
+                "cash",
+                date_encaissement,
+                created_by,
+                now,
+            )
+        )
+        deltas.append((enc_id, montant, Decimal("0")))
+
+    summary.premier_numero = records[0][1]
+    summary.dernier_numero = records[-1][1]
+    if dry_run:
+        return summary
+
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "encaissements",
+        schema_name="public",
+        columns=_ENCAISSEMENT_COPY_COLUMNS,
+        records=records,
+    )
+    await apply_cotisation_deltas(db, deltas)
+    return summary
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+from collections.abc import Callable, Iterator
+from typing import BinaryIO
+
+from fastapi import HTTPException, status
+
+# Séparateurs reconnus, par ordre de préférence en cas d'égalité (« ; » : export Excel français)
+CSV_DELIMITERS = (";", ",", "\t")
+
+# Début du fichier lu pour détecter l'encodage et le séparateur
+_SNIFF_BYTES = 64 * 1024
+
+# Octet invalide en UTF-8 au-delà de l'extrait analysé (fichier Latin-1 dont les accents
+# apparaissent tard) : lu en Latin-1 au lieu d'interrompre l'import
+_LATIN1_FALLBACK = "onec-latin1-fallback"
+
+
+def _latin1_fallback(exc: UnicodeError) -> tuple[str, int]:
+    if not isinstance(exc, UnicodeDecodeError):
+        raise exc
+    return exc.object[exc.start:exc.end].decode("latin-1"), exc.end
+
+
+codecs.register_error(_LATIN1_FALLBACK, _latin1_fallback)
+
+
+def detect_encoding(head: bytes) -> str:
+    """
+    UTF-8 (avec ou sans BOM) si le début du fichier est décodable ainsi, sinon Latin-1 ;
+    les octets invalides rencontrés plus loin sont lus en Latin-1 (voir iter_csv_rows).
+    """
+    try:
+        # final=False : un caractère coupé par la fin de l'extrait n'est pas une erreur
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return "latin-1"
+    return "utf-8-sig"
+
+
+def detect_delimiter(header_line: str, filename: str | None = None) -> str:
+    """Tabulation pour un .tsv, sinon le séparateur le plus fréquent de la ligne d'en-têtes."""
+    if filename and filename.lower().endswith(".tsv"):
+        return "\t"
+    counts = {delimiter: header_line.count(delimiter) for delimiter in CSV_DELIMITERS}
+    return max(CSV_DELIMITERS, key=lambda delimiter: counts[delimiter])
+
+
+class _TeeReader(io.RawIOBase):
+    """Lecture d'un fichier binaire, chaque bloc lu étant aussi transmis à `sink`."""
+
+    def __init__(self, raw: BinaryIO, sink: Callable[[bytes], None]) -> None:
+        self._raw = raw
+        self._sink = sink
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        buffer[: len(data)] = data
+        if data:
+            self._sink(data)
+        return len(data)
+
+
+def iter_csv_rows(
+    fileobj: BinaryIO,
+    *,
+    filename: str | None = None,
+    sink: Callable[[bytes], None] | None = None,
+) -> tuple[list[str], Iterator[tuple[int, dict[str, str | None]]]]:
+    """
+    Lecture au fil de l'eau d'un CSV/TSV : renvoie les en-têtes et un itérateur de
+    (numéro de ligne, {en-tête: valeur}) ; les lignes vides sont ignorées.
+
+    `fileobj` doit pouvoir revenir au début (fichier envoyé, BytesIO) ; `sink` reçoit tous les
+    octets lus (empreinte et compression du fichier sans le charger en entier).
+    """
+    fileobj.seek(0)
+    head = fileobj.read(_SNIFF_BYTES)
+    fileobj.seek(0)
+    encoding = detect_encoding(head)
+    header_line = head.decode(encoding, errors="ignore").partition("\n")[0]
+    delimiter = detect_delimiter(header_line, filename)
+
+    raw: BinaryIO = io.BufferedReader(_TeeReader(fileobj, sink)) if sink is not None else fileobj
+    text = io.TextIOWrapper(raw, encoding=encoding, errors=_LATIN1_FALLBACK, newline="")
+    reader = csv.reader(text, delimiter=delimiter)
+    headers = [h.strip() for h in next(reader, [])]
+
+    def rows() -> Iterator[tuple[int, dict[str, str | None]]]:
+        try:
+            for values in reader:
+                if not any(value.strip() for value in values):
+                    continue
+                yield reader.line_num, {
+                    header: (values[idx] if idx < len(values) else None)
+                    for idx, header in enumerate(headers)
+                    if header
+                }
+        except csv.Error as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"CSV invalide à la ligne {reader.line_num} : {exc}",
+            ) from exc
+        text.detach()
+
+    return headers, rows()
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import re
+import time
+import unicodedata
+import uuid
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.expert_comptable import ExpertComptable
+
+logger = logging.getLogger("onec_cpk_expert_index")
+
+# Champs indexés, par ordre de priorité à position de correspondance égale
+INDEXED_FIELDS = ("numero_ordre", "nom_denomination", "raison_sociale")
+
+_WORD_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def fold(value: str | None) -> str:
+    """Minuscules sans accents ni ponctuation : « Société d'Étude » -> « societe d etude »."""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(w for w in _WORD_SPLIT.split(stripped) if w)
+
+
+@dataclass(frozen=True, slots=True)
+class ExpertEntry:
+    id: uuid.UUID
+    numero_ordre: str
+    nom_denomination: str
+    raison_sociale: str | None
+    type_ec: str
+    active: bool
+
+
+# Clé d'index : (texte replié à partir d'un début de mot, position du mot, rang du champ, id)
+_Key = tuple[str, int, int, uuid.UUID]
+
+
+def _keys(entry: ExpertEntry) -> list[_Key]:
+    keys: list[_Key] = []
+    for rank, field in enumerate(INDEXED_FIELDS):
+        words = fold(getattr(entry, field)).split(" ")
+        for position in range(len(words)):
+            suffix = " ".join(words[position:])
+            if suffix:
+                keys.append((suffix, position, rank, entry.id))
+    return keys
+
+
+class ExpertSuggestIndex:
+    """
+    Index de préfixes en mémoire pour l'autocomplétion des experts.
+
+    Tableau trié de clés (suffixes de mots repliés) interrogé par bisect : une recherche
+    coûte O(log n + k). L'index est propre au processus ; il est reconstruit depuis la base
+    au premier usage, après un import, et au plus tard toutes les
+    `expert_suggest_refresh_seconds` pour rattraper les écritures des autres processus.
+    """
+
+    def __init__(self) -> None:
+        self._keys: list[_Key] = []
+        self._entries: dict[uuid.UUID, ExpertEntry] = {}
+        # Nom replié, pour départager les experts à correspondance égale
+        self._names: dict[uuid.UUID, str] = {}
+        self._built_at: float | None = None
+
+    def is_fresh(self) -> bool:
+        if self._built_at is None:
+            return False
+        return time.monotonic() - self._built_at < settings.expert_suggest_refresh_seconds
+
+    def invalidate(self) -> None:
+        self._built_at = None
+
+    def load(self, entries: list[ExpertEntry]) -> None:
+        keys = [key for entry in entries for key in _keys(entry)]
+        keys.sort()
+        # Remplacement en une fois : une recherche concurrente voit l'ancien ou le nouvel index
+        names = {entry.id: fold(entry.nom_denomination) for entry in entries}
+        self._keys, self._entries, self._names = keys, {entry.id: entry for entry in entries}, names
+        self._built_at = time.monotonic()
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        result = await db.execute(
+            select(
+                ExpertComptable.id,
+                ExpertComptable.numero_ordre,
+                ExpertComptable.nom_denomination,
+                ExpertComptable.raison_sociale,
+                ExpertComptable.type_ec,
+                ExpertComptable.active,
+            )
+        )
+        self.load([ExpertEntry(*row) for row in result.all()])
+        logger.info("expert suggest index rebuilt entries=%s keys=%s", len(self._entries), len(self._keys))
+
+    async def ensure(self, db: AsyncSession) -> None:
+        if not self.is_fresh():
+            await self.rebuild(db)
+
+    def remove(self, expert_id: uuid.UUID) -> None:
+        entry = self._entries.pop(expert_id, None)
+        self._names.pop(expert_id, None)
+        if entry is None:
+            return
+        for key in _keys(entry):
+            idx = bisect_left(self._keys, key)
+            if idx < len(self._keys) and self._keys[idx] == key:
+                del self._keys[idx]
+
+    def upsert(self, expert: ExpertComptable) -> None:
+        """Met à jour l'index après création, modification ou changement de catégorie."""
+        if self._built_at is None:
+            # Pas encore construit : il le sera depuis la base à la prochaine recherche
+            return
+        entry = ExpertEntry(
+            id=expert.id,
+            numero_ordre=expert.numero_ordre,
+            nom_denomination=expert.nom_denomination,
+            raison_sociale=expert.raison_sociale,
+            type_ec=expert.type_ec,
+            active=expert.active,
+        )
+        self.remove(entry.id)
+        self._entries[entry.id] = entry
+        self._names[entry.id] = fold(entry.nom_denomination)
+        for key in _keys(entry):
+            insort(self._keys, key)
+
+    def search(
+        self,
+        q: str,
+        *,
+        limit: int = 10,
+        active: bool | None = True,
+        type_ec: str | None = None,
+    ) -> list[ExpertEntry]:
+        """
+        Experts dont un mot de numero_ordre, nom_denomination ou raison_sociale commence par `q`.
+
+        Classement : position du mot correspondant (début du champ d'abord), puis priorité du
+        champ, puis nom. Un expert n'apparaît qu'une fois, avec sa meilleure correspondance.
+        """
+        prefix = fold(q)
+        if not prefix or limit <= 0:
+            return []
+        keys = self._keys
+        best: dict[uuid.UUID, tuple[int, int]] = {}
+        idx = bisect_left(keys, (prefix,))
+        while idx < len(keys) and keys[idx][0].startswith(prefix):
+            _, position, rank, expert_id = keys[idx]
+            idx += 1
+            entry = self._entries.get(expert_id)
+            if entry is None:
+                continue
+            if active is not None and entry.active != active:
+                continue
+            if type_ec and entry.type_ec != type_ec:
+                continue
+            current = best.get(expert_id)
+            if current is None or (position, rank) < current:
+                best[expert_id] = (position, rank)
+        ranked = heapq.nsmallest(
+            limit,
+            best.items(),
+            key=lambda item: (item[1], self._names[item[0]], item[0]),
+        )
+        return [self._entries[expert_id] for expert_id, _ in ranked]
+
+
+expert_index = ExpertSuggestIndex()
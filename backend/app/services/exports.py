@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import csv
+import io
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Sequence
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+EXPORT_FORMATS = ("csv", "xlsx")
+# Séparateur attendu par Excel en paramètres régionaux français
+CSV_DELIMITER = ";"
+# Lignes lues par aller-retour sur le curseur serveur, et lignes CSV par bloc envoyé
+STREAM_BATCH_SIZE = 1000
+_XLSX_CHUNK_SIZE = 64 * 1024
+
+_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def check_export_format(value: str) -> str:
+    fmt = (value or "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="format invalide (csv ou xlsx)")
+    return fmt
+
+
+def parse_export_date(value: str | None, field: str) -> date | None:
+    """Date de filtre d'un export ; une valeur illisible est refusée (400), jamais ignorée."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{field} invalide")
+
+
+def export_filename(prefix: str, date_start: date | None, date_end: date | None) -> str:
+    """Nom du fichier exporté, construit à partir des dates analysées (jamais du texte reçu)."""
+    debut = date_start.isoformat() if date_start else "debut"
+    fin = date_end.isoformat() if date_end else "fin"
+    return f"{prefix}_{debut}_{fin}"
+
+
+async def stream_rows(
+    bind: AsyncEngine,
+    statement: Any,
+    params: dict[str, Any] | None = None,
+) -> AsyncIterator[Sequence[Any]]:
+    """
+    Parcourt `statement` via un curseur serveur, par lots de STREAM_BATCH_SIZE lignes.
+
+    Une session dédiée est ouverte : la session de la requête est refermée par FastAPI avant
+    l'envoi du corps d'une StreamingResponse.
+    """
+    async with AsyncSession(bind) as session:
+        result = await session.stream(
+            statement,
+            params or {},
+            execution_options={"yield_per": STREAM_BATCH_SIZE},
+        )
+        async for row in result:
+            yield row
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # openpyxl ne gère pas les dates avec fuseau horaire
+        return value.replace(tzinfo=None)
+    return value
+
+
+def _csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return format(value, "f")
+    return value
+
+
+async def _csv_chunks(headers: Sequence[str], rows: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=CSV_DELIMITER)
+    # BOM pour qu'Excel détecte l'UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(headers)
+    pending = 0
+    async for row in rows:
+        writer.writerow([_csv_cell(value) for value in row])
+        pending += 1
+        if pending >= STREAM_BATCH_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+async def _xlsx_chunks(
+    sheet_title: str,
+    headers: Sequence[str],
+    rows: AsyncIterator[Sequence[Any]],
+) -> AsyncIterator[bytes]:
+    """
+    Classeur openpyxl en mode write-only : les lignes sont écrites au fil de l'eau dans un
+    fichier temporaire, puis le fichier .xlsx (zip) est renvoyé par morceaux.
+    """
+    from openpyxl import Workbook  # lazy import
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_title[:31])
+    ws.append(list(headers))
+    async for row in rows:
+        ws.append([_cell(value) for value in row])
+
+    with tempfile.TemporaryFile() as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(_XLSX_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def export_response(
+    *,
+    fmt: str,
+    filename: str,
+    headers: Sequence[str],
+    rows: AsyncIterator[Sequence[Any]],
+    sheet_title: str = "Export",
+) -> StreamingResponse:
+    if fmt == "xlsx":
+        body = _xlsx_chunks(sheet_title, headers, rows)
+    else:
+        body = _csv_chunks(headers, rows)
+    return StreamingResponse(
+        body,
+        media_type=_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import zlib
+from datetime import datetime
+from io import BytesIO
+from itertools import islice
+from typing import Any, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.import_file import ImportFile
+
+# Taille des blocs décompressés à la fois lors de la lecture paginée
+_DECOMPRESS_CHUNK = 64 * 1024
+
+
+def content_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def rows_to_jsonl(rows: list[dict]) -> bytes:
+    """Lignes JSON envoyées par le client, une par ligne, sous forme canonique (hachage stable)."""
+    return b"".join(
+        json.dumps(row, sort_keys=True, ensure_ascii=False, default=_json_default).encode("utf-8") + b"\n"
+        for row in rows
+    )
+
+
+async def _exists(db: AsyncSession, h: str) -> bool:
+    return await db.scalar(select(ImportFile.content_hash).where(ImportFile.content_hash == h)) is not None
+
+
+async def _insert(db: AsyncSession, h: str, data: bytes, *, fmt: str, size: int, row_count: int) -> None:
+    await db.execute(
+        pg_insert(ImportFile)
+        .values(content_hash=h, format=fmt, size_bytes=size, row_count=row_count, data=data)
+        .on_conflict_do_nothing(index_elements=[ImportFile.content_hash])
+    )
+
+
+async def store_import_file(db: AsyncSession, raw: bytes, *, fmt: str, row_count: int) -> str:
+    """
+    Stocke `raw` compressé dans import_files et renvoie son empreinte.
+
+    Un contenu déjà présent (ré-import du même fichier) n'est ni recompressé ni réécrit.
+    Pas de commit : l'écriture suit la transaction de l'import.
+    """
+    h = content_hash(raw)
+    if not await _exists(db, h):
+        await _insert(db, h, zlib.compress(raw, 6), fmt=fmt, size=len(raw), row_count=row_count)
+    return h
+
+
+class ImportFileWriter:
+    """
+    Empreinte et compression calculées au fil de la lecture d'un envoi : le fichier brut n'est
+    jamais entièrement en mémoire, seul son contenu compressé l'est.
+    """
+
+    def __init__(self) -> None:
+        self._hash = hashlib.sha256()
+        self._compressor = zlib.compressobj(6)
+        self._parts: list[bytes] = []
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self._parts.append(self._compressor.compress(chunk))
+        self.size += len(chunk)
+
+    async def store(self, db: AsyncSession, *, fmt: str, row_count: int) -> str:
+        h = self._hash.hexdigest()
+        if not await _exists(db, h):
+            data = b"".join(self._parts) + self._compressor.flush()
+            await _insert(db, h, data, fmt=fmt, size=self.size, row_count=row_count)
+        return h
+
+
+def _iter_jsonl(blob: bytes) -> Iterator[dict]:
+    # Décompression par blocs : une page en début de fichier ne décompresse pas tout le contenu
+    decompressor = zlib.decompressobj()
+    pending = b""
+    for start in range(0, len(blob), _DECOMPRESS_CHUNK):
+        pending += decompressor.decompress(blob[start:start + _DECOMPRESS_CHUNK])
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line:
+                yield json.loads(line)
+    pending += decompressor.flush()
+    for line in pending.split(b"\n"):
+        if line:
+            yield json.loads(line)
+
+
+def _iter_sheet(ws, sheet_name: str | None) -> Iterator[dict]:
+    rows = ws.iter_rows(values_only=True)
+    header_row = next(rows, None)
+    if header_row is None:
+        return
+    headers = [str(h).strip() if h is not None else "" for h in header_row]
+    for row in rows:
+        values = {
+            header: (row[idx] if idx < len(row) else None)
+            for idx, header in enumerate(headers)
+            if header
+        }
+        yield {"Feuille": sheet_name, **values} if sheet_name else values
+
+
+def _iter_xlsx(blob: bytes, all_sheets: bool) -> Iterator[dict]:
+    from openpyxl import load_workbook  # lazy import
+
+    wb = load_workbook(filename=BytesIO(zlib.decompress(blob)), read_only=True, data_only=True)
+    try:
+        if not all_sheets:
+            yield from _iter_sheet(wb.active, None)
+            return
+        for ws in wb.worksheets:
+            yield from _iter_sheet(ws, ws.title)
+    finally:
+        wb.close()
+
+
+def _iter_csv(blob: bytes) -> Iterator[dict]:
+    from app.services.csv_import import iter_csv_rows
+
+    _, rows = iter_csv_rows(BytesIO(zlib.decompress(blob)))
+    for _, row in rows:
+        yield row
+
+
+def iter_import_rows(fmt: str, blob: bytes) -> Iterator[dict]:
+    """xlsx : feuille active ; xlsx_multi : toutes les feuilles, avec une colonne Feuille."""
+    if fmt in ("xlsx", "xlsx_multi"):
+        return _iter_xlsx(blob, all_sheets=fmt == "xlsx_multi")
+    if fmt == "csv":
+        return _iter_csv(blob)
+    return _iter_jsonl(blob)
+
+
+async def read_import_rows(db: AsyncSession, file_hash: str, *, offset: int, limit: int) -> list[dict]:
+    """
+    Page de lignes d'un fichier stocké, décompressé à la demande jusqu'à offset + limit.
+    La lecture (décompression, analyse du classeur) se fait dans un thread, hors de la boucle.
+    """
+    result = await db.execute(
+        select(ImportFile.format, ImportFile.data).where(ImportFile.content_hash == file_hash)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return []
+    fmt, blob = row
+    return await asyncio.to_thread(_read_page, fmt, blob, offset, limit)
+
+
+def _read_page(fmt: str, blob: bytes, offset: int, limit: int) -> list[dict]:
+    return list(islice(iter_import_rows(fmt, blob), offset, offset + limit))
@@ -0,0 +1,491 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.print_settings import PrintSettings
+
+logger = logging.getLogger("onec_cpk_pdf")
+
+# Valeurs utilisées tant que print_settings n'a pas été enregistré (cf. get_print_settings)
+_DEFAULT_ORGANIZATION = "ONEC - Ordre National des Experts Comptables"
+_DEFAULT_SUBTITLE = "République Démocratique du Congo"
+_DEFAULT_FOOTER = "Ce reçu fait foi de paiement. Conservez-le précieusement."
+
+TYPE_CLIENT_LABELS = {
+    "expert_comptable": "Expert-comptable",
+    "client_externe": "Client externe",
+    "banque_institution": "Banque / Institution",
+    "partenaire": "Partenaire",
+    "organisation": "Organisation",
+    "autre": "Autre",
+}
+OPERATION_LABELS = {
+    "cotisation_annuelle": "Cotisation annuelle",
+    "cotisation_trimestrielle": "Cotisation trimestrielle",
+    "inscription_tableau": "Inscription au tableau",
+    "reinscription": "Réinscription",
+    "formation": "Formation",
+    "seminaire_atelier": "Séminaire / Atelier",
+    "achat_documents": "Achat de documents",
+    "penalites_amendes": "Pénalités / amendes",
+    "regularisation": "Régularisation",
+    "contribution_speciale": "Contribution spéciale",
+    "autres_paiements_pro": "Autres paiements professionnels",
+    "achat_formation": "Achat de formation",
+    "frais_participation_evenement": "Frais de participation événement",
+    "achat_documents_client": "Achat de documents",
+    "frais_attestation": "Frais d'attestation",
+    "frais_certification": "Frais de certification",
+    "frais_service": "Frais de service",
+    "contribution": "Contribution",
+    "don_soutien": "Don / soutien",
+    "depot_bancaire": "Dépôt bancaire",
+    "versement_bancaire": "Versement bancaire",
+    "virement_bancaire_recu": "Virement bancaire",
+    "subvention": "Subvention",
+    "appui_financier": "Appui financier",
+    "financement_projet": "Financement de projet",
+    "interets_bancaires": "Intérêts bancaires",
+    "remboursement_bancaire": "Remboursement bancaire",
+    "don_institutionnel": "Don institutionnel",
+    "transfert_fonds": "Transfert de fonds",
+    "partenariat": "Partenariat",
+    "sponsoring": "Sponsoring",
+    "financement_activite": "Financement d'activité",
+    "autre_encaissement": "Autre encaissement",
+    "livre": "Livre",
+    "autre": "Autre",
+}
+MODE_PAIEMENT_LABELS = {
+    "cash": "Espèces",
+    "check": "Chèque",
+    "virement": "Virement bancaire",
+    "bank_transfer": "Virement bancaire",
+    "mobile_money": "Mobile Money",
+}
+STATUT_LABELS = {
+    "non_paye": "Non payé",
+    "partiel": "Paiement partiel",
+    "complet": "Payé en totalité",
+    "avance": "Avance",
+}
+
+
+@dataclass(frozen=True)
+class PrintTemplate:
+    """Paramètres d'impression et ressources déjà téléchargées, transmis tels quels aux processus de rendu."""
+
+    version: str
+    organization_name: str
+    organization_subtitle: str
+    header_text: str
+    address: str
+    phone: str
+    email: str
+    footer_text: str
+    show_header_logo: bool
+    show_footer_signature: bool
+    signature_name: str
+    signature_title: str
+    paper_format: str
+    compact_header: bool
+    logo: bytes | None = None
+    stamp: bytes | None = None
+
+
+_template: PrintTemplate | None = None
+_executor: ProcessPoolExecutor | None = None
+
+
+def invalidate_print_template() -> None:
+    """À appeler après toute écriture de print_settings."""
+    global _template
+    _template = None
+
+
+async def _load_asset(url: str) -> bytes | None:
+    if not url:
+        return None
+    try:
+        if url.startswith("data:"):
+            return base64.b64decode(url.split(",", 1)[1])
+        if url.startswith(("http://", "https://")):
+            async with httpx.AsyncClient(timeout=5.0) as client:
+                resp = await client.get(url)
+                resp.raise_for_status()
+                return resp.content
+    except Exception as exc:
+        logger.warning("print asset unavailable url=%s error=%s", url[:100], exc)
+        return None
+    # Chemin relatif au frontend (ex: /imge_onec.png) : non accessible côté serveur
+    return None
+
+
+async def get_print_template(db: AsyncSession) -> PrintTemplate:
+    """
+    Modèle d'impression courant, mis en cache en mémoire avec le logo et le cachet.
+
+    Le cache est invalidé par update_print_settings et, pour les autres processus, par le
+    changement de updated_at.
+    """
+    global _template
+    row = (await db.execute(select(PrintSettings).limit(1))).scalar_one_or_none()
+    version = f"{row.id}:{row.updated_at.isoformat()}" if row else "defaut"
+    cached = _template
+    if cached is not None and cached.version == version:
+        return cached
+
+    def value(field: str, default: str = "") -> str:
+        return (getattr(row, field) if row else None) or default
+
+    template = PrintTemplate(
+        version=version,
+        organization_name=value("organization_name", _DEFAULT_ORGANIZATION),
+        organization_subtitle=value("organization_subtitle", _DEFAULT_SUBTITLE),
+        header_text=value("header_text"),
+        address=value("address"),
+        phone=value("phone"),
+        email=value("email"),
+        footer_text=value("footer_text", _DEFAULT_FOOTER),
+        show_header_logo=row.show_header_logo if row else True,
+        show_footer_signature=row.show_footer_signature if row else True,
+        signature_name=value("signature_name"),
+        signature_title=value("signature_title"),
+        paper_format=value("paper_format", "A5") if value("paper_format") in ("A4", "A5") else "A5",
+        compact_header=bool(row.compact_header) if row else False,
+        logo=await _load_asset(value("logo_url")),
+        stamp=await _load_asset(value("stamp_url")),
+    )
+    _template = template
+    return template
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max(1, settings.pdf_workers))
+    return _executor
+
+
+async def render_pdf(fn: Callable[..., bytes], *args: Any) -> bytes:
+    """Exécute une fonction de rendu dans le pool de processus (le rendu reportlab est CPU-bound)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), fn, *args)
+
+
+def shutdown_pdf_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+# --- Montant en lettres (même règles que frontend/src/utils/numberToWords.ts) ---
+
+_UNITES = ["", "un", "deux", "trois", "quatre", "cinq", "six", "sept", "huit", "neuf"]
+_DIZAINES = ["", "", "vingt", "trente", "quarante", "cinquante", "soixante", "soixante", "quatre-vingt", "quatre-vingt"]
+_EXCEPTIONS = ["dix", "onze", "douze", "treize", "quatorze", "quinze", "seize", "dix-sept", "dix-huit", "dix-neuf"]
+
+
+def _entier_en_lettres(n: int) -> str:
+    if n == 0:
+        return "zéro"
+    if n < 0:
+        return "moins " + _entier_en_lettres(-n)
+    result = ""
+    for seuil, nom in ((1_000_000_000, "milliard"), (1_000_000, "million")):
+        if n >= seuil:
+            q = n // seuil
+            result += _entier_en_lettres(q) + " " + nom + ("s" if q > 1 else "") + " "
+            n %= seuil
+    if n >= 1000:
+        q = n // 1000
+        result += "mille " if q == 1 else _entier_en_lettres(q) + " mille "
+        n %= 1000
+    if n >= 100:
+        q = n // 100
+        result += "cent " if q == 1 else _UNITES[q] + " cent "
+        n %= 100
+        if n == 0 and q > 1 and result.endswith("cent "):
+            result = result[:-1] + "s "
+    if n >= 20:
+        diz, unite = divmod(n, 10)
+        if diz in (7, 9):
+            result += _DIZAINES[diz] + "-" + _EXCEPTIONS[unite]
+        else:
+            result += _DIZAINES[diz]
+            if unite == 1 and diz != 8:
+                result += " et un"
+            elif unite > 0:
+                result += "-" + _UNITES[unite]
+            elif diz == 8:
+                result += "s"
+    elif n >= 10:
+        result += _EXCEPTIONS[n - 10]
+    elif n > 0:
+        result += _UNITES[n]
+    return result.strip()
+
+
+def montant_en_lettres(amount: Decimal | float | int) -> str:
+    value = abs(Decimal(str(amount)))
+    entier = int(value)
+    cents = int(((value - entier) * 100).quantize(Decimal("1")))
+    words = _entier_en_lettres(entier) or "zéro"
+    words = words[0].upper() + words[1:]
+    if cents > 0:
+        return f"{words} dollars américains et {_entier_en_lettres(cents)} cents"
+    return f"{words} dollars américains"
+
+
+# --- Rendu (exécuté dans les processus du pool) ---
+
+# Images décodées par processus de rendu, par version du modèle
+_images: dict[tuple[str, str], Any] = {}
+
+
+def _image(template: PrintTemplate, kind: str):
+    from reportlab.lib.utils import ImageReader  # lazy import
+
+    data = template.logo if kind == "logo" else template.stamp
+    if not data:
+        return None
+    key = (template.version, kind)
+    if key not in _images:
+        if len(_images) > 8:
+            _images.clear()
+        try:
+            _images[key] = ImageReader(io.BytesIO(data))
+        except Exception:
+            _images[key] = None
+    return _images[key]
+
+
+def _format_amount(value: Any) -> str:
+    amount = Decimal(str(value or 0)).quantize(Decimal("0.01"))
+    entier, _, decimales = f"{amount:,.2f}".partition(".")
+    return f"{entier.replace(',', ' ')},{decimales} $"
+
+
+def _format_date(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.strftime("%d/%m/%Y")
+    if isinstance(value, date):
+        return value.strftime("%d/%m/%Y")
+    return str(value or "")
+
+
+class _Page:
+    """Curseur vertical sur une page reportlab, avec les éléments communs (en-tête, pied)."""
+
+    def __init__(self, canvas, template: PrintTemplate, page_size):
+        from reportlab.lib.units import mm  # lazy import
+
+        self.c = canvas
+        self.t = template
+        self.mm = mm
+        self.width, self.height = page_size
+        self.margin = (10 if template.paper_format == "A4" else 8) * mm
+        self.y = self.height - self.margin
+        self.scale = 1.0 if template.paper_format == "A4" else 0.85
+
+    def font(self, size: float, bold: bool = False) -> None:
+        self.c.setFont("Helvetica-Bold" if bold else "Helvetica", size * self.scale)
+
+    def line(self, text: str, size: float = 9, bold: bool = False, center: bool = False, gap: float = 1.4) -> None:
+        self.font(size, bold)
+        if center:
+            self.c.drawCentredString(self.width / 2, self.y, text)
+        else:
+            self.c.drawString(self.margin, self.y, text)
+        self.y -= size * self.scale * gap
+
+    def header(self, title: str, duplicata: bool = False) -> None:
+        mm = self.mm
+        logo = _image(self.t, "logo") if self.t.show_header_logo else None
+        logo_size = (14 if self.t.compact_header else 20) * mm
+        top = self.y
+        if logo is not None:
+            self.c.drawImage(logo, self.margin, top - logo_size, logo_size, logo_size, preserveAspectRatio=True, mask="auto")
+        self.font(12 if self.t.compact_header else 13, bold=True)
+        self.c.drawCentredString(self.width / 2, top - 4 * mm, self.t.organization_name)
+        self.y = top - 9 * mm
+        for text in (self.t.organization_subtitle, self.t.header_text):
+            if text:
+                self.line(text, 9, center=True)
+        if not self.t.compact_header:
+            contact = " | ".join(
+                part
+                for part in (
+                    self.t.address,
+                    f"Tél: {self.t.phone}" if self.t.phone else "",
+                    f"Email: {self.t.email}" if self.t.email else "",
+                )
+                if part
+            )
+            if contact:
+                self.line(contact, 8, center=True)
+        self.y = min(self.y, top - logo_size - 2 * mm)
+        self.c.line(self.margin, self.y, self.width - self.margin, self.y)
+        self.y -= 8 * mm
+        self.line(title, 14, bold=True, center=True, gap=1.8)
+        if duplicata:
+            self.line("DUPLICATA", 11, bold=True, center=True)
+
+    def field(self, label: str, value: str, size: float = 9) -> None:
+        self.font(size, bold=True)
+        self.c.drawString(self.margin, self.y, label)
+        self.font(size)
+        self.c.drawString(self.margin + 42 * self.mm * self.scale, self.y, value[:90])
+        self.y -= size * self.scale * 1.6
+
+    def signature(self, labels: tuple[str, ...]) -> None:
+        mm = self.mm
+        if not self.t.show_footer_signature:
+            return
+        self.y -= 6 * mm
+        slot = (self.width - 2 * self.margin) / len(labels)
+        for idx, label in enumerate(labels):
+            x = self.margin + slot * idx + slot / 2
+            self.font(9, bold=True)
+            self.c.drawCentredString(x, self.y, label)
+        stamp = _image(self.t, "stamp")
+        last_x = self.margin + slot * (len(labels) - 1) + slot / 2
+        if stamp is not None:
+            size = 22 * mm * self.scale
+            self.c.drawImage(stamp, last_x - size / 2, self.y - size - 2 * mm, size, size, preserveAspectRatio=True, mask="auto")
+        self.y -= 28 * mm * self.scale
+        for text in (self.t.signature_name, self.t.signature_title):
+            if text:
+                self.font(8, bold=text == self.t.signature_name)
+                self.c.drawCentredString(last_x, self.y, text)
+                self.y -= 10 * self.scale
+
+    def footer(self, label: str, page: int, pages: int | None, printed_at: str) -> None:
+        mm = self.mm
+        if self.t.footer_text:
+            self.font(8)
+            self.c.drawCentredString(self.width / 2, self.margin + 8 * mm, self.t.footer_text[:140])
+        self.font(7)
+        self.c.drawString(self.margin, self.margin, printed_at)
+        self.c.drawCentredString(self.width / 2, self.margin, label)
+        self.c.drawRightString(self.width - self.margin, self.margin, f"Page {page}/{pages}" if pages else f"Page {page}")
+
+
+def _new_canvas(template: PrintTemplate, buffer: io.BytesIO, title: str):
+    from reportlab.lib.pagesizes import A4, A5  # lazy import
+    from reportlab.pdfgen.canvas import Canvas
+
+    page_size = A4 if template.paper_format == "A4" else A5
+    canvas = Canvas(buffer, pagesize=page_size, pageCompression=1)
+    canvas.setTitle(title)
+    canvas.setAuthor(template.organization_name)
+    return canvas, page_size
+
+
+def render_receipts(template: PrintTemplate, receipts: list[dict[str, Any]], duplicata: bool = False) -> bytes:
+    """Un reçu par page ; un seul PDF pour tout le lot."""
+    buffer = io.BytesIO()
+    title = receipts[0]["numero_recu"] if len(receipts) == 1 else f"Reçus ({len(receipts)})"
+    canvas, page_size = _new_canvas(template, buffer, title)
+    printed_at = datetime.now(timezone.utc).strftime("%d/%m/%Y %H:%M")
+    for idx, enc in enumerate(receipts, start=1):
+        page = _Page(canvas, template, page_size)
+        page.header("REÇU DE PAIEMENT", duplicata)
+        expert = enc.get("expert_comptable")
+        page.field("N° reçu :", enc["numero_recu"])
+        page.field("Date :", _format_date(enc["date_encaissement"]))
+        page.field("Reçu de :", expert["nom_denomination"] if expert else (enc.get("client_nom") or "N/A"))
+        page.field("", f"N° Ordre: {expert['numero_ordre']}" if expert else "Autre client")
+        page.field("Type de client :", TYPE_CLIENT_LABELS.get(enc["type_client"], enc["type_client"]))
+        page.field("Opération :", OPERATION_LABELS.get(enc["type_operation"], enc["type_operation"]))
+        if enc.get("description"):
+            page.field("Description :", enc["description"])
+        page.field("Mode de paiement :", MODE_PAIEMENT_LABELS.get(enc["mode_paiement"], enc["mode_paiement"]))
+        if enc.get("reference"):
+            page.field("Référence :", enc["reference"])
+
+        page.y -= 3 * page.mm
+        montant_total = Decimal(str(enc["montant_total"] or 0))
+        montant_paye = Decimal(str(enc["montant_paye"] or 0))
+        restant = montant_total - montant_paye
+        amounts = [("Montant total :", montant_total), ("Montant payé :", montant_paye)]
+        if restant > 0:
+            amounts.append(("Solde restant :", restant))
+        for label, amount in amounts:
+            page.field(label, _format_amount(amount), size=10)
+            page.line(montant_en_lettres(amount), 8)
+        statut = (enc.get("statut_paiement") or "").lower()
+        page.field("Statut :", STATUT_LABELS.get(statut, statut))
+
+        page.signature(("Cachet & signature",))
+        page.footer("Reçu de paiement - ONEC/CPK", 1, 1, printed_at)
+        canvas.showPage()
+        if idx % 50 == 0:
+            logger.debug("receipts rendered=%s/%s", idx, len(receipts))
+    canvas.save()
+    return buffer.getvalue()
+
+
+def render_requisition(template: PrintTemplate, requisition: dict[str, Any], lignes: list[dict[str, Any]]) -> bytes:
+    buffer = io.BytesIO()
+    canvas, page_size = _new_canvas(template, buffer, requisition["numero_requisition"])
+    printed_at = datetime.now(timezone.utc).strftime("%d/%m/%Y %H:%M")
+    page = _Page(canvas, template, page_size)
+    page.header("BON DE RÉQUISITION")
+    page.field("N° réquisition :", requisition["numero_requisition"])
+    page.field("Date :", _format_date(requisition["created_at"]))
+    page.field("Objet :", requisition["objet"])
+    page.field("Mode de paiement :", MODE_PAIEMENT_LABELS.get(requisition["mode_paiement"], requisition["mode_paiement"]))
+    page.field("Statut :", requisition["status"])
+    if requisition.get("a_valoir") and requisition.get("instance_beneficiaire"):
+        page.field("À valoir :", requisition["instance_beneficiaire"])
+
+    mm = page.mm
+    columns = (("Rubrique", 0), ("Description", 38), ("Qté", 96), ("P.U.", 108), ("Total", 128))
+    usable = page.width - 2 * page.margin
+    col_scale = usable / (140 * mm)
+
+    def row(values: tuple[str, ...], bold: bool = False) -> None:
+        page.font(8, bold)
+        for (_, offset), text in zip(columns, values):
+            page.c.drawString(page.margin + offset * mm * col_scale, page.y, text)
+        page.y -= 8 * 1.5 * page.scale
+
+    page.y -= 3 * mm
+    row(tuple(name for name, _ in columns), bold=True)
+    for ligne in lignes:
+        if page.y < page.margin + 60 * mm:
+            page.footer("Bon de réquisition - ONEC/CPK", canvas.getPageNumber(), None, printed_at)
+            canvas.showPage()
+            page = _Page(canvas, template, page_size)
+        row(
+            (
+                str(ligne["rubrique"])[:22],
+                str(ligne["description"])[:34],
+                str(ligne["quantite"]),
+                _format_amount(ligne["montant_unitaire"]),
+                _format_amount(ligne["montant_total"]),
+            )
+        )
+    page.y -= 3 * mm
+    page.field("Montant total :", _format_amount(requisition["montant_total"]), size=10)
+    page.line(montant_en_lettres(requisition["montant_total"] or 0), 8)
+    page.signature(("Demandeur", "Validé par", "Approuvé par"))
+    page.footer("Bon de réquisition - ONEC/CPK", canvas.getPageNumber(), canvas.getPageNumber(), printed_at)
+    canvas.showPage()
+    canvas.save()
+    return buffer.getvalue()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+import weakref
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+from pydantic import BaseModel
+from sqlalchemy import delete, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.models.report_job import ReportJob
+
+logger = logging.getLogger("onec_cpk_report_jobs")
+
+ReportCompute = Callable[[AsyncSession], Awaitable[BaseModel]]
+
+# Une file par boucle d'événements : un Semaphore asyncio est lié à la boucle qui l'utilise
+_slots: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+_tasks: set[asyncio.Task] = set()
+
+# Statuts d'un calcul non terminé : jamais purgé, expires_at n'est fixé qu'à la fin du calcul
+ACTIVE_STATUSES = ("pending", "running")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _ttl() -> timedelta:
+    return timedelta(minutes=settings.report_jobs_ttl_minutes)
+
+
+def _worker_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _slots.get(loop)
+    if slots is None:
+        slots = asyncio.Semaphore(max(1, settings.report_jobs_workers))
+        _slots[loop] = slots
+    return slots
+
+
+def params_hash(kind: str, params: dict[str, Any]) -> str:
+    canonical = json.dumps({"kind": kind, "params": params}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def load_result(job: ReportJob) -> dict[str, Any] | None:
+    if job.result is None:
+        return None
+    return json.loads(zlib.decompress(job.result))
+
+
+def _reusable(h: str, now: datetime):
+    # Les échecs ne sont pas réutilisés : une nouvelle demande relance le calcul
+    return (
+        select(ReportJob)
+        .where(
+            ReportJob.params_hash == h,
+            ReportJob.status != "failed",
+            or_(ReportJob.status.in_(ACTIVE_STATUSES), ReportJob.expires_at > now),
+        )
+        .order_by(ReportJob.created_at.desc())
+        .limit(1)
+    )
+
+
+async def submit_job(
+    db: AsyncSession,
+    *,
+    kind: str,
+    params: dict[str, Any],
+    created_by: uuid.UUID | None,
+    compute: ReportCompute,
+) -> ReportJob:
+    """
+    Enregistre une demande de rapport et lance son calcul en arrière-plan.
+
+    Une demande identique (même kind/params) en attente, en cours ou terminée et non expirée
+    est renvoyée telle quelle au lieu d'être recalculée. La durée de conservation court à
+    partir de la fin du calcul. Les calculs simultanés sont limités à `report_jobs_workers` ;
+    `compute` reçoit une session dédiée. Commit.
+    """
+    now = _utcnow()
+    h = params_hash(kind, params)
+    await db.execute(
+        delete(ReportJob).where(ReportJob.status.not_in(ACTIVE_STATUSES), ReportJob.expires_at <= now)
+    )
+
+    existing = (await db.execute(_reusable(h, now))).scalar_one_or_none()
+    if existing is not None:
+        await db.commit()
+        return existing
+
+    result = await db.execute(
+        pg_insert(ReportJob)
+        .values(
+            id=uuid.uuid4(),
+            kind=kind,
+            params=params,
+            params_hash=h,
+            status="pending",
+            created_by=created_by,
+            created_at=now,
+        )
+        .on_conflict_do_nothing(
+            index_elements=[ReportJob.params_hash],
+            # Littéral : le prédicat doit correspondre à celui de l'index partiel ux_report_jobs_active_params
+            index_where=text("status IN ('pending','running')"),
+        )
+        .returning(ReportJob)
+    )
+    job = result.scalar_one_or_none()
+    if job is None:
+        # Demande identique enregistrée entre-temps par une autre requête
+        job = (await db.execute(_reusable(h, now))).scalar_one()
+        await db.commit()
+        return job
+    await db.commit()
+
+    task = asyncio.create_task(_run_job(db.bind, job.id, compute))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    logger.info("report job queued id=%s kind=%s", job.id, kind)
+    return job
+
+
+async def _run_job(bind: AsyncEngine, job_id: uuid.UUID, compute: ReportCompute) -> None:
+    async with _worker_slots():
+        async with AsyncSession(bind, expire_on_commit=False) as session:
+            await session.execute(
+                update(ReportJob).where(ReportJob.id == job_id).values(status="running", started_at=_utcnow())
+            )
+            await session.commit()
+            try:
+                report = await compute(session)
+            except Exception as exc:
+                await session.rollback()
+                logger.exception("report job failed id=%s", job_id)
+                values: dict[str, Any] = {"status": "failed", "error": str(exc)[:1000]}
+            else:
+                values = {
+                    "status": "done",
+                    "result": zlib.compress(report.model_dump_json().encode("utf-8")),
+                }
+            now = _utcnow()
+            await session.execute(
+                update(ReportJob)
+                .where(ReportJob.id == job_id)
+                .values(finished_at=now, expires_at=now + _ttl(), **values)
+            )
+            await session.commit()
+            logger.info("report job finished id=%s status=%s", job_id, values["status"])
+
+
+async def drain() -> None:
+    """Attend la fin des calculs lancés par ce processus (arrêt de l'application, tests)."""
+    while _tasks:
+        await asyncio.gather(*list(_tasks), return_exceptions=True)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Any
+
+from app.core.config import settings
+
+# (nom de la feuille, en-têtes, lignes {en-tête: valeur})
+ParsedSheet = tuple[str, list[str], list[dict[str, Any]]]
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _load(file_bytes: bytes):
+    from openpyxl import load_workbook  # lazy import
+
+    return load_workbook(filename=BytesIO(file_bytes), read_only=True, data_only=True)
+
+
+def _sheet_names(file_bytes: bytes) -> list[str]:
+    wb = _load(file_bytes)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def _parse_sheet(file_bytes: bytes, sheet_name: str) -> ParsedSheet:
+    # Exécuté dans un processus du pool : chaque processus ouvre le classeur et ne lit que sa feuille
+    wb = _load(file_bytes)
+    try:
+        rows = wb[sheet_name].iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            return sheet_name, [], []
+        headers = [str(h).strip() if h is not None else "" for h in header_row]
+        data_rows = [
+            {header: (row[idx] if idx < len(row) else None) for idx, header in enumerate(headers) if header}
+            for row in rows
+        ]
+        return sheet_name, headers, data_rows
+    finally:
+        wb.close()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max(1, settings.import_workers))
+    return _executor
+
+
+async def read_workbook_sheets(file_bytes: bytes) -> list[ParsedSheet]:
+    """Lit toutes les feuilles d'un classeur, en parallèle dans le pool de processus (ordre du classeur)."""
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    names = await loop.run_in_executor(executor, _sheet_names, file_bytes)
+    return list(
+        await asyncio.gather(*(loop.run_in_executor(executor, _parse_sheet, file_bytes, name) for name in names))
+    )
+
+
+def shutdown_import_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
@@ -12,9 +12,22 @@ if str(BACKEND_ROOT) not in sys.path:
     sys.path.insert(0, str(BACKEND_ROOT))
 
 from app.db.base import Base  # noqa: E402
+from app.models import cotisation_statut as _cotisation_statut  # noqa: F401,E402
 from app.models import encaissement as _encaissement  # noqa: F401,E402
 from app.models import expert_comptable as _expert_comptable  # noqa: F401,E402
+from app.models import import_expert_change as _import_expert_change  # noqa: F401,E402
+from app.models import import_file as _import_file  # noqa: F401,E402
+from app.models import imports_history as _imports_history  # noqa: F401,E402
+from app.models import ligne_requisition as _ligne_requisition  # noqa: F401,E402
 from app.models import payment_history as _payment_history  # noqa: F401,E402
+from app.models import print_settings as _print_settings  # noqa: F401,E402
+from app.models import remboursement_transport as _remboursement_transport  # noqa: F401,E402
+from app.models import report_job as _report_job  # noqa: F401,E402
+from app.models import report_snapshot as _report_snapshot  # noqa: F401,E402
+from app.models import requisition as _requisition  # noqa: F401,E402
+from app.models import rubrique as _rubrique  # noqa: F401,E402
+from app.models import rubrique_budget as _rubrique_budget  # noqa: F401,E402
+from app.models import sortie_fonds as _sortie_fonds  # noqa: F401,E402
 from app.models import user as _user  # noqa: F401,E402
 
 
@@ -0,0 +1,116 @@
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+
+from app.api.v1.endpoints.admin import reconcile_budgets, set_rubrique_budget
+from app.api.v1.endpoints.domain import list_rubrique_budgets
+from app.api.v1.endpoints.requisitions import reject_requisition, validate_requisition
+from app.api.v1.endpoints.sorties_fonds import create_sortie_fonds
+from app.models.ligne_requisition import LigneRequisition
+from app.models.requisition import Requisition
+from app.models.rubrique import Rubrique
+from app.models.rubrique_budget import RubriqueBudget
+from app.models.sortie_fonds import SortieFonds
+from app.models.user import User
+from app.schemas.admin import RubriqueBudgetUpsertRequest
+from app.schemas.sortie_fonds import SortieFondsCreate
+
+
+async def _budgets(db_session, user):
+    rows = await list_rubrique_budgets(annee=2026, db=db_session, user=user)
+    return {row.rubrique_code: (row.budget, row.montant_engage, row.montant_paye, row.disponible) for row in rows}
+
+
+@pytest.mark.asyncio
+async def test_rubrique_budget_counters_and_reconciliation(db_session):
+    await db_session.execute(delete(RubriqueBudget))
+    await db_session.execute(delete(SortieFonds))
+    await db_session.execute(delete(LigneRequisition))
+    await db_session.execute(delete(Requisition))
+    await db_session.execute(delete(Rubrique))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="budgets@example.com", role="admin")
+    fournitures = Rubrique(code="FOURN", libelle="Fournitures", active=True)
+    missions = Rubrique(code="MISS", libelle="Missions", active=True)
+    req = Requisition(
+        numero_requisition="REQ-BUD-0001",
+        objet="Achats",
+        mode_paiement="cash",
+        montant_total=360,
+        status="EN_ATTENTE",
+        created_at=datetime(2026, 4, 1, tzinfo=timezone.utc),
+    )
+    db_session.add_all([fournitures, missions, req])
+    await db_session.commit()
+    db_session.add_all(
+        [
+            LigneRequisition(requisition_id=req.id, rubrique="FOURN", description="Papier", quantite=2, montant_unitaire=150, montant_total=300),
+            LigneRequisition(requisition_id=req.id, rubrique="MISS", description="Taxi", quantite=1, montant_unitaire=50, montant_total=50),
+            LigneRequisition(requisition_id=req.id, rubrique="INCONNUE", description="Divers", quantite=1, montant_unitaire=10, montant_total=10),
+        ]
+    )
+    await db_session.commit()
+
+    await set_rubrique_budget(
+        rubrique_id=str(fournitures.id),
+        payload=RubriqueBudgetUpsertRequest(annee=2026, budget=Decimal("1000")),
+        db=db_session,
+    )
+    await validate_requisition(requisition_id=str(req.id), db=db_session, user=user)
+    # Revalider une réquisition déjà engagée ne compte pas deux fois
+    await validate_requisition(requisition_id=str(req.id), db=db_session, user=user)
+    await create_sortie_fonds(
+        payload=SortieFondsCreate(
+            type_sortie="requisition",
+            requisition_id=str(req.id),
+            rubrique_code="FOURN",
+            montant_paye=Decimal("120"),
+            date_paiement=datetime(2026, 4, 5, tzinfo=timezone.utc),
+            mode_paiement="cash",
+            motif="Papier",
+            beneficiaire="Papeterie",
+        ),
+        user=user,
+        db=db_session,
+    )
+
+    budgets = await _budgets(db_session, user)
+    assert budgets["FOURN"] == (Decimal("1000"), Decimal("300"), Decimal("120"), Decimal("700"))
+    assert budgets["MISS"] == (Decimal("0"), Decimal("50"), Decimal("0"), Decimal("-50"))
+
+    await reject_requisition(requisition_id=str(req.id), payload={"motif_rejet": "Hors budget"}, db=db_session, user=user)
+    budgets = await _budgets(db_session, user)
+    assert budgets["FOURN"][1:3] == (Decimal("0"), Decimal("120"))
+    assert budgets["MISS"][1] == Decimal("0")
+
+    report = await reconcile_budgets(annee=2026, fix=False, db=db_session)
+    assert report.drifts == []
+
+    await db_session.execute(
+        update(RubriqueBudget).where(RubriqueBudget.rubrique_code == "FOURN").values(montant_paye=999)
+    )
+    await db_session.commit()
+    report = await reconcile_budgets(annee=None, fix=True, db=db_session)
+    assert [(d.rubrique_code, d.montant_paye, d.montant_paye_attendu) for d in report.drifts] == [
+        ("FOURN", Decimal("999"), Decimal("120"))
+    ]
+    assert (await reconcile_budgets(annee=2026, fix=False, db=db_session)).drifts == []
+    budgets = await _budgets(db_session, user)
+    assert budgets["FOURN"] == (Decimal("1000"), Decimal("0"), Decimal("120"), Decimal("880"))
+
+
+@pytest.mark.asyncio
+async def test_set_rubrique_budget_rejects_malformed_id(db_session):
+    with pytest.raises(HTTPException) as exc:
+        await set_rubrique_budget(
+            rubrique_id="pas-un-uuid",
+            payload=RubriqueBudgetUpsertRequest(annee=2026, budget=Decimal("1000")),
+            db=db_session,
+        )
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "Invalid rubrique_id"
@@ -0,0 +1,161 @@
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, func, select, text
+
+from app.api.v1.endpoints.cotisations import generate_cotisations, list_cotisations, rebuild_cotisations
+from app.api.v1.endpoints.encaissements import create_encaissement, generate_numero_recu
+from app.api.v1.endpoints.payments import create_payment, create_payments_bulk
+from app.models.cotisation_statut import CotisationStatut
+from app.models.encaissement import Encaissement
+from app.models.expert_comptable import ExpertComptable
+from app.models.payment_history import PaymentHistory
+from app.models.user import User
+from app.schemas.cotisation import CotisationGenerateRequest
+from app.schemas.payment import EncaissementCreate, PaymentBulkRequest, PaymentHistoryCreate
+
+
+async def _list(db_session, user, statut):
+    return await list_cotisations(
+        annee=2026,
+        statut=statut,
+        type_ec=None,
+        active=True,
+        limit=100,
+        offset=0,
+        user=user,
+        db=db_session,
+    )
+
+
+@pytest.mark.asyncio
+async def test_cotisations_statut_maintained_on_encaissement_and_payments(db_session):
+    await db_session.execute(delete(CotisationStatut))
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.execute(delete(ExpertComptable))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="cotisations@example.com", role="admin")
+    payeur = ExpertComptable(numero_ordre="EC-COT-1", nom_denomination="Payeur", type_ec="EC", active=True)
+    retardataire = ExpertComptable(numero_ordre="EC-COT-2", nom_denomination="Retardataire", type_ec="EC", active=True)
+    db_session.add_all([payeur, retardataire])
+    await db_session.commit()
+
+    created = await create_encaissement(
+        payload=EncaissementCreate(
+            numero_recu="REC-COT-0001",
+            type_client="expert_comptable",
+            expert_comptable_id=str(payeur.id),
+            type_operation="cotisation_annuelle",
+            montant=100,
+            montant_total=100,
+            montant_paye=0,
+            date_encaissement=datetime(2026, 2, 1, tzinfo=timezone.utc),
+        ),
+        user=user,
+        db=db_session,
+    )
+
+    unpaid = await _list(db_session, user, "non_facture,impaye")
+    assert {row.numero_ordre for row in unpaid} == {"EC-COT-1", "EC-COT-2"}
+
+    await create_payment(
+        payload=PaymentHistoryCreate(encaissement_id=created["id"], montant=40),
+        user=user,
+        db=db_session,
+    )
+    partial = await _list(db_session, user, "partiel")
+    assert [row.numero_ordre for row in partial] == ["EC-COT-1"]
+    assert partial[0].restant == Decimal("60")
+
+    await create_payments_bulk(
+        payload=PaymentBulkRequest(entries=[PaymentHistoryCreate(encaissement_id=created["id"], montant=60)]),
+        user=user,
+        db=db_session,
+    )
+    solde = await _list(db_session, user, "solde")
+    assert [row.numero_ordre for row in solde] == ["EC-COT-1"]
+    assert solde[0].montant_paye == Decimal("100")
+    assert solde[0].dernier_paiement is not None
+
+    unpaid = await _list(db_session, user, "non_facture,impaye")
+    assert [row.numero_ordre for row in unpaid] == ["EC-COT-2"]
+
+    before = (await db_session.execute(select(CotisationStatut))).scalars().one()
+    before_values = (before.montant_facture, before.montant_paye, before.dernier_paiement)
+    res = await rebuild_cotisations(user=user, db=db_session)
+    assert res.rows == 1
+    db_session.expire_all()
+    after = (await db_session.execute(select(CotisationStatut))).scalars().one()
+    assert (after.montant_facture, after.montant_paye, after.dernier_paiement) == before_values
+
+
+@pytest.mark.asyncio
+async def test_generate_cotisations_dry_run_then_copy(db_session):
+    await db_session.execute(delete(CotisationStatut))
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.execute(delete(ExpertComptable))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="facturation@example.com", role="admin")
+    db_session.add_all(
+        [
+            ExpertComptable(numero_ordre="EC-GEN-1", nom_denomination="EC 1", type_ec="EC", active=True),
+            ExpertComptable(numero_ordre="EC-GEN-2", nom_denomination="EC 2", type_ec="EC", active=True),
+            ExpertComptable(numero_ordre="SEC-GEN-1", nom_denomination="SEC 1", type_ec="SEC", active=True),
+            ExpertComptable(numero_ordre="EC-GEN-3", nom_denomination="Inactif", type_ec="EC", active=False),
+        ]
+    )
+    await db_session.commit()
+
+    request = CotisationGenerateRequest(
+        annee=2026,
+        montant_ec=100,
+        montant_sec=300,
+        date_encaissement=datetime(2026, 1, 15, tzinfo=timezone.utc),
+        dry_run=True,
+    )
+    preview = await generate_cotisations(payload=request, user=user, db=db_session)
+    assert (preview.count, preview.count_ec, preview.count_sec) == (3, 2, 1)
+    assert preview.montant_total == Decimal("500")
+    assert await db_session.scalar(select(func.count()).select_from(Encaissement)) == 0
+
+    result = await generate_cotisations(
+        payload=request.model_copy(update={"dry_run": False}), user=user, db=db_session
+    )
+    assert result.count == 3
+    assert result.premier_numero == preview.premier_numero
+
+    rows = (await db_session.execute(select(Encaissement))).scalars().all()
+    assert len(rows) == 3
+    assert {r.statut_paiement for r in rows} == {"non_paye"}
+    assert sorted(r.montant_total for r in rows) == [Decimal("100"), Decimal("100"), Decimal("300")]
+    assert len({r.numero_recu for r in rows}) == 3
+
+    statut = (await db_session.execute(select(func.sum(CotisationStatut.montant_facture)))).scalar_one()
+    assert statut == Decimal("500")
+
+    again = await generate_cotisations(
+        payload=request.model_copy(update={"dry_run": False}), user=user, db=db_session
+    )
+    assert again.count == 0
+
+
+@pytest.mark.asyncio
+async def test_generate_numero_recu_takes_generation_lock(db_session, async_session):
+    user = User(id=uuid.uuid4(), email="caissier-lock@example.com", role="admin")
+    try_lock = text("SELECT pg_try_advisory_xact_lock(hashtext('encaissements.numero_recu'))")
+
+    # Tant que la transaction qui a attribué un numéro est ouverte, la génération en bloc attend
+    await generate_numero_recu(user=user, db=db_session)
+    async with async_session() as other:
+        assert await other.scalar(try_lock) is False
+        await other.rollback()
+
+        await db_session.rollback()
+        assert await other.scalar(try_lock) is True
+        await other.rollback()
@@ -0,0 +1,438 @@
+import io
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from openpyxl import Workbook
+from sqlalchemy import delete, func, select
+
+from app.api.v1.endpoints.experts import (
+    IMPORT_BATCH_SIZE,
+    _detect_category,
+    _import_csv,
+    _import_experts_payload,
+    _import_workbook,
+    rollback_import,
+    update_expert,
+)
+from app.api.v1.endpoints.imports_history import get_import_rows, list_imports_history
+from app.models.category_changes_history import CategoryChangesHistory
+from app.models.encaissement import Encaissement
+from app.models.expert_comptable import ExpertComptable
+from app.models.import_file import ImportFile
+from app.models.imports_history import ImportsHistory
+from app.models.payment_history import PaymentHistory
+from app.models.remboursement_transport import ParticipantTransport, RemboursementTransport
+from app.models.user import User
+from app.schemas.expert import ExpertComptableUpdate, ExpertImportRequest, ExpertImportRow
+
+
+def _request(rows, file_data=None):
+    return ExpertImportRequest(
+        category="independant",
+        filename="registre.xlsx",
+        rows=[ExpertImportRow(**row) for row in rows],
+        file_data=file_data,
+    )
+
+
+async def _reset(db_session):
+    await db_session.execute(delete(CategoryChangesHistory))
+    await db_session.execute(delete(ParticipantTransport))
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.execute(delete(ExpertComptable))
+    await db_session.execute(delete(ImportsHistory))
+    await db_session.execute(delete(ImportFile))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_import_experts_dry_run_diff_and_skip_unchanged(db_session):
+    await _reset(db_session)
+
+    user = User(id=uuid.uuid4(), email="import@example.com", role="admin")
+    db_session.add_all(
+        [
+            ExpertComptable(
+                numero_ordre="EC-IMP-1",
+                nom_denomination="Stable",
+                type_ec="EC",
+                statut_professionnel="Indépendant",
+                telephone="+243829000111",
+            ),
+            ExpertComptable(
+                numero_ordre="EC-IMP-2",
+                nom_denomination="Ancien nom",
+                type_ec="EC",
+                statut_professionnel="Indépendant",
+                nif="NIF-1",
+            ),
+        ]
+    )
+    await db_session.commit()
+
+    rows = [
+        # Inchangé : téléphone saisi sous une autre forme, champs vides ignorés
+        {"numero_ordre": "EC-IMP-1", "nom_denomination": "Stable", "statut_professionnel": "Indépendant", "telephone": "0829000111"},
+        {"numero_ordre": "EC-IMP-2", "nom_denomination": "Nouveau nom", "statut_professionnel": "Indépendant", "nif": "NIF-1"},
+        {"numero_ordre": "EC-IMP-3", "nom_denomination": "Arrivant", "statut_professionnel": "Indépendant"},
+        {"numero_ordre": "", "nom_denomination": "Sans numéro"},
+    ]
+
+    preview = await _import_experts_payload(_request(rows), user, db_session, dry_run=True)
+    assert preview.dry_run is True
+    assert (preview.imported, preview.updated, preview.unchanged, preview.skipped) == (1, 1, 1, 1)
+    assert [(d.ligne, d.numero_ordre) for d in preview.diff.nouveaux] == [(4, "EC-IMP-3")]
+    assert [(d.ligne, d.numero_ordre) for d in preview.diff.modifies] == [(3, "EC-IMP-2")]
+    assert [(c.champ, c.avant, c.apres) for c in preview.diff.modifies[0].changes] == [
+        ("nom_denomination", "Ancien nom", "Nouveau nom")
+    ]
+    assert [e["ligne"] for e in preview.errors] == [5]
+    assert await db_session.scalar(select(func.count()).select_from(ExpertComptable)) == 2
+    assert await db_session.scalar(select(func.count()).select_from(ImportsHistory)) == 0
+
+    result = await _import_experts_payload(_request(rows), user, db_session)
+    assert (result.imported, result.updated, result.unchanged, result.skipped) == (1, 1, 1, 1)
+    assert result.diff is None
+
+    experts = {
+        e.numero_ordre: e for e in (await db_session.execute(select(ExpertComptable))).scalars().all()
+    }
+    assert experts["EC-IMP-2"].nom_denomination == "Nouveau nom"
+    assert str(experts["EC-IMP-2"].import_id) == result.import_id
+    assert str(experts["EC-IMP-3"].import_id) == result.import_id
+    # Ligne inchangée non réécrite : pas rattachée au nouvel import
+    assert experts["EC-IMP-1"].import_id is None
+
+    again = await _import_experts_payload(_request(rows), user, db_session, dry_run=True)
+    assert (again.imported, again.updated, again.unchanged) == (0, 0, 3)
+
+
+@pytest.mark.asyncio
+async def test_import_files_stored_compressed_and_paged(db_session):
+    await _reset(db_session)
+    user = User(id=uuid.uuid4(), email="historique@example.com", role="admin")
+
+    raw_rows = [{"N° d'ordre": f"EC-HIS-{idx:03d}", "Noms": f"Expert {idx}"} for idx in range(30)]
+    rows = [{"numero_ordre": r["N° d'ordre"], "nom_denomination": r["Noms"]} for r in raw_rows]
+    first = await _import_experts_payload(_request(rows, file_data=raw_rows), user, db_session)
+    # Même fichier ré-importé : contenu stocké une seule fois
+    second = await _import_experts_payload(_request(rows, file_data=raw_rows), user, db_session)
+    assert second.unchanged == 30
+    assert await db_session.scalar(select(func.count()).select_from(ImportFile)) == 1
+
+    history = await list_imports_history(category=None, limit=50, offset=0, user=user, db=db_session)
+    assert {h.id for h in history} == {first.import_id, second.import_id}
+    assert {(h.file_format, h.file_rows) for h in history} == {("jsonl", 30)}
+
+    page = await get_import_rows(import_id=first.import_id, limit=10, offset=25, user=user, db=db_session)
+    assert page.total == 30
+    assert [r["N° d'ordre"] for r in page.items] == [f"EC-HIS-{idx:03d}" for idx in range(25, 30)]
+
+    # Fichier Excel envoyé en multipart : conservé tel quel
+    wb = Workbook()
+    wb.active.append(["N° d'ordre", "Noms", "Date"])
+    wb.active.append(["EC-XLS-1", "Classeur", datetime(2026, 1, 5)])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    xlsx = await _import_experts_payload(
+        _request([{"numero_ordre": "EC-XLS-1", "nom_denomination": "Classeur"}]),
+        user,
+        db_session,
+        raw_file=buffer.getvalue(),
+    )
+    page = await get_import_rows(import_id=xlsx.import_id, limit=10, offset=0, user=user, db=db_session)
+    assert page.total == 1
+    assert page.items == [{"N° d'ordre": "EC-XLS-1", "Noms": "Classeur", "Date": datetime(2026, 1, 5)}]
+
+    # Import antérieur : lignes lues dans l'ancienne colonne JSON
+    legacy = ImportsHistory(
+        filename="ancien.xlsx",
+        category="sec",
+        rows_imported=2,
+        status="success",
+        file_data=[{"a": 1}, {"a": 2}],
+        created_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+    db_session.add(legacy)
+    await db_session.commit()
+    page = await get_import_rows(import_id=str(legacy.id), limit=1, offset=1, user=user, db=db_session)
+    assert (page.total, page.items) == (2, [{"a": 2}])
+
+
+@pytest.mark.asyncio
+async def test_rollback_import_restores_before_images(db_session):
+    await _reset(db_session)
+    user = User(id=uuid.uuid4(), email="annulation@example.com", role="admin")
+
+    first = await _import_experts_payload(
+        _request([{"numero_ordre": "EC-RB-1", "nom_denomination": "Origine", "nif": "NIF-0"}]),
+        user,
+        db_session,
+    )
+    second = await _import_experts_payload(
+        _request(
+            [
+                {"numero_ordre": "EC-RB-1", "nom_denomination": "Renommé", "email": "rb@example.com"},
+                {"numero_ordre": "EC-RB-2", "nom_denomination": "Créé"},
+            ]
+        ),
+        user,
+        db_session,
+    )
+    assert (second.imported, second.updated) == (1, 1)
+
+    # Le premier import a été repris par le second : annulation refusée
+    with pytest.raises(HTTPException) as exc:
+        await rollback_import(import_id=first.import_id, db=db_session)
+    assert exc.value.status_code == 409
+
+    result = await rollback_import(import_id=second.import_id, db=db_session)
+    assert (result.deleted, result.restored) == (1, 1)
+
+    db_session.expire_all()
+    experts = (await db_session.execute(select(ExpertComptable))).scalars().all()
+    assert [(e.numero_ordre, e.nom_denomination, e.nif, e.email) for e in experts] == [
+        ("EC-RB-1", "Origine", "NIF-0", None)
+    ]
+    assert str(experts[0].import_id) == first.import_id
+    status = await db_session.scalar(
+        select(ImportsHistory.status).where(ImportsHistory.id == uuid.UUID(second.import_id))
+    )
+    assert status == "rolled_back"
+
+    with pytest.raises(HTTPException) as exc:
+        await rollback_import(import_id=second.import_id, db=db_session)
+    assert exc.value.status_code == 409
+
+    # Le premier import redevient le dernier : son annulation supprime l'expert créé
+    result = await rollback_import(import_id=first.import_id, db=db_session)
+    assert (result.deleted, result.restored) == (1, 0)
+    assert await db_session.scalar(select(func.count()).select_from(ExpertComptable)) == 0
+
+
+@pytest.mark.asyncio
+async def test_rollback_import_refuses_later_edits_and_transport_links(db_session):
+    await _reset(db_session)
+    user = User(id=uuid.uuid4(), email="annulation2@example.com", role="admin")
+    existing = ExpertComptable(numero_ordre="EC-RB-4", nom_denomination="Avant", type_ec="EC")
+    db_session.add(existing)
+    await db_session.commit()
+    existing_id = existing.id
+
+    imported = await _import_experts_payload(
+        _request(
+            [
+                {"numero_ordre": "EC-RB-3", "nom_denomination": "Créé"},
+                {"numero_ordre": "EC-RB-4", "nom_denomination": "Importé"},
+            ]
+        ),
+        user,
+        db_session,
+    )
+
+    # Modification manuelle après l'import : l'annulation l'écraserait
+    await update_expert(
+        expert_id=str(existing_id), payload=ExpertComptableUpdate(nom_denomination="Corrigé"), user=user, db=db_session
+    )
+    with pytest.raises(HTTPException) as exc:
+        await rollback_import(import_id=imported.import_id, db=db_session)
+    assert (exc.value.status_code, exc.value.detail) == (409, "1 expert(s) modifié(s) depuis cet import")
+    await update_expert(
+        expert_id=str(existing_id), payload=ExpertComptableUpdate(nom_denomination="Importé"), user=user, db=db_session
+    )
+
+    # Expert créé déjà rattaché à un remboursement de transport
+    created = await db_session.scalar(select(ExpertComptable).where(ExpertComptable.numero_ordre == "EC-RB-3"))
+    remboursement = RemboursementTransport(
+        numero_remboursement=f"RT-RB-{uuid.uuid4().hex[:8]}",
+        instance="Conseil National",
+        type_reunion="bureau",
+        nature_reunion="Réunion",
+        lieu="Kinshasa",
+        date_reunion=datetime(2026, 3, 1, tzinfo=timezone.utc),
+    )
+    db_session.add(remboursement)
+    await db_session.flush()
+    participant = ParticipantTransport(
+        remboursement_id=remboursement.id,
+        nom="Créé",
+        titre_fonction="Membre",
+        montant=10,
+        type_participant="principal",
+        expert_comptable_id=created.id,
+    )
+    db_session.add(participant)
+    await db_session.commit()
+    with pytest.raises(HTTPException) as exc:
+        await rollback_import(import_id=imported.import_id, db=db_session)
+    assert exc.value.status_code == 409
+    assert "remboursements de transport" in exc.value.detail
+
+    await db_session.delete(participant)
+    await db_session.delete(remboursement)
+    await db_session.commit()
+    result = await rollback_import(import_id=imported.import_id, db=db_session)
+    assert (result.deleted, result.restored) == (1, 1)
+    db_session.expire_all()
+    assert (await db_session.get(ExpertComptable, existing_id)).nom_denomination == "Avant"
+
+
+def test_detect_category_from_headers():
+    assert _detect_category(["N° d'ordre", "Dénomination", "Raison sociale"]) == "sec"
+    assert _detect_category(["N° d'ordre", "Noms", "Sexe", "NIF"]) == "independant"
+    assert _detect_category(["N° d'ordre", "Noms", "Cabinet d'attache"]) == "en_cabinet"
+    assert _detect_category(["N° d'ordre", "Noms", "Nom de l'employeur"]) == "salarie"
+    assert _detect_category(["Noms", "NIF"]) is None
+    assert _detect_category(["N° d'ordre", "NIF", "Cabinet d'attache"]) is None
+
+
+@pytest.mark.asyncio
+async def test_import_multi_sheet_workbook(db_session):
+    await _reset(db_session)
+    user = User(id=uuid.uuid4(), email="classeur@example.com", role="admin")
+
+    wb = Workbook()
+    sec = wb.active
+    sec.title = "SEC"
+    sec.append(["N° d'ordre", "Dénomination", "Raison sociale", "Associé gérant"])
+    sec.append(["SEC-WB-1", "Cabinet Alpha", "Alpha SARL", "M. Alpha"])
+    independants = wb.create_sheet("Indépendants")
+    independants.append(["N° d'ordre", "Noms", "Sexe", "NIF", "N° de téléphone"])
+    independants.append(["EC-WB-1", "Beta", "m", "NIF-B", "0829000113"])
+    independants.append(["SEC-WB-1", "Doublon", "f", "NIF-X", None])
+    salaries = wb.create_sheet("Salariés")
+    salaries.append(["N° d'ordre", "Noms", "Sexe", "Nom de l'employeur"])
+    salaries.append(["EC-WB-2", "Gamma", "F", "Banque"])
+    notes = wb.create_sheet("Notes")
+    notes.append(["Remarque"])
+    notes.append(["à ignorer"])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+
+    preview = await _import_workbook(buffer.getvalue(), "registre.xlsx", user, db_session, dry_run=True)
+    assert [(f.nom, f.category, f.lignes) for f in preview.feuilles] == [
+        ("SEC", "sec", 1),
+        ("Indépendants", "independant", 2),
+        ("Salariés", "salarie", 1),
+        ("Notes", None, 1),
+    ]
+    assert sorted((d.feuille, d.numero_ordre) for d in preview.diff.nouveaux) == [
+        ("Indépendants", "EC-WB-1"),
+        ("SEC", "SEC-WB-1"),
+        ("Salariés", "EC-WB-2"),
+    ]
+    assert preview.errors == [
+        {
+            "feuille": "Indépendants",
+            "ligne": 3,
+            "champ": "numero_ordre",
+            "message": "Doublon : N° d'ordre déjà présent dans la feuille « SEC » (ligne 2)",
+        }
+    ]
+
+    result = await _import_workbook(buffer.getvalue(), "registre.xlsx", user, db_session)
+    assert (result.imported, result.skipped) == (3, 1)
+    experts = {
+        e.numero_ordre: e for e in (await db_session.execute(select(ExpertComptable))).scalars().all()
+    }
+    assert (experts["SEC-WB-1"].type_ec, experts["SEC-WB-1"].raison_sociale) == ("SEC", "Alpha SARL")
+    assert (experts["EC-WB-1"].statut_professionnel, experts["EC-WB-1"].nif) == ("Indépendant", "NIF-B")
+    assert experts["EC-WB-1"].telephone == "+243829000113"
+    assert experts["EC-WB-2"].nom_employeur == "Banque"
+
+    page = await get_import_rows(import_id=result.import_id, limit=10, offset=0, user=user, db=db_session)
+    assert page.total == 5
+    assert [(r["Feuille"], r.get("N° d'ordre")) for r in page.items] == [
+        ("SEC", "SEC-WB-1"),
+        ("Indépendants", "EC-WB-1"),
+        ("Indépendants", "SEC-WB-1"),
+        ("Salariés", "EC-WB-2"),
+        ("Notes", None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_import_csv_latin1_semicolon_detects_category(db_session):
+    await _reset(db_session)
+    user = User(id=uuid.uuid4(), email="csv@example.com", role="admin")
+
+    content = (
+        "N° d'ordre;Noms;Sexe;NIF;N° de téléphone\r\n"
+        "EC-CSV-1;Hélène Kabila;f;NIF-1;0829000114\r\n"
+        ";;;;\r\n"
+        "EC-CSV-2;\"Mbuyi; André\";m;NIF-2;\r\n"
+    ).encode("latin-1")
+
+    preview = await _import_csv(UploadFile(io.BytesIO(content), filename="registre.csv"), None, "registre.csv", user, db_session, dry_run=True)
+    assert [(d.ligne, d.numero_ordre) for d in preview.diff.nouveaux] == [(2, "EC-CSV-1"), (4, "EC-CSV-2")]
+
+    result = await _import_csv(UploadFile(io.BytesIO(content), filename="registre.csv"), "auto", "registre.csv", user, db_session)
+    assert (result.imported, result.total_lignes) == (2, 2)
+    experts = {
+        e.numero_ordre: e for e in (await db_session.execute(select(ExpertComptable))).scalars().all()
+    }
+    assert (experts["EC-CSV-1"].nom_denomination, experts["EC-CSV-1"].sexe) == ("Hélène Kabila", "F")
+    assert experts["EC-CSV-1"].statut_professionnel == "Indépendant"
+    assert experts["EC-CSV-1"].telephone == "+243829000114"
+    assert experts["EC-CSV-2"].nom_denomination == "Mbuyi; André"
+
+    stored = await db_session.get(ImportFile, (await db_session.get(ImportsHistory, uuid.UUID(result.import_id))).file_hash)
+    assert (stored.format, stored.size_bytes) == ("csv", len(content))
+    page = await get_import_rows(import_id=result.import_id, limit=10, offset=1, user=user, db=db_session)
+    assert page.items == [
+        {"N° d'ordre": "EC-CSV-2", "Noms": "Mbuyi; André", "Sexe": "m", "NIF": "NIF-2", "N° de téléphone": ""}
+    ]
+
+    with pytest.raises(HTTPException) as exc:
+        await _import_csv(UploadFile(io.BytesIO(b"Nom,Prenom\r\nA,B\r\n"), filename="x.csv"), None, "x.csv", user, db_session)
+    assert exc.value.status_code == 400
+
+    # Accents Latin-1 au-delà de l'extrait analysé (détecté UTF-8) : lus en Latin-1
+    late = (
+        "N° d'ordre;Noms;Sexe;NIF;Observations\n"
+        f"EC-CSV-3;Premier;M;NIF-3;{'x' * 70000}\n"
+        "EC-CSV-4;Désiré Tshala;M;NIF-4;\n"
+    ).encode("latin-1")
+    result = await _import_csv(UploadFile(io.BytesIO(late), filename="tardif.csv"), None, "tardif.csv", user, db_session)
+    assert (result.imported, result.errors) == (2, [])
+    assert await db_session.scalar(
+        select(ExpertComptable.nom_denomination).where(ExpertComptable.numero_ordre == "EC-CSV-4")
+    ) == "Désiré Tshala"
+
+    # Fichier illisible : 400 avec la ligne en cause, pas une erreur générique
+    broken = f"N° d'ordre;Noms;NIF\nEC-CSV-5;Cinq;NIF-5\nEC-CSV-6;{'y' * 200000};NIF-6\n".encode("utf-8")
+    with pytest.raises(HTTPException) as exc:
+        await _import_csv(UploadFile(io.BytesIO(broken), filename="casse.csv"), None, "casse.csv", user, db_session)
+    assert exc.value.status_code == 400
+    assert "ligne 3" in exc.value.detail
+
+
+@pytest.mark.asyncio
+async def test_import_tsv_utf8_in_batches(db_session):
+    await _reset(db_session)
+    user = User(id=uuid.uuid4(), email="tsv@example.com", role="admin")
+    db_session.add(ExpertComptable(numero_ordre="EC-TSV-0000", nom_denomination="Existant", type_ec="EC"))
+    await db_session.commit()
+
+    count = IMPORT_BATCH_SIZE + 50
+    lines = ["N° d'ordre\tNoms\tSexe\tNom de l'employeur"]
+    lines += [f"EC-TSV-{idx:04d}\tSalarié {idx}\tM\tBanque, Centrale" for idx in range(count)]
+    # Doublon dans le second lot d'une ligne créée dans le premier : fusionné dans la création
+    lines.append("EC-TSV-0001\tSalarié 1\tM\tÉtat")
+    content = "\n".join(lines).encode("utf-8")
+
+    result = await _import_csv(UploadFile(io.BytesIO(content), filename="salaries.tsv"), "salarie", "salaries.tsv", user, db_session)
+    assert (result.imported, result.updated, result.total_lignes) == (count - 1, 1, count + 1)
+    assert await db_session.scalar(select(func.count()).select_from(ExpertComptable)) == count
+    merged = await db_session.scalar(select(ExpertComptable).where(ExpertComptable.numero_ordre == "EC-TSV-0001"))
+    assert merged.nom_employeur == "État"
+    existing = await db_session.scalar(select(ExpertComptable).where(ExpertComptable.numero_ordre == "EC-TSV-0000"))
+    assert (existing.nom_denomination, existing.nom_employeur) == ("Salarié 0", "Banque, Centrale")
+
+    again = await _import_csv(UploadFile(io.BytesIO(content), filename="salaries.tsv"), "salarie", "salaries.tsv", user, db_session, dry_run=True)
+    # EC-TSV-0001 : la première ligne remplace l'employeur, la seconde le rétablit ; un seul expert modifié
+    assert (again.imported, again.updated, again.unchanged) == (0, 1, count - 1)
+    assert [(d.numero_ordre, d.changes) for d in again.diff.modifies] == [("EC-TSV-0001", [])]
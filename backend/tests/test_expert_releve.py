@@ -0,0 +1,127 @@
+import base64
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete
+
+from app.api.v1.endpoints.experts import get_expert_releve
+from app.api.v1.endpoints.payments import create_payment
+from app.models.encaissement import Encaissement
+from app.models.expert_comptable import ExpertComptable
+from app.models.payment_history import PaymentHistory
+from app.models.user import User
+from app.schemas.payment import PaymentHistoryCreate
+
+
+@pytest.mark.asyncio
+async def test_releve_keyset_pages_carry_running_balance(db_session):
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.execute(delete(ExpertComptable))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="releve@example.com", role="admin")
+    expert = ExpertComptable(numero_ordre="EC-REL", nom_denomination="Cabinet Releve", type_ec="EC", active=True)
+    db_session.add(expert)
+    await db_session.commit()
+    await db_session.refresh(expert)
+    expert_id = str(expert.id)
+
+    enc_a = Encaissement(
+        numero_recu="REC-REL-0001",
+        type_client="expert_comptable",
+        expert_comptable_id=expert.id,
+        type_operation="cotisation_annuelle",
+        montant=100,
+        montant_total=100,
+        montant_paye=30,
+        statut_paiement="partiel",
+        mode_paiement="cash",
+        date_encaissement=datetime(2026, 1, 10, tzinfo=timezone.utc),
+    )
+    enc_b = Encaissement(
+        numero_recu="REC-REL-0002",
+        type_client="expert_comptable",
+        expert_comptable_id=expert.id,
+        type_operation="inscription_tableau",
+        montant=50,
+        montant_total=50,
+        montant_paye=0,
+        statut_paiement="non_paye",
+        mode_paiement="cash",
+        date_encaissement=datetime(2026, 2, 1, tzinfo=timezone.utc),
+    )
+    db_session.add_all([enc_a, enc_b])
+    await db_session.commit()
+    await db_session.refresh(enc_a)
+
+    await create_payment(
+        payload=PaymentHistoryCreate(encaissement_id=str(enc_a.id), montant=20),
+        user=user,
+        db=db_session,
+    )
+
+    lignes = []
+    cursor = None
+    pages = 0
+    while True:
+        page = await get_expert_releve(
+            expert_id=expert_id,
+            date_debut=None,
+            date_fin=None,
+            cursor=cursor,
+            limit=2,
+            user=user,
+            db=db_session,
+        )
+        pages += 1
+        if lignes:
+            assert page.solde_ouverture == lignes[-1].solde
+        lignes.extend(page.lignes)
+        cursor = page.next_cursor
+        if not cursor:
+            break
+
+    assert pages == 2
+    assert [l.type_ligne for l in lignes] == ["encaissement", "paiement_initial", "encaissement", "paiement"]
+    assert [l.solde for l in lignes] == [Decimal("100"), Decimal("70"), Decimal("120"), Decimal("100")]
+
+    # Le solde reporté par le curseur est signé : un solde modifié par le client est refusé
+    first = await get_expert_releve(
+        expert_id=expert_id, date_debut=None, date_fin=None, cursor=None, limit=2, user=user, db=db_session
+    )
+    second = await get_expert_releve(
+        expert_id=expert_id, date_debut=None, date_fin=None, cursor=first.next_cursor, limit=2, user=user, db=db_session
+    )
+    assert second.solde_ouverture == Decimal("70")
+
+    forged = json.loads(base64.urlsafe_b64decode(first.next_cursor.encode()))
+    forged[3] = "-999"
+    with pytest.raises(HTTPException) as exc:
+        await get_expert_releve(
+            expert_id=expert_id,
+            date_debut=None,
+            date_fin=None,
+            cursor=base64.urlsafe_b64encode(json.dumps(forged).encode()).decode(),
+            limit=2,
+            user=user,
+            db=db_session,
+        )
+    assert exc.value.status_code == 400
+
+    from_february = await get_expert_releve(
+        expert_id=expert_id,
+        date_debut="2026-02-01",
+        date_fin=None,
+        cursor=None,
+        limit=10,
+        user=user,
+        db=db_session,
+    )
+    assert from_february.solde_ouverture == Decimal("70")
+    assert from_february.solde_cloture == Decimal("100")
+    assert len(from_february.lignes) == 2
@@ -0,0 +1,78 @@
+import uuid
+
+import pytest
+from sqlalchemy import delete
+
+from app.api.v1.endpoints.experts import create_expert, suggest_experts, update_expert
+from app.models.category_changes_history import CategoryChangesHistory
+from app.models.encaissement import Encaissement
+from app.models.expert_comptable import ExpertComptable
+from app.models.payment_history import PaymentHistory
+from app.models.remboursement_transport import ParticipantTransport
+from app.models.user import User
+from app.schemas.expert import ExpertComptableCreate, ExpertComptableUpdate
+from app.services.expert_index import expert_index, fold
+
+
+async def _suggest(db_session, user, q, **overrides):
+    params = dict(q=q, type_ec=None, active=True, limit=10)
+    params.update(overrides)
+    return [s.numero_ordre for s in await suggest_experts(**params, user=user, db=db_session)]
+
+
+def test_fold_removes_accents_and_punctuation():
+    assert fold("  Société d'Étude-Conseil ") == "societe d etude conseil"
+    assert fold(None) == ""
+
+
+@pytest.mark.asyncio
+async def test_suggest_experts_prefix_index(db_session):
+    await db_session.execute(delete(CategoryChangesHistory))
+    await db_session.execute(delete(ParticipantTransport))
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.execute(delete(ExpertComptable))
+    await db_session.commit()
+    expert_index.invalidate()
+
+    user = User(id=uuid.uuid4(), email="suggest@example.com", role="admin")
+    db_session.add_all(
+        [
+            ExpertComptable(numero_ordre="EC-100", nom_denomination="Étienne Mbala", type_ec="EC", active=True),
+            ExpertComptable(numero_ordre="EC-101", nom_denomination="Jean Etoka", type_ec="EC", active=True),
+            ExpertComptable(
+                numero_ordre="SEC-200",
+                nom_denomination="Cabinet Conseil",
+                raison_sociale="Etudes et Audit SARL",
+                type_ec="SEC",
+                active=True,
+            ),
+            ExpertComptable(numero_ordre="EC-102", nom_denomination="Etienne Inactif", type_ec="EC", active=False),
+        ]
+    )
+    await db_session.commit()
+
+    # Sans accents ni casse ; début de champ avant milieu de champ
+    assert await _suggest(db_session, user, "ETI") == ["EC-100"]
+    assert await _suggest(db_session, user, "et") == ["EC-100", "SEC-200", "EC-101"]
+    assert await _suggest(db_session, user, "et", limit=1) == ["EC-100"]
+    assert await _suggest(db_session, user, "et", type_ec="SEC") == ["SEC-200"]
+    assert await _suggest(db_session, user, "eti", active=None) == ["EC-102", "EC-100"]
+    assert await _suggest(db_session, user, "ec-10") == ["EC-100", "EC-101"]
+    assert await _suggest(db_session, user, "zz") == []
+
+    created = await create_expert(
+        payload=ExpertComptableCreate(numero_ordre="EC-103", nom_denomination="Étoile Kabasele"),
+        user=user,
+        db=db_session,
+    )
+    assert await _suggest(db_session, user, "eto") == ["EC-103", "EC-101"]
+
+    await update_expert(
+        expert_id=created["id"],
+        payload=ExpertComptableUpdate(nom_denomination="Kabasele Zoé"),
+        user=user,
+        db=db_session,
+    )
+    assert await _suggest(db_session, user, "eto") == ["EC-101"]
+    assert await _suggest(db_session, user, "zoe") == ["EC-103"]
@@ -0,0 +1,154 @@
+import csv
+import io
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from openpyxl import load_workbook
+from sqlalchemy import delete
+
+from app.api.v1.endpoints.encaissements import export_encaissements
+from app.api.v1.endpoints.reports import export_journal
+from app.api.v1.endpoints.sorties_fonds import export_sorties_fonds
+from app.models.encaissement import Encaissement
+from app.models.payment_history import PaymentHistory
+from app.models.sortie_fonds import SortieFonds
+from app.models.user import User
+from app.services import exports
+
+
+async def _read_body(response) -> bytes:
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+def _read_csv(body: bytes) -> list[list[str]]:
+    return list(csv.reader(io.StringIO(body.decode("utf-8-sig")), delimiter=";"))
+
+
+@pytest.fixture
+async def export_data(db_session, monkeypatch):
+    # Petits lots pour traverser plusieurs allers-retours du curseur serveur
+    monkeypatch.setattr(exports, "STREAM_BATCH_SIZE", 7)
+
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.execute(delete(SortieFonds))
+    await db_session.commit()
+
+    for idx in range(25):
+        db_session.add(
+            Encaissement(
+                numero_recu=f"REC-EXP-{idx:04d}",
+                type_client="client_externe",
+                client_nom="Client Export",
+                type_operation="formation",
+                montant=10,
+                montant_total=10,
+                montant_paye=10,
+                statut_paiement="complet",
+                mode_paiement="virement" if idx % 5 == 0 else "cash",
+                date_encaissement=datetime(2026, 3, 1 + idx, tzinfo=timezone.utc),
+            )
+        )
+    db_session.add(
+        SortieFonds(
+            type_sortie="requisition",
+            montant_paye=15,
+            date_paiement=datetime(2026, 3, 2, 12, tzinfo=timezone.utc),
+            mode_paiement="cash",
+            motif="Fournitures",
+            beneficiaire="Fournisseur",
+        )
+    )
+    await db_session.commit()
+    return User(id=uuid.uuid4(), email="export@example.com", role="admin")
+
+
+def _encaissement_filters(**overrides):
+    params = dict(
+        format="csv",
+        date_debut="2026-03-01",
+        date_fin="2026-03-31",
+        statut_paiement=None,
+        numero_recu=None,
+        client=None,
+        type_operation=None,
+        type_client=None,
+        mode_paiement=None,
+        expert_comptable_id=None,
+        order="date_encaissement.asc",
+    )
+    params.update(overrides)
+    return params
+
+
+@pytest.mark.asyncio
+async def test_export_encaissements_csv_and_xlsx(db_session, export_data):
+    user = export_data
+
+    response = await export_encaissements(**_encaissement_filters(), user=user, db=db_session)
+    assert response.headers["content-disposition"] == 'attachment; filename="encaissements_2026-03-01_2026-03-31.csv"'
+    rows = _read_csv(await _read_body(response))
+    assert rows[0][0] == "Numéro reçu"
+    assert [row[0] for row in rows[1:]] == [f"REC-EXP-{idx:04d}" for idx in range(25)]
+    assert rows[1][8] == "10.00"
+
+    response = await export_encaissements(
+        **_encaissement_filters(format="xlsx", mode_paiement="virement"), user=user, db=db_session
+    )
+    wb = load_workbook(io.BytesIO(await _read_body(response)), read_only=True)
+    values = list(wb.active.iter_rows(values_only=True))
+    assert [row[0] for row in values[1:]] == ["REC-EXP-0000", "REC-EXP-0005", "REC-EXP-0010", "REC-EXP-0015", "REC-EXP-0020"]
+
+
+@pytest.mark.asyncio
+async def test_export_sorties_and_journal(db_session, export_data):
+    user = export_data
+
+    response = await export_sorties_fonds(
+        format="csv",
+        date_debut=None,
+        date_fin=None,
+        type_sortie=None,
+        mode_paiement=None,
+        requisition_id=None,
+        reference=None,
+        order=None,
+        user=user,
+        db=db_session,
+    )
+    rows = _read_csv(await _read_body(response))
+    assert len(rows) == 2
+    assert rows[1][4] == "Fournisseur"
+
+    response = await export_journal(
+        date_debut="2026-03-02", date_fin="2026-03-03", format="csv", user=user, db=db_session
+    )
+    rows = _read_csv(await _read_body(response))
+    assert [(row[1], row[8]) for row in rows[1:]] == [
+        ("encaissement", "20.00"),
+        ("sortie", "5.00"),
+        ("encaissement", "15.00"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_export_rejects_unparseable_dates(db_session, export_data):
+    user = export_data
+
+    # Le texte reçu n'atteint jamais Content-Disposition : date illisible refusée
+    with pytest.raises(HTTPException) as exc:
+        await export_encaissements(
+            **_encaissement_filters(date_fin='x";\r\nSet-Cookie: a=b'), user=user, db=db_session
+        )
+    assert exc.value.status_code == 400
+
+    with pytest.raises(HTTPException) as exc:
+        await export_journal(date_debut="debut", date_fin=None, format="csv", user=user, db=db_session)
+    assert exc.value.status_code == 400
+
+    response = await export_journal(
+        date_debut="2026-03-02T10:00:00", date_fin=None, format="csv", user=user, db=db_session
+    )
+    assert response.headers["content-disposition"] == 'attachment; filename="journal_tresorerie_2026-03-02_fin.csv"'
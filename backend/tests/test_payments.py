@@ -0,0 +1,258 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select
+
+from app.api.v1.endpoints.payments import create_payment, create_payments_bulk, list_payments_batch
+from app.models.encaissement import Encaissement
+from app.models.payment_history import PaymentHistory
+from app.models.user import User
+from app.schemas.payment import PaymentBulkRequest, PaymentHistoryCreate
+
+
+async def _create_encaissement(db_session, numero_recu: str, montant_total: int) -> Encaissement:
+    enc = Encaissement(
+        numero_recu=numero_recu,
+        type_client="client_externe",
+        client_nom="Client Paiement",
+        type_operation="formation",
+        montant=montant_total,
+        montant_total=montant_total,
+        montant_paye=0,
+        statut_paiement="non_paye",
+        mode_paiement="cash",
+        date_encaissement=datetime(2026, 1, 27, tzinfo=timezone.utc),
+    )
+    db_session.add(enc)
+    await db_session.commit()
+    await db_session.refresh(enc)
+    return enc
+
+
+@pytest.mark.asyncio
+async def test_create_payment_updates_statut_and_rejects_overpayment(db_session):
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="caissier@example.com", role="admin")
+    enc = await _create_encaissement(db_session, "REC-PAY-0001", 100)
+    enc_id = str(enc.id)
+
+    created = await create_payment(
+        payload=PaymentHistoryCreate(encaissement_id=enc_id, montant=40, mode_paiement="cash"),
+        user=user,
+        db=db_session,
+    )
+    assert created["montant"] == Decimal("40")
+    assert created["created_by"] == str(user.id)
+
+    await db_session.refresh(enc)
+    assert enc.montant_paye == Decimal("40")
+    assert enc.statut_paiement == "partiel"
+
+    with pytest.raises(HTTPException) as exc:
+        await create_payment(
+            payload=PaymentHistoryCreate(encaissement_id=enc_id, montant=61),
+            user=user,
+            db=db_session,
+        )
+    assert exc.value.status_code == 400
+
+    await create_payment(
+        payload=PaymentHistoryCreate(encaissement_id=enc_id, montant=60, mode_paiement="virement"),
+        user=user,
+        db=db_session,
+    )
+    await db_session.refresh(enc)
+    assert enc.montant_paye == Decimal("100")
+    assert enc.statut_paiement == "complet"
+
+    with pytest.raises(HTTPException) as exc:
+        await create_payment(
+            payload=PaymentHistoryCreate(encaissement_id=str(uuid.uuid4()), montant=1),
+            user=user,
+            db=db_session,
+        )
+    assert exc.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_concurrent_payments_do_not_overpay(db_session, async_session):
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="caissier2@example.com", role="admin")
+    enc = await _create_encaissement(db_session, "REC-PAY-0002", 100)
+
+    async def pay() -> bool:
+        async with async_session() as session:
+            try:
+                await create_payment(
+                    payload=PaymentHistoryCreate(encaissement_id=str(enc.id), montant=5),
+                    user=user,
+                    db=session,
+                )
+            except HTTPException as exc:
+                assert exc.status_code == 400
+                return False
+            return True
+
+    outcomes = await asyncio.wait_for(asyncio.gather(*(pay() for _ in range(40))), timeout=30)
+
+    assert outcomes.count(True) == 20
+    await db_session.refresh(enc)
+    assert enc.montant_paye == Decimal("100")
+    assert enc.statut_paiement == "complet"
+
+    res = await db_session.execute(
+        select(func.count(), func.sum(PaymentHistory.montant)).where(PaymentHistory.encaissement_id == enc.id)
+    )
+    count, total = res.one()
+    assert count == 20
+    assert total == Decimal("100")
+
+
+@pytest.mark.asyncio
+async def test_bulk_payments_report_per_entry_results(db_session):
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="caissier3@example.com", role="admin")
+    enc_a = await _create_encaissement(db_session, "REC-PAY-0003", 100)
+    enc_b = await _create_encaissement(db_session, "REC-PAY-0004", 50)
+
+    payload = PaymentBulkRequest(
+        entries=[
+            PaymentHistoryCreate(encaissement_id=str(enc_a.id), montant=60, mode_paiement="mobile_money"),
+            PaymentHistoryCreate(encaissement_id=str(enc_a.id), montant=50, mode_paiement="mobile_money"),
+            PaymentHistoryCreate(encaissement_id=str(enc_a.id), montant=40, mode_paiement="mobile_money"),
+            PaymentHistoryCreate(encaissement_id=str(enc_b.id), montant=20, mode_paiement="mobile_money"),
+            PaymentHistoryCreate(encaissement_id=str(uuid.uuid4()), montant=10),
+            PaymentHistoryCreate(encaissement_id="not-a-uuid", montant=10),
+        ]
+    )
+    res = await create_payments_bulk(payload=payload, user=user, db=db_session)
+
+    assert res.applied == 3
+    assert res.rejected == 3
+    assert [r.status for r in res.results] == ["applied", "rejected", "applied", "applied", "rejected", "rejected"]
+    assert res.results[4].detail == "Encaissement non trouvé"
+
+    await db_session.refresh(enc_a)
+    await db_session.refresh(enc_b)
+    assert enc_a.montant_paye == Decimal("100")
+    assert enc_a.statut_paiement == "complet"
+    assert enc_b.montant_paye == Decimal("20")
+    assert enc_b.statut_paiement == "partiel"
+
+    count = await db_session.scalar(select(func.count()).select_from(PaymentHistory))
+    assert count == 3
+
+
+@pytest.mark.asyncio
+async def test_batch_lookup_groups_payments_with_aggregates(db_session):
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="caissier4@example.com", role="admin")
+    enc_a = await _create_encaissement(db_session, "REC-PAY-0005", 100)
+    enc_b = await _create_encaissement(db_session, "REC-PAY-0006", 100)
+    enc_c = await _create_encaissement(db_session, "REC-PAY-0007", 100)
+    ids = [str(enc_a.id), str(enc_b.id), str(enc_c.id)]
+
+    for enc_id, montant in ((ids[0], 10), (ids[0], 15), (ids[1], 30)):
+        await create_payment(
+            payload=PaymentHistoryCreate(encaissement_id=enc_id, montant=montant),
+            user=user,
+            db=db_session,
+        )
+
+    groups = await list_payments_batch(
+        encaissement_ids=",".join(ids),
+        date_debut=None,
+        date_fin=None,
+        aggregate=True,
+        limit=1000,
+        user=user,
+        db=db_session,
+    )
+    assert [g["encaissement_id"] for g in groups] == ids
+    assert len(groups[0]["payments"]) == 2
+    assert groups[0]["summary"].count == 2
+    assert groups[0]["summary"].total == Decimal("25")
+    assert groups[1]["summary"].total == Decimal("30")
+    assert groups[2]["payments"] == []
+    assert groups[2]["summary"].count == 0
+
+    today = datetime.now(timezone.utc).date().isoformat()
+    by_date = await list_payments_batch(
+        encaissement_ids=None,
+        date_debut=today,
+        date_fin=today,
+        aggregate=False,
+        limit=1000,
+        user=user,
+        db=db_session,
+    )
+    assert sum(len(g["payments"]) for g in by_date) == 3
+    assert all(g["summary"] is None for g in by_date)
+
+    with pytest.raises(HTTPException) as exc:
+        await list_payments_batch(
+            encaissement_ids=None,
+            date_debut=None,
+            date_fin=None,
+            aggregate=False,
+            limit=1000,
+            user=user,
+            db=db_session,
+        )
+    assert exc.value.status_code == 400
+
+    # Date illisible : refusée au lieu d'être ignorée (recherche sans filtre)
+    with pytest.raises(HTTPException) as exc:
+        await list_payments_batch(
+            encaissement_ids=None,
+            date_debut="2026-01-01",
+            date_fin="fin\r\nX",
+            aggregate=False,
+            limit=1000,
+            user=user,
+            db=db_session,
+        )
+    assert exc.value.status_code == 400
+
+    # Période trop longue sans encaissement_ids
+    with pytest.raises(HTTPException) as exc:
+        await list_payments_batch(
+            encaissement_ids=None,
+            date_debut="2024-01-01",
+            date_fin="2026-01-01",
+            aggregate=False,
+            limit=1000,
+            user=user,
+            db=db_session,
+        )
+    assert exc.value.status_code == 400
+
+    capped = await list_payments_batch(
+        encaissement_ids=None,
+        date_debut=today,
+        date_fin=today,
+        aggregate=True,
+        limit=2,
+        user=user,
+        db=db_session,
+    )
+    assert sum(len(g["payments"]) for g in capped) == 2
+    # Les agrégats restent ceux du groupe complet
+    expected_counts = {ids[0]: 2, ids[1]: 1}
+    assert all(g["summary"].count == expected_counts[g["encaissement_id"]] for g in capped)
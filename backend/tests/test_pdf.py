@@ -0,0 +1,113 @@
+import base64
+import io
+import re
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from sqlalchemy import delete
+
+from app.api.v1.endpoints.admin import upsert_print_settings
+from app.api.v1.endpoints.encaissements import get_receipt_pdf, get_receipts_pdf
+from app.api.v1.endpoints.requisitions import get_requisition_pdf
+from app.api.v1.endpoints.settings import update_print_settings
+from app.models.encaissement import Encaissement
+from app.models.ligne_requisition import LigneRequisition
+from app.models.payment_history import PaymentHistory
+from app.models.print_settings import PrintSettings
+from app.models.requisition import Requisition
+from app.models.user import User
+from app.schemas.admin import PrintSettingsUpdateRequest
+from app.schemas.settings import PrintSettingsUpdate
+from app.services import pdf
+from app.services.pdf import get_print_template, montant_en_lettres
+
+
+def _page_count(content: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b", content))
+
+
+def _png_data_url() -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (200, 30, 30)).save(buffer, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_montant_en_lettres():
+    assert montant_en_lettres(Decimal("0")) == "Zéro dollars américains"
+    assert montant_en_lettres(Decimal("1280.50")) == "Mille deux cent quatre-vingts dollars américains et cinquante cents"
+    assert montant_en_lettres(71) == "Soixante-onze dollars américains"
+
+
+@pytest.mark.asyncio
+async def test_receipt_and_requisition_pdfs(db_session):
+    await db_session.execute(delete(PrintSettings))
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.execute(delete(LigneRequisition))
+    await db_session.execute(delete(Requisition))
+    await db_session.commit()
+    pdf.invalidate_print_template()
+
+    user = User(id=uuid.uuid4(), email="impression@example.com", role="admin")
+    await update_print_settings(
+        payload=PrintSettingsUpdate(organization_name="ONEC Test", logo_url=_png_data_url(), stamp_url=_png_data_url()),
+        user=user,
+        db=db_session,
+    )
+    template = await get_print_template(db_session)
+    assert template.organization_name == "ONEC Test"
+    assert template.logo and template.stamp
+    assert await get_print_template(db_session) is template
+
+    encaissements = [
+        Encaissement(
+            numero_recu=f"REC-PDF-{idx:04d}",
+            type_client="client_externe",
+            client_nom="Client PDF",
+            type_operation="formation",
+            montant=100,
+            montant_total=100,
+            montant_paye=60 if idx == 0 else 100,
+            statut_paiement="partiel" if idx == 0 else "complet",
+            mode_paiement="cash",
+            date_encaissement=datetime(2026, 3, 10, 9 + idx, tzinfo=timezone.utc),
+        )
+        for idx in range(3)
+    ]
+    req = Requisition(numero_requisition="REQ-PDF-0001", objet="Fournitures", mode_paiement="cash", montant_total=45)
+    db_session.add_all([*encaissements, req])
+    await db_session.commit()
+    db_session.add(
+        LigneRequisition(
+            requisition_id=req.id, rubrique="Bureau", description="Papier", quantite=3, montant_unitaire=15, montant_total=45
+        )
+    )
+    await db_session.commit()
+
+    single = await get_receipt_pdf(encaissement_id=str(encaissements[0].id), duplicata=True, user=user, db=db_session)
+    assert single.media_type == "application/pdf"
+    assert single.body.startswith(b"%PDF")
+    assert _page_count(single.body) == 1
+
+    batch = await get_receipts_pdf(date_jour="2026-03-10", duplicata=False, user=user, db=db_session)
+    assert _page_count(batch.body) == 3
+    assert 'recus_2026-03-10.pdf' in batch.headers["content-disposition"]
+
+    with pytest.raises(HTTPException) as exc:
+        await get_receipts_pdf(date_jour="2026-03-11", duplicata=False, user=user, db=db_session)
+    assert exc.value.status_code == 404
+
+    voucher = await get_requisition_pdf(requisition_id=str(req.id), db=db_session, user=user)
+    assert voucher.body.startswith(b"%PDF")
+
+    await update_print_settings(payload=PrintSettingsUpdate(organization_name="ONEC Modifié"), user=user, db=db_session)
+    assert (await get_print_template(db_session)).organization_name == "ONEC Modifié"
+
+    # Même invalidation depuis l'écran d'administration
+    await upsert_print_settings(payload=PrintSettingsUpdateRequest(organization_name="ONEC Admin"), db=db_session)
+    assert pdf._template is None
+    assert (await get_print_template(db_session)).organization_name == "ONEC Admin"
@@ -0,0 +1,121 @@
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select
+
+from app.api.v1.endpoints.remboursements_transport import (
+    create_remboursement_transport_with_participants,
+    list_remboursements_transport,
+)
+from app.models.expert_comptable import ExpertComptable
+from app.models.remboursement_transport import ParticipantTransport, RemboursementTransport
+from app.models.requisition import Requisition
+from app.models.user import User
+from app.schemas.remboursement_transport import RemboursementTransportWithParticipantsCreate
+
+
+def _payload(participants, requisition_id=None) -> RemboursementTransportWithParticipantsCreate:
+    return RemboursementTransportWithParticipantsCreate(
+        instance="Conseil Provincial",
+        type_reunion="conseil",
+        nature_reunion="Session ordinaire",
+        nature_travail=["Budget"],
+        lieu="Kinshasa",
+        date_reunion=datetime(2026, 3, 12, tzinfo=timezone.utc),
+        montant_total=1,
+        participants=participants,
+        requisition_id=requisition_id,
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_remboursement_with_participants(db_session):
+    await db_session.execute(delete(ParticipantTransport))
+    await db_session.execute(delete(RemboursementTransport))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="transport@example.com", role="admin")
+    expert = ExpertComptable(numero_ordre="EC-RT-1", nom_denomination="Expert Transport", type_ec="EC", active=True)
+    db_session.add(expert)
+    await db_session.commit()
+
+    participants = [
+        {
+            "nom": f"Participant {idx}",
+            "titre_fonction": "Membre",
+            "montant": "15",
+            "type_participant": "principal",
+            "expert_comptable_id": str(expert.id) if idx % 2 == 0 else None,
+        }
+        for idx in range(120)
+    ] + [{"nom": "Assistant", "titre_fonction": "Secrétaire", "montant": "10", "type_participant": "assistant"}]
+
+    created = await create_remboursement_transport_with_participants(
+        payload=_payload(participants), user=user, db=db_session
+    )
+    assert created.montant_total == Decimal("1810")
+    assert len(created.participants) == 121
+    assert {p.remboursement_id for p in created.participants} == {created.id}
+    assert sum(1 for p in created.participants if p.expert_comptable_id == str(expert.id)) == 60
+    assert created.created_by == str(user.id)
+
+    unknown = str(uuid.uuid4())
+    with pytest.raises(HTTPException) as exc:
+        await create_remboursement_transport_with_participants(
+            payload=_payload([{**participants[0], "expert_comptable_id": unknown}]), user=user, db=db_session
+        )
+    assert exc.value.status_code == 400
+    assert unknown in exc.value.detail
+    assert await db_session.scalar(select(func.count()).select_from(RemboursementTransport)) == 1
+
+
+@pytest.mark.asyncio
+async def test_list_remboursements_with_includes(db_session):
+    await db_session.execute(delete(ParticipantTransport))
+    await db_session.execute(delete(RemboursementTransport))
+    await db_session.commit()
+
+    demandeur = User(id=uuid.uuid4(), email=f"demandeur-{uuid.uuid4().hex[:6]}@example.com", prenom="Awa", nom="Mbala")
+    req = Requisition(
+        numero_requisition=f"REQ-RT-{uuid.uuid4().hex[:6]}",
+        objet="Remboursement transport",
+        mode_paiement="cash",
+        type_requisition="remboursement_transport",
+        montant_total=Decimal("30.10"),
+        status="VALIDEE",
+        created_by=demandeur.id,
+    )
+    db_session.add_all([demandeur, req])
+    await db_session.commit()
+
+    participant = {"nom": "P", "titre_fonction": "Membre", "montant": "15.05", "type_participant": "principal"}
+    linked = await create_remboursement_transport_with_participants(
+        payload=_payload([participant, participant], requisition_id=str(req.id)), user=demandeur, db=db_session
+    )
+    await create_remboursement_transport_with_participants(payload=_payload([]), user=demandeur, db=db_session)
+
+    async def _list(**kwargs):
+        params = {"include": None, "requisition_id": None, "limit": 50, "offset": 0}
+        params.update(kwargs)
+        return await list_remboursements_transport(**params, user=demandeur, db=db_session)
+
+    plain = await _list()
+    assert len(plain) == 2
+    assert all(r.participants is None and r.requisition is None for r in plain)
+
+    rows = await _list(include="participants,requisition", requisition_id=str(req.id))
+    assert [r.id for r in rows] == [linked.id]
+    row = rows[0]
+    assert row.montant_total == Decimal("30.10")
+    assert [p.montant for p in row.participants] == [Decimal("15.05"), Decimal("15.05")]
+    assert row.requisition.numero_requisition == req.numero_requisition
+    assert row.requisition.reste_a_payer == Decimal("30.10")
+    assert row.requisition.demandeur.prenom == "Awa"
+    assert row.requisition.caissier is None
+
+    newest, oldest = await _list(include="participants", limit=1), await _list(include="participants", offset=1)
+    assert newest[0].id != linked.id and newest[0].participants is None
+    assert [r.id for r in oldest] == [linked.id] and len(oldest[0].participants) == 2
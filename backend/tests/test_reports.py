@@ -0,0 +1,542 @@
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, select
+
+from app.api.v1.endpoints import reports
+from app.api.v1.endpoints.cotisations import generate_cotisations
+from app.api.v1.endpoints.encaissements import create_encaissement
+from app.api.v1.endpoints.payments import create_payment, create_payments_bulk
+from app.api.v1.endpoints.reports import (
+    close_month,
+    create_report_job,
+    get_report_job,
+    receivables_aging,
+    summary,
+    treasury_cube,
+)
+from app.api.v1.endpoints.sorties_fonds import create_sortie_fonds
+from app.core.config import settings
+from app.models.encaissement import Encaissement
+from app.models.expert_comptable import ExpertComptable
+from app.models.payment_history import PaymentHistory
+from app.models.report_job import ReportJob
+from app.models.report_snapshot import ReportSnapshot
+from app.models.sortie_fonds import SortieFonds
+from app.models.user import User
+from app.schemas.cotisation import CotisationGenerateRequest
+from app.schemas.payment import EncaissementCreate, PaymentBulkRequest, PaymentHistoryCreate
+from app.schemas.reports import ReportJobCreate, ReportSnapshotCreate
+from app.schemas.sortie_fonds import SortieFondsCreate
+from app.services import report_jobs
+
+
+@pytest.mark.asyncio
+async def test_receivables_aging_buckets(db_session):
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.execute(delete(ExpertComptable))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="finance@example.com", role="admin")
+    expert = ExpertComptable(numero_ordre="EC-AGE", nom_denomination="Cabinet Aging", type_ec="EC", active=True)
+    db_session.add(expert)
+    await db_session.commit()
+    await db_session.refresh(expert)
+
+    rows = [
+        # (date, total, paye, statut, type_client)
+        (datetime(2026, 3, 25, tzinfo=timezone.utc), 100, 0, "non_paye", "expert_comptable"),
+        (datetime(2026, 2, 20, tzinfo=timezone.utc), 100, 40, "partiel", "expert_comptable"),
+        (datetime(2026, 1, 15, tzinfo=timezone.utc), 50, 0, "non_paye", "client_externe"),
+        (datetime(2025, 11, 1, tzinfo=timezone.utc), 30, 0, "non_paye", "client_externe"),
+        (datetime(2025, 11, 1, tzinfo=timezone.utc), 70, 70, "complet", "client_externe"),
+        (datetime(2026, 4, 15, tzinfo=timezone.utc), 500, 0, "non_paye", "client_externe"),
+    ]
+    for idx, (day, total, paye, statut, type_client) in enumerate(rows):
+        db_session.add(
+            Encaissement(
+                numero_recu=f"REC-AGE-{idx:04d}",
+                type_client=type_client,
+                expert_comptable_id=expert.id if type_client == "expert_comptable" else None,
+                client_nom=None if type_client == "expert_comptable" else "Client",
+                type_operation="cotisation_annuelle" if type_client == "expert_comptable" else "formation",
+                montant=total,
+                montant_total=total,
+                montant_paye=paye,
+                statut_paiement=statut,
+                mode_paiement="cash",
+                date_encaissement=day,
+            )
+        )
+    await db_session.commit()
+
+    res = await receivables_aging(as_of="2026-03-31", expert_limit=10, user=user, db=db_session)
+
+    assert res.totals.count == 4
+    assert res.totals.total == Decimal("240")
+    assert res.totals.jours_0_30 == Decimal("100")
+    assert res.totals.jours_31_60 == Decimal("60")
+    assert res.totals.jours_61_90 == Decimal("50")
+    assert res.totals.jours_plus_90 == Decimal("30")
+
+    par_type_client = {row.key: row.total for row in res.par_type_client}
+    assert par_type_client == {"expert_comptable": Decimal("160"), "client_externe": Decimal("80")}
+    assert {row.key for row in res.par_type_operation} == {"cotisation_annuelle", "formation"}
+
+    assert len(res.par_expert) == 1
+    assert res.par_expert[0].key == "EC-AGE"
+    assert res.par_expert[0].label == "Cabinet Aging"
+    assert res.par_expert[0].total == Decimal("160")
+
+
+@pytest.mark.asyncio
+async def test_summary_breakdowns_from_grouping_sets(db_session):
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.execute(delete(SortieFonds))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="rapport@example.com", role="admin")
+    rows = [
+        # (date, paye, statut, mode, type_operation)
+        (datetime(2026, 2, 27, tzinfo=timezone.utc), 500, "complet", "cash", "formation"),
+        (datetime(2026, 3, 1, tzinfo=timezone.utc), 100, "complet", "cash", "formation"),
+        (datetime(2026, 3, 1, tzinfo=timezone.utc), 40, "partiel", "virement", "cotisation_annuelle"),
+        (datetime(2026, 3, 2, tzinfo=timezone.utc), 0, "non_paye", "cash", "formation"),
+        (datetime(2026, 3, 3, tzinfo=timezone.utc), 60, "complet", "virement", "formation"),
+    ]
+    for idx, (day, paye, statut, mode, type_operation) in enumerate(rows):
+        db_session.add(
+            Encaissement(
+                numero_recu=f"REC-SUM-{idx:04d}",
+                type_client="client_externe",
+                client_nom="Client",
+                type_operation=type_operation,
+                montant=100,
+                montant_total=100,
+                montant_paye=paye,
+                statut_paiement=statut,
+                mode_paiement=mode,
+                date_encaissement=day,
+            )
+        )
+    db_session.add_all(
+        [
+            SortieFonds(
+                type_sortie="requisition",
+                montant_paye=30,
+                date_paiement=datetime(2026, 3, 2, tzinfo=timezone.utc),
+                mode_paiement="cash",
+                motif="Fournitures",
+                beneficiaire="Fournisseur",
+            ),
+            SortieFonds(
+                type_sortie="requisition",
+                montant_paye=200,
+                date_paiement=datetime(2026, 2, 1, tzinfo=timezone.utc),
+                mode_paiement="cash",
+                motif="Loyer",
+                beneficiaire="Bailleur",
+            ),
+        ]
+    )
+    await db_session.commit()
+
+    res = await summary(date_debut="2026-03-01", date_fin="2026-03-03", user=user, db=db_session)
+    stats = res.stats
+
+    assert stats.availability.encaissements and stats.availability.sorties
+    assert stats.totals.solde_initial == Decimal("300")
+    assert stats.totals.encaissements_total == Decimal("200")
+    assert stats.totals.sorties_total == Decimal("30")
+    assert stats.totals.solde_final == Decimal("470")
+
+    par_statut = {(row.key, row.count, row.total) for row in stats.breakdowns.par_statut_paiement}
+    assert par_statut == {("COMPLET", 2, Decimal("160")), ("PARTIEL", 1, Decimal("40")), ("NON_PAYE", 1, Decimal("0"))}
+    par_mode = [(row.key, row.count, row.total) for row in stats.breakdowns.par_mode_paiement.encaissements]
+    assert par_mode == [("cash", 1, Decimal("100")), ("virement", 2, Decimal("100"))]
+    assert [row.key for row in stats.breakdowns.par_type_operation] == ["cotisation_annuelle", "formation"]
+    assert [(row.key, row.total) for row in stats.breakdowns.par_mode_paiement.sorties] == [("cash", Decimal("30"))]
+
+    par_jour = {row.date: (row.encaissements, row.sorties) for row in res.daily_stats}
+    assert par_jour[date(2026, 3, 1)] == (Decimal("140"), Decimal("0"))
+    assert par_jour[date(2026, 3, 2)] == (Decimal("0"), Decimal("30"))
+
+
+def _encaissement(numero_recu: str, day: datetime, paye: int, mode: str = "cash") -> Encaissement:
+    return Encaissement(
+        numero_recu=numero_recu,
+        type_client="client_externe",
+        client_nom="Client",
+        type_operation="formation",
+        montant=paye,
+        montant_total=paye,
+        montant_paye=paye,
+        statut_paiement="complet",
+        mode_paiement=mode,
+        date_encaissement=day,
+    )
+
+
+@pytest.mark.asyncio
+async def test_summary_merges_closed_month_snapshots(db_session):
+    await db_session.execute(delete(ReportSnapshot))
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.execute(delete(SortieFonds))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="cloture@example.com", role="admin")
+    db_session.add_all(
+        [
+            _encaissement("REC-SNAP-0001", datetime(2025, 12, 20, tzinfo=timezone.utc), 1000),
+            _encaissement("REC-SNAP-0002", datetime(2026, 1, 5, tzinfo=timezone.utc), 100),
+            _encaissement("REC-SNAP-0003", datetime(2026, 2, 10, tzinfo=timezone.utc), 200, "virement"),
+            _encaissement("REC-SNAP-0004", datetime(2026, 3, 15, tzinfo=timezone.utc), 300),
+            SortieFonds(
+                type_sortie="requisition",
+                montant_paye=50,
+                date_paiement=datetime(2026, 2, 11, tzinfo=timezone.utc),
+                mode_paiement="cash",
+                motif="Fournitures",
+                beneficiaire="Fournisseur",
+            ),
+        ]
+    )
+    await db_session.commit()
+
+    live = await summary(date_debut="2026-01-01", date_fin="2026-03-31", user=user, db=db_session)
+
+    for mois in ("2026-01", "2026-02"):
+        snap = await close_month(payload=ReportSnapshotCreate(mois=mois), user=user, db=db_session)
+        assert len(snap.content_hash) == 64
+    with pytest.raises(HTTPException) as exc:
+        await close_month(payload=ReportSnapshotCreate(mois="2026-01"), user=user, db=db_session)
+    assert exc.value.status_code == 409
+
+    merged = await summary(date_debut="2026-01-01", date_fin="2026-03-31", user=user, db=db_session)
+    assert merged.model_dump() == live.model_dump()
+
+    # Une écriture antidatée dans un mois clôturé n'altère pas la synthèse figée
+    db_session.add(_encaissement("REC-SNAP-0005", datetime(2026, 1, 20, tzinfo=timezone.utc), 999))
+    await db_session.commit()
+    frozen = await summary(date_debut="2026-01-01", date_fin="2026-03-31", user=user, db=db_session)
+    assert frozen.stats.totals == live.stats.totals
+    assert frozen.stats.totals.solde_initial == Decimal("1000")
+    assert frozen.stats.totals.solde_final == Decimal("1550")
+    assert len(frozen.daily_stats) == 90
+
+    partial = await summary(date_debut="2026-01-02", date_fin="2026-03-31", user=user, db=db_session)
+    assert partial.stats.totals.encaissements_total == Decimal("1599")
+
+    await db_session.execute(delete(ReportSnapshot))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_writes_into_closed_month_are_refused(db_session):
+    await db_session.execute(delete(ReportSnapshot))
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.execute(delete(SortieFonds))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="cloture-ecritures@example.com", role="admin")
+    impaye = _encaissement("REC-CLOS-0001", datetime(2025, 6, 10, tzinfo=timezone.utc), 0)
+    impaye.montant_total = 100
+    impaye.statut_paiement = "non_paye"
+    db_session.add(impaye)
+    await db_session.commit()
+    enc_id = str(impaye.id)
+
+    await close_month(payload=ReportSnapshotCreate(mois="2025-06"), user=user, db=db_session)
+    frozen = await summary(date_debut="2025-06-01", date_fin="2025-06-30", user=user, db=db_session)
+
+    juin = datetime(2025, 6, 20, tzinfo=timezone.utc)
+    with pytest.raises(HTTPException) as exc:
+        await create_payment(
+            payload=PaymentHistoryCreate(encaissement_id=enc_id, montant=40), user=user, db=db_session
+        )
+    assert exc.value.status_code == 409
+    await db_session.rollback()
+
+    bulk = await create_payments_bulk(
+        payload=PaymentBulkRequest(entries=[PaymentHistoryCreate(encaissement_id=enc_id, montant=40)]),
+        user=user,
+        db=db_session,
+    )
+    assert (bulk.applied, bulk.rejected) == (0, 1)
+    assert bulk.results[0].detail == "Encaissement daté dans un mois clôturé"
+
+    with pytest.raises(HTTPException) as exc:
+        await create_encaissement(
+            payload=EncaissementCreate(
+                numero_recu="REC-CLOS-0002",
+                type_client="client_externe",
+                client_nom="Client",
+                type_operation="formation",
+                montant=50,
+                montant_total=50,
+                montant_paye=50,
+                statut_paiement="complet",
+                date_encaissement=juin,
+            ),
+            user=user,
+            db=db_session,
+        )
+    assert exc.value.status_code == 409
+    await db_session.rollback()
+
+    with pytest.raises(HTTPException) as exc:
+        await create_sortie_fonds(
+            payload=SortieFondsCreate(
+                type_sortie="autre",
+                montant_paye=Decimal("20"),
+                date_paiement=juin,
+                mode_paiement="cash",
+                motif="Antidatée",
+                beneficiaire="Fournisseur",
+            ),
+            user=user,
+            db=db_session,
+        )
+    assert exc.value.status_code == 409
+    await db_session.rollback()
+
+    with pytest.raises(HTTPException) as exc:
+        await generate_cotisations(
+            payload=CotisationGenerateRequest(annee=2025, montant_ec=100, montant_sec=300, date_encaissement=juin),
+            user=user,
+            db=db_session,
+        )
+    assert exc.value.status_code == 409
+    await db_session.rollback()
+
+    # Rien n'a été écrit : les données vivantes concordent toujours avec le snapshot
+    db_session.expire_all()
+    live = await reports._compute_summary(db_session, date(2025, 6, 1), date(2025, 6, 30))
+    assert live.model_dump() == frozen.model_dump()
+
+    # Un mois non clôturé reste ouvert
+    await create_sortie_fonds(
+        payload=SortieFondsCreate(
+            type_sortie="autre",
+            montant_paye=Decimal("20"),
+            date_paiement=datetime(2025, 7, 1, tzinfo=timezone.utc),
+            mode_paiement="cash",
+            motif="Juillet",
+            beneficiaire="Fournisseur",
+        ),
+        user=user,
+        db=db_session,
+    )
+
+    await db_session.execute(delete(ReportSnapshot))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_report_jobs_deduplicate_and_store_result(db_session, async_session):
+    await db_session.execute(delete(ReportJob))
+    await db_session.execute(delete(ReportSnapshot))
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.execute(delete(SortieFonds))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="jobs@example.com", role="admin")
+    db_session.add(_encaissement("REC-JOB-0001", datetime(2026, 1, 5, tzinfo=timezone.utc), 100))
+    await db_session.commit()
+
+    async def submit(date_debut: str):
+        async with async_session() as session:
+            return await create_report_job(
+                payload=ReportJobCreate(date_debut=date_debut, date_fin="2026-12-31"),
+                user=user,
+                db=session,
+            )
+
+    # Même période exprimée différemment : un seul calcul
+    jobs = await asyncio.gather(submit("2026-01-01"), submit("2026-01-01T00:00:00"), submit("2026-01-01"))
+    assert len({job.id for job in jobs}) == 1
+    assert jobs[0].status in ("pending", "running", "done")
+
+    await report_jobs.drain()
+    db_session.expire_all()
+    done = await get_report_job(job_id=jobs[0].id, user=user, db=db_session)
+    assert done.status == "done"
+    assert done.result.stats.totals.encaissements_total == Decimal("100")
+    assert len(done.result.daily_stats) == 365
+
+    again = await submit("2026-01-01")
+    assert again.id == done.id and again.status == "done"
+
+    with pytest.raises(HTTPException) as exc:
+        await get_report_job(job_id=str(uuid.uuid4()), user=user, db=db_session)
+    assert exc.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_report_job_running_past_ttl_is_kept(db_session):
+    await db_session.execute(delete(ReportJob))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="jobs-longs@example.com", role="admin")
+    params = {"date_debut": "2025-01-01", "date_fin": "2025-12-31"}
+    started = datetime.now(timezone.utc) - timedelta(minutes=settings.report_jobs_ttl_minutes * 3)
+    running = ReportJob(
+        kind="summary",
+        params=params,
+        params_hash=report_jobs.params_hash("summary", params),
+        status="running",
+        created_at=started,
+        started_at=started,
+    )
+    finished = ReportJob(
+        kind="summary",
+        params={"date_debut": "2024-01-01", "date_fin": "2024-12-31"},
+        params_hash=report_jobs.params_hash("summary", {"date_debut": "2024-01-01", "date_fin": "2024-12-31"}),
+        status="done",
+        created_at=started,
+        finished_at=started,
+        expires_at=started + timedelta(minutes=1),
+    )
+    db_session.add_all([running, finished])
+    await db_session.commit()
+    running_id, finished_id = str(running.id), finished.id
+
+    # Un calcul plus long que la durée de conservation n'est ni purgé ni relancé
+    again = await create_report_job(
+        payload=ReportJobCreate(date_debut="2025-01-01", date_fin="2025-12-31"), user=user, db=db_session
+    )
+    assert again.id == running_id and again.status == "running"
+    assert again.expires_at is None
+    polled = await get_report_job(job_id=running_id, user=user, db=db_session)
+    assert polled.status == "running"
+
+    # Les résultats terminés et expirés sont purgés
+    remaining = (await db_session.execute(select(ReportJob.id).where(ReportJob.id == finished_id))).all()
+    assert remaining == []
+
+    await db_session.execute(delete(ReportJob))
+    await db_session.commit()
+
+
+async def _cube(db_session, user, dimensions, measures="count,montant_paye", sens="encaissement"):
+    return await treasury_cube(
+        dimensions=dimensions,
+        measures=measures,
+        sens=sens,
+        date_debut="2026-05-01",
+        date_fin="2026-06-30",
+        user=user,
+        db=db_session,
+    )
+
+
+@pytest.mark.asyncio
+async def test_treasury_cube(db_session, monkeypatch):
+    await db_session.execute(delete(PaymentHistory))
+    await db_session.execute(delete(Encaissement))
+    await db_session.execute(delete(SortieFonds))
+    await db_session.commit()
+    monkeypatch.setattr(reports, "_cube_cache", type(reports._cube_cache)())
+
+    user = User(id=uuid.uuid4(), email="cube@example.com", role="admin")
+    for idx, (day, mode, statut, paye) in enumerate(
+        [
+            (datetime(2026, 5, 3, tzinfo=timezone.utc), "cash", "complet", 100),
+            (datetime(2026, 5, 20, tzinfo=timezone.utc), "virement", "partiel", 40),
+            (datetime(2026, 6, 2, tzinfo=timezone.utc), "cash", "complet", 70),
+            (datetime(2026, 7, 1, tzinfo=timezone.utc), "cash", "complet", 999),
+        ]
+    ):
+        db_session.add(
+            Encaissement(
+                numero_recu=f"REC-CUBE-{idx:04d}",
+                type_client="client_externe",
+                client_nom="Client Cube",
+                type_operation="formation",
+                montant=100,
+                montant_total=100,
+                montant_paye=paye,
+                statut_paiement=statut,
+                mode_paiement=mode,
+                date_encaissement=day,
+            )
+        )
+    db_session.add(
+        SortieFonds(
+            type_sortie="requisition",
+            rubrique_code="R-01",
+            montant_paye=30,
+            date_paiement=datetime(2026, 5, 10, tzinfo=timezone.utc),
+            mode_paiement="cash",
+            motif="Fournitures",
+            beneficiaire="Fournisseur",
+        )
+    )
+    await db_session.commit()
+
+    cube = await _cube(db_session, user, "mode_paiement,month", measures="montant_total,count,montant_paye")
+    assert cube.dimensions == ["month", "mode_paiement"]
+    assert cube.measures == ["count", "montant_paye", "montant_total"]
+    assert [(r.dimensions["month"], r.dimensions["mode_paiement"], r.count, r.montant_paye) for r in cube.rows] == [
+        ("2026-05", "cash", 1, Decimal("100")),
+        ("2026-05", "virement", 1, Decimal("40")),
+        ("2026-06", "cash", 1, Decimal("70")),
+    ]
+    assert (cube.totals.count, cube.totals.montant_paye, cube.totals.montant_total) == (3, Decimal("210"), Decimal("300"))
+
+    both = await _cube(db_session, user, "rubrique_code", sens="tous")
+    assert both.dimensions == ["sens", "rubrique_code"]
+    assert [(r.dimensions["sens"], r.dimensions["rubrique_code"], r.montant_paye) for r in both.rows] == [
+        ("encaissement", None, Decimal("210")),
+        ("sortie", "R-01", Decimal("30")),
+    ]
+    # Entrées et sorties totalisées séparément, jamais additionnées
+    assert both.totals.montant_paye is None
+    assert {k: (v.count, v.montant_paye) for k, v in both.totals_by_sens.items()} == {
+        "encaissement": (3, Decimal("210")),
+        "sortie": (1, Decimal("30")),
+    }
+    by_sens = await _cube(db_session, user, "sens", sens="tous")
+    assert [(r.dimensions["sens"], r.montant_paye) for r in by_sens.rows] == [
+        ("encaissement", Decimal("210")),
+        ("sortie", Decimal("30")),
+    ]
+    assert {k: v.montant_paye for k, v in by_sens.totals_by_sens.items()} == {
+        "encaissement": Decimal("210"),
+        "sortie": Decimal("30"),
+    }
+
+    # Même requête normalisée: servie depuis le cache
+    db_session.add(
+        Encaissement(
+            numero_recu="REC-CUBE-0099",
+            type_client="client_externe",
+            client_nom="Client Cube",
+            type_operation="formation",
+            montant=5,
+            montant_total=5,
+            montant_paye=5,
+            statut_paiement="complet",
+            mode_paiement="cash",
+            date_encaissement=datetime(2026, 5, 4, tzinfo=timezone.utc),
+        )
+    )
+    await db_session.commit()
+    again = await _cube(db_session, user, " month , mode_paiement", measures="count,montant_total,montant_paye")
+    assert again is cube
+
+    with pytest.raises(HTTPException) as exc:
+        await _cube(db_session, user, "month,montant_paye; DROP TABLE encaissements")
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        await _cube(db_session, user, "type_sortie")
+    assert exc.value.status_code == 400
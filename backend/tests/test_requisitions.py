@@ -0,0 +1,121 @@
+import asyncio
+import uuid
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select
+
+from app.api.v1.endpoints.requisitions import bulk_requisition_action, create_requisition_with_lignes
+from app.models.ligne_requisition import LigneRequisition
+from app.models.requisition import Requisition
+from app.models.rubrique import Rubrique
+from app.models.rubrique_budget import RubriqueBudget
+from app.models.sortie_fonds import SortieFonds
+from app.models.user import User
+from app.schemas.requisition import RequisitionBulkActionRequest, RequisitionWithLignesCreate
+
+
+@pytest.mark.asyncio
+async def test_bulk_requisition_actions(db_session, async_session):
+    await db_session.execute(delete(RubriqueBudget))
+    await db_session.execute(delete(SortieFonds))
+    await db_session.execute(delete(LigneRequisition))
+    await db_session.execute(delete(Requisition))
+    await db_session.execute(delete(Rubrique))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="validation@example.com", role="admin")
+    reqs = {
+        statut: Requisition(
+            numero_requisition=f"REQ-BULK-{idx:04d}",
+            objet="Lot",
+            mode_paiement="cash",
+            montant_total=100,
+            status=statut,
+        )
+        for idx, statut in enumerate(["EN_ATTENTE", "A_VALIDER", "REJETEE", "VALIDEE"])
+    }
+    db_session.add(Rubrique(code="BULK", libelle="Rubrique lot", active=True))
+    db_session.add_all(reqs.values())
+    await db_session.commit()
+    db_session.add(
+        LigneRequisition(
+            requisition_id=reqs["EN_ATTENTE"].id,
+            rubrique="BULK",
+            description="Ligne",
+            quantite=1,
+            montant_unitaire=100,
+            montant_total=100,
+        )
+    )
+    await db_session.commit()
+
+    async def run(action: str, ids: list[str], motif: str | None = None):
+        async with async_session() as session:
+            return await bulk_requisition_action(
+                payload=RequisitionBulkActionRequest(ids=ids, action=action, motif_rejet=motif),
+                db=session,
+                user=user,
+            )
+
+    missing = str(uuid.uuid4())
+    pending = [str(reqs["EN_ATTENTE"].id), str(reqs["A_VALIDER"].id)]
+    # Deux lots concurrents sur les mêmes réquisitions : chacune n'est validée qu'une fois
+    first, second = await asyncio.gather(
+        run("validate", pending + [str(reqs["REJETEE"].id), missing, "pas-un-uuid"]),
+        run("validate", pending),
+    )
+    assert sorted(r.id for r in first.updated + second.updated) == sorted(pending)
+    assert {
+        (str(reqs["REJETEE"].id), "status_conflict", "REJETEE"),
+        (missing, "not_found", None),
+        ("pas-un-uuid", "invalid_id", None),
+    } <= {(s.id, s.reason, s.status) for s in first.skipped}
+    assert all(r.status == "VALIDEE" and r.validee_par == str(user.id) for r in first.updated + second.updated)
+
+    budget = (await db_session.execute(select(RubriqueBudget))).scalar_one()
+    assert budget.montant_engage == Decimal("100")
+
+    approved = await run("approve", [str(reqs["EN_ATTENTE"].id), str(reqs["VALIDEE"].id)])
+    assert {r.status for r in approved.updated} == {"APPROUVEE"}
+    assert len(approved.updated) == 2 and approved.skipped == []
+
+    rejected = await run("reject", [str(reqs["EN_ATTENTE"].id), str(reqs["A_VALIDER"].id)], motif="Doublon")
+    assert [r.id for r in rejected.updated] == [str(reqs["A_VALIDER"].id)]
+    assert rejected.updated[0].motif_rejet == "Doublon"
+    assert [(s.reason, s.status) for s in rejected.skipped] == [("status_conflict", "APPROUVEE")]
+
+
+@pytest.mark.asyncio
+async def test_create_requisition_with_lignes(db_session):
+    await db_session.execute(delete(LigneRequisition))
+    await db_session.execute(delete(Requisition))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="demandeur@example.com", role="admin")
+    payload = RequisitionWithLignesCreate(
+        numero_requisition="REQ-NEST-0001",
+        objet="Séminaire",
+        mode_paiement="cash",
+        type_requisition="classique",
+        montant_total=1,
+        lignes=[
+            {"rubrique": "FOURN", "description": "Blocs-notes", "quantite": 3, "montant_unitaire": "12.50"},
+            {"rubrique": "MISS", "description": "Transport", "montant_unitaire": "40"},
+        ],
+    )
+    created = await create_requisition_with_lignes(payload=payload, db=db_session, user=user)
+    assert created.montant_total == Decimal("77.50")
+    assert created.status == "EN_ATTENTE"
+    assert [(l.rubrique, l.quantite, l.montant_total) for l in created.lignes] == [
+        ("FOURN", 3, Decimal("37.50")),
+        ("MISS", 1, Decimal("40.00")),
+    ]
+    assert {l.requisition_id for l in created.lignes} == {created.id}
+
+    # Numéro déjà pris: rien n'est écrit
+    with pytest.raises(HTTPException) as exc:
+        await create_requisition_with_lignes(payload=payload, db=db_session, user=user)
+    assert exc.value.status_code == 409
+    assert await db_session.scalar(select(func.count()).select_from(LigneRequisition)) == 2
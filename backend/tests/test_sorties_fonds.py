@@ -0,0 +1,76 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select
+
+from app.api.v1.endpoints.sorties_fonds import create_sortie_fonds
+from app.models.requisition import Requisition
+from app.models.sortie_fonds import SortieFonds
+from app.models.user import User
+from app.schemas.sortie_fonds import SortieFondsCreate
+
+
+def _payout(requisition_id, montant: str) -> SortieFondsCreate:
+    return SortieFondsCreate(
+        type_sortie="requisition",
+        requisition_id=str(requisition_id),
+        montant_paye=Decimal(montant),
+        date_paiement=datetime(2026, 4, 5, tzinfo=timezone.utc),
+        mode_paiement="cash",
+        motif="Décaissement",
+        beneficiaire="Fournisseur",
+    )
+
+
+@pytest.mark.asyncio
+async def test_requisition_payouts_never_exceed_total_under_concurrency(db_session, async_session):
+    await db_session.execute(delete(SortieFonds))
+    await db_session.execute(delete(Requisition))
+    await db_session.commit()
+
+    user = User(id=uuid.uuid4(), email="caisse@example.com", role="admin")
+    req = Requisition(
+        numero_requisition="REQ-PAY-0001",
+        objet="Mission",
+        mode_paiement="cash",
+        montant_total=100,
+        status="VALIDEE",
+    )
+    db_session.add(req)
+    await db_session.commit()
+
+    async def pay(montant: str):
+        async with async_session() as session:
+            return await create_sortie_fonds(payload=_payout(req.id, montant), user=user, db=session)
+
+    results = await asyncio.gather(pay("40"), pay("40"), pay("40"), return_exceptions=True)
+    refused = [r for r in results if isinstance(r, HTTPException)]
+    assert len(refused) == 1 and refused[0].status_code == 409
+    accepted = [r for r in results if not isinstance(r, Exception)]
+    assert len(accepted) == 2
+    assert await db_session.scalar(select(func.count()).select_from(SortieFonds)) == 2
+
+    db_session.expire_all()
+    await db_session.refresh(req)
+    assert req.montant_paye_cumule == Decimal("80")
+    assert req.status == "VALIDEE"
+
+    last = await pay("20")
+    assert last.requisition.status == "PAYEE"
+    assert last.requisition.reste_a_payer == Decimal("0")
+    assert last.requisition.payee_par == str(user.id)
+    assert last.requisition.payee_le is not None
+
+    with pytest.raises(HTTPException) as exc:
+        await pay("0.01")
+    assert exc.value.status_code == 409
+    with pytest.raises(HTTPException) as exc:
+        await pay("0")
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        await create_sortie_fonds(payload=_payout(uuid.uuid4(), "5"), user=user, db=db_session)
+    assert exc.value.status_code == 404
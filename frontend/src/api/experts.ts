@@ -31,6 +31,15 @@ export interface ExpertSearchParams {
   offset?: number
 }
 
+export interface ExpertSuggestion {
+  id: string
+  numero_ordre: string
+  nom_denomination: string
+  raison_sociale?: string | null
+  type_ec: string
+  active: boolean
+}
+
 export interface ExpertImportRow {
   numero_ordre: string
   nom_denomination: string
@@ -54,14 +63,24 @@ export interface ExpertImportRequest {
   file_data?: Record<string, unknown>[]
 }
 
+export interface ExpertImportDiffLine {
+  ligne: number
+  numero_ordre: string
+  nom_denomination?: string | null
+  changes: { champ: string; avant?: string | null; apres: string }[]
+}
+
 export interface ExpertImportResponse {
   success: boolean
   imported: number
   updated?: number
+  unchanged?: number
   skipped?: number
   total_lignes?: number
   errors?: { ligne: number; champ: string; message: string }[]
   import_id?: string
+  dry_run?: boolean
+  diff?: { nouveaux: ExpertImportDiffLine[]; modifies: ExpertImportDiffLine[] } | null
   message: string
 }
 
@@ -103,6 +122,14 @@ async function searchExperts(params: ExpertSearchParams = {}): Promise<ExpertCom
   return apiRequest<ExpertComptable[]>('GET', `/experts-comptables${query ? `?${query}` : ''}`)
 }
 
+// Autocomplétion (préfixe d'un mot du numéro d'ordre, du nom ou de la raison sociale)
+export async function suggestExperts(q: string, params: { type_ec?: string; limit?: number } = {}): Promise<ExpertSuggestion[]> {
+  const queryParams = new URLSearchParams({ q })
+  if (params.type_ec) queryParams.append('type_ec', params.type_ec)
+  if (params.limit) queryParams.append('limit', String(params.limit))
+  return apiRequest<ExpertSuggestion[]>('GET', `/experts-comptables/suggest?${queryParams.toString()}`)
+}
+
 // Recherche par numéro d'ordre (retourne un seul expert ou null)
 export async function findExpertByNumeroOrdre(numeroOrdre: string): Promise<ExpertComptable | null> {
   const results = await searchExperts({ numero_ordre: numeroOrdre, limit: 1 })
@@ -110,8 +137,21 @@ export async function findExpertByNumeroOrdre(numeroOrdre: string): Promise<Expe
 }
 
 // Import batch d'experts
-export async function importExperts(data: ExpertImportRequest): Promise<ExpertImportResponse> {
-  return apiRequest<ExpertImportResponse>('POST', '/experts-comptables/import', data)
+export async function importExperts(data: ExpertImportRequest, options: { dryRun?: boolean } = {}): Promise<ExpertImportResponse> {
+  const query = options.dryRun ? '?dry_run=true' : ''
+  return apiRequest<ExpertImportResponse>('POST', `/experts-comptables/import${query}`, data)
+}
+
+export interface ExpertImportRollbackResponse {
+  import_id: string
+  deleted: number
+  restored: number
+  message: string
+}
+
+// Annulation d'un import (admin) : experts créés supprimés, experts modifiés restaurés
+export async function rollbackImport(importId: string): Promise<ExpertImportRollbackResponse> {
+  return apiRequest<ExpertImportRollbackResponse>('POST', `/experts-comptables/imports/${importId}/rollback`)
 }
 
 // Changement de catégorie
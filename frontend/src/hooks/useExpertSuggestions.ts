@@ -0,0 +1,45 @@
+import { useState, useEffect } from 'react'
+import { suggestExperts, ExpertSuggestion } from '../api/experts'
+
+const DEBOUNCE_MS = 250
+
+export interface ExpertSuggestions {
+  suggestions: ExpertSuggestion[]
+  loading: boolean
+}
+
+// Autocomplétion des experts via /experts-comptables/suggest, appelée après une pause de frappe
+export function useExpertSuggestions(query: string, limit = 10): ExpertSuggestions {
+  const [suggestions, setSuggestions] = useState<ExpertSuggestion[]>([])
+  const [loading, setLoading] = useState(false)
+
+  useEffect(() => {
+    const q = query.trim()
+    if (!q) {
+      setSuggestions([])
+      setLoading(false)
+      return
+    }
+
+    let cancelled = false
+    setLoading(true)
+    const timer = setTimeout(async () => {
+      try {
+        const results = await suggestExperts(q, { limit })
+        if (!cancelled) setSuggestions(Array.isArray(results) ? results : [])
+      } catch (error) {
+        console.error('Error loading expert suggestions:', error)
+        if (!cancelled) setSuggestions([])
+      } finally {
+        if (!cancelled) setLoading(false)
+      }
+    }, DEBOUNCE_MS)
+
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
+  }, [query, limit])
+
+  return { suggestions, loading }
+}
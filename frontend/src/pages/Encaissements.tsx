@@ -4,7 +4,9 @@ import * as XLSX from 'xlsx'
 
 import { apiRequest, ApiError } from '../lib/apiClient'
 import { useAuth } from '../contexts/AuthContext'
-import { Encaissement, ExpertComptable, ModePatement, TypeClient, TypeOperation } from '../types'
+import { useExpertSuggestions } from '../hooks/useExpertSuggestions'
+import { ExpertSuggestion } from '../api/experts'
+import { Encaissement, ModePatement, TypeClient, TypeOperation } from '../types'
 
 import styles from './Encaissements.module.css'
 import PrintReceipt from '../components/PrintReceipt'
@@ -40,11 +42,9 @@ export default function Encaissements() {
 
   const [showForm, setShowForm] = useState(false)
   const [encaissements, setEncaissements] = useState<Encaissement[]>([])
-  const [experts, setExperts] = useState<ExpertComptable[]>([])
   const [loading, setLoading] = useState(true)
 
   const [searchEC, setSearchEC] = useState('')
-  const [filteredExperts, setFilteredExperts] = useState<ExpertComptable[]>([])
 
   const [printingEncaissement, setPrintingEncaissement] = useState<Encaissement | null>(null)
   const [managingPayment, setManagingPayment] = useState<Encaissement | null>(null)
@@ -82,15 +82,9 @@ export default function Encaissements() {
 
       const encPath =
         '/encaissements' + buildQuery({ include: 'expert_comptable', limit: 200, order: 'date_encaissement.desc' })
-      const expPath = '/experts-comptables' + buildQuery({ active: true, limit: 200, offset: 0 })
-
-      const [encRes, expRes] = await Promise.all([
-        apiRequest<Encaissement[]>('GET', encPath),
-        apiRequest<ExpertComptable[]>('GET', expPath),
-      ])
-
-      setEncaissements(Array.isArray(encRes) ? encRes : [])
-      setExperts(Array.isArray(expRes) ? expRes : [])
+      const encRes = await apiRequest<Encaissement[]>('GET', encPath)
+
+      setEncaissements(Array.isArray(encRes) ? encRes : [])
     } catch (error) {
       console.error('Error loading data:', error)
       let details = 'Vérifie la connexion au backend / API_BASE_URL.'
@@ -129,22 +123,14 @@ export default function Encaissements() {
     loadData()
   }, [loadData])
 
-  useEffect(() => {
-    if (!searchEC) {
-      setFilteredExperts([])
-      return
-    }
-    const q = searchEC.toLowerCase()
-    const filtered = experts.filter(
-      (e) => e.numero_ordre.toLowerCase().includes(q) || e.nom_denomination.toLowerCase().includes(q)
-    )
-    setFilteredExperts(filtered)
-  }, [searchEC, experts])
-
-  const selectExpert = (expert: ExpertComptable) => {
+  // Recherche servie par /experts-comptables/suggest ; suspendue une fois l'expert choisi
+  const { suggestions: filteredExperts, loading: searchingExperts } = useExpertSuggestions(
+    formData.expert_comptable_id ? '' : searchEC
+  )
+
+  const selectExpert = (expert: ExpertSuggestion) => {
     setFormData((prev) => ({ ...prev, expert_comptable_id: expert.id, client_nom: '' }))
     setSearchEC(`${expert.numero_ordre} - ${expert.nom_denomination}`)
-    setFilteredExperts([])
   }
 
   const filteredEncaissements = useMemo(() => {
@@ -382,7 +368,6 @@ export default function Encaissements() {
         date_encaissement: format(new Date(), 'yyyy-MM-dd'),
       })
       setSearchEC('')
-      setFilteredExperts([])
 
       await loadData()
       window.dispatchEvent(new Event('dashboard-refresh'))
@@ -571,7 +556,6 @@ export default function Encaissements() {
                       type_operation: defaultOperation as TypeOperation,
                     }))
                     setSearchEC('')
-                    setFilteredExperts([])
                   }}
                 >
                   {Object.entries(TYPE_CLIENT_LABELS).map(([value, label]) => (
@@ -589,7 +573,10 @@ export default function Encaissements() {
                     <input
                       type="text"
                       value={searchEC}
-                      onChange={(e) => setSearchEC(e.target.value)}
+                      onChange={(e) => {
+                        setSearchEC(e.target.value)
+                        setFormData((prev) => ({ ...prev, expert_comptable_id: '' }))
+                      }}
                       placeholder="Rechercher par numéro d'ordre ou nom"
                       style={{
                         borderColor: formData.expert_comptable_id ? '#10b981' : undefined,
@@ -615,7 +602,7 @@ export default function Encaissements() {
 
                   {filteredExperts.length > 0 && (
                     <div className={styles.dropdown}>
-                      {filteredExperts.slice(0, 10).map((expert) => (
+                      {filteredExperts.map((expert) => (
                         <div
                           key={expert.id}
                           onClick={() => selectExpert(expert)}
@@ -627,7 +614,7 @@ export default function Encaissements() {
                     </div>
                   )}
 
-                  {!formData.expert_comptable_id && searchEC && filteredExperts.length === 0 && (
+                  {!formData.expert_comptable_id && searchEC.trim() && !searchingExperts && filteredExperts.length === 0 && (
                     <small style={{ color: '#f59e0b', fontSize: '13px' }}>
                       Aucun expert trouvé. Veuillez vérifier le numéro ou le nom.
                     </small>
@@ -11,7 +11,8 @@ interface ImportRecord {
   imported_at: string
   rows_imported: number
   status: string
-  file_data: any[]
+  file_format?: string | null
+  file_rows?: number | null
   error_details?: any
   user_email?: string
 }
@@ -86,8 +87,16 @@ export default function ImportHistory() {
     }
   }
 
-  const handleDownloadOriginal = (record: ImportRecord) => {
-    const worksheet = XLSX.utils.json_to_sheet(record.file_data)
+  const handleDownloadOriginal = async (record: ImportRecord) => {
+    // Le contenu du fichier n'est pas renvoyé par la liste : lecture page par page
+    const rows: any[] = []
+    const limit = 1000
+    for (let offset = 0; ; offset += limit) {
+      const page: any = await apiRequest('GET', `/imports-history/${record.id}/rows`, { params: { offset, limit } })
+      rows.push(...(page?.items || []))
+      if (!page || offset + limit >= page.total) break
+    }
+    const worksheet = XLSX.utils.json_to_sheet(rows)
     const workbook = XLSX.utils.book_new()
     XLSX.utils.book_append_sheet(workbook, worksheet, 'Données')
     XLSX.writeFile(workbook, record.filename)
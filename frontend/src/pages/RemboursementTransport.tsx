@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react'
 import { apiRequest } from '../lib/apiClient'
 import { useAuth } from '../contexts/AuthContext'
+import { useExpertSuggestions } from '../hooks/useExpertSuggestions'
 import { Requisition } from '../types'
 import { format } from 'date-fns'
 import { generateRemboursementTransportPDF } from '../utils/pdfGeneratorRemboursement'
@@ -39,10 +40,11 @@ interface ExpertComptable {
   nom_denomination: string
 }
 
+const EXPERT_SUGGESTIONS_MAX = 25
+
 export default function RemboursementTransport() {
   const { user } = useAuth()
   const [remboursements, setRemboursements] = useState<RemboursementTransport[]>([])
-  const [experts, setExperts] = useState<ExpertComptable[]>([])
   const [showForm, setShowForm] = useState(false)
   const [loading, setLoading] = useState(true)
   const [submitting, setSubmitting] = useState(false)
@@ -93,16 +95,11 @@ export default function RemboursementTransport() {
 
   const loadData = async () => {
     try {
-      const [remboursementsRes, expertsRes] = await Promise.all([
-        apiRequest('GET', '/remboursements-transport', { params: { include: 'requisition', limit: 200, offset: 0 } }),
-        apiRequest('GET', '/experts-comptables', { params: { active: true, limit: 200, offset: 0 } }),
-      ])
+      const remboursementsRes = await apiRequest('GET', '/remboursements-transport', { params: { include: 'requisition', limit: 200, offset: 0 } })
 
       const remb = Array.isArray(remboursementsRes) ? remboursementsRes : (remboursementsRes as any)?.items ?? (remboursementsRes as any)?.data ?? []
-      const exp = Array.isArray(expertsRes) ? expertsRes : (expertsRes as any)?.items ?? (expertsRes as any)?.data ?? []
 
       setRemboursements(remb as any)
-      setExperts(exp as any)
     } catch (error) {
       console.error('Error loading data:', error)
     } finally {
@@ -129,7 +126,13 @@ export default function RemboursementTransport() {
         statut: 'brouillon',
       })
 
-      const remboursementInsert: any = {
+      const allParticipants = [
+        ...participants.filter(p => p.nom.trim() !== ''),
+        ...assistants.filter(p => p.nom.trim() !== '')
+      ]
+
+      // Remboursement et participants créés ensemble (montant total recalculé côté serveur)
+      const remboursementData: any = await apiRequest('POST', '/remboursements-transport/with-participants', {
         instance: formData.instance,
         type_reunion: formData.type_reunion,
         nature_reunion: formData.nature_reunion,
@@ -138,28 +141,16 @@ export default function RemboursementTransport() {
         date_reunion: formData.date_reunion,
         heure_debut: formData.heure_debut || null,
         heure_fin: formData.heure_fin || null,
-        montant_total: calculateTotal(),
         requisition_id: requisitionData.id,
-        created_by: user?.id
-      }
-
-      const remboursementData: any = await apiRequest('POST', '/remboursements-transport', remboursementInsert)
-
-      const allParticipants = [
-        ...participants.filter(p => p.nom.trim() !== ''),
-        ...assistants.filter(p => p.nom.trim() !== '')
-      ]
-
-      if (allParticipants.length > 0) {
-        await apiRequest('POST', '/participants-transport', allParticipants.map(p => ({
-          remboursement_id: remboursementData.id,
+        created_by: user?.id,
+        participants: allParticipants.map(p => ({
           nom: p.nom,
           titre_fonction: p.titre_fonction,
           montant: p.montant,
           type_participant: p.type_participant,
           expert_comptable_id: p.expert_comptable_id || null
-        })))
-      }
+        }))
+      })
 
       setNotification({
         show: true,
@@ -262,12 +253,17 @@ export default function RemboursementTransport() {
     setShowAssistantExpertSearch(null)
   }
 
-  const getFilteredExperts = (searchTerm: string) => {
-    if (!searchTerm.trim()) return experts
-    return experts.filter(e =>
-      e.nom_denomination.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      e.numero_ordre.toLowerCase().includes(searchTerm.toLowerCase())
-    )
+  // Une seule liste ouverte à la fois : ses suggestions viennent de /experts-comptables/suggest
+  const activeExpertSearch = showExpertSearch !== null
+    ? participants[showExpertSearch]?.nom ?? ''
+    : showAssistantExpertSearch !== null
+      ? assistants[showAssistantExpertSearch]?.nom ?? ''
+      : ''
+  const { suggestions: expertSuggestions, loading: searchingExperts } = useExpertSuggestions(activeExpertSearch, EXPERT_SUGGESTIONS_MAX)
+
+  const getFilteredExperts = (searchTerm: string): ExpertComptable[] => {
+    if (!searchTerm.trim()) return []
+    return expertSuggestions
   }
 
   const calculateTotal = () => {
@@ -563,7 +559,7 @@ export default function RemboursementTransport() {
                                   overflowY: 'auto',
                                   overflowX: 'hidden'
                                 }}>
-                                  {getFilteredExperts(p.nom).slice(0, 25).map(expert => (
+                                  {getFilteredExperts(p.nom).map(expert => (
                                     <div
                                       key={expert.id}
                                       onMouseDown={(e) => {
@@ -617,7 +613,7 @@ export default function RemboursementTransport() {
                                       <div>
                                         <div style={{fontSize: '32px', marginBottom: '12px'}}>🔍</div>
                                         <div style={{fontSize: '14px', fontWeight: 600, marginBottom: '6px'}}>
-                                          Aucun expert trouvé
+                                          {searchingExperts ? 'Recherche en cours...' : 'Aucun expert trouvé'}
                                         </div>
                                         <div style={{fontSize: '12px'}}>
                                           pour "{p.nom}"
@@ -627,7 +623,7 @@ export default function RemboursementTransport() {
                                       <div>
                                         <div style={{fontSize: '32px', marginBottom: '12px'}}>👨‍💼</div>
                                         <div style={{fontSize: '14px', fontWeight: 600, marginBottom: '6px'}}>
-                                          {experts.length} experts disponibles
+                                          Registre des experts-comptables
                                         </div>
                                         <div style={{fontSize: '12px'}}>
                                           Tapez pour rechercher
@@ -636,7 +632,7 @@ export default function RemboursementTransport() {
                                     )}
                                   </div>
                                 )}
-                                {getFilteredExperts(p.nom).length > 25 && (
+                                {getFilteredExperts(p.nom).length >= EXPERT_SUGGESTIONS_MAX && (
                                   <div style={{
                                     padding: '12px 16px',
                                     textAlign: 'center',
@@ -646,7 +642,7 @@ export default function RemboursementTransport() {
                                     borderTop: '1px solid #e5e7eb',
                                     fontWeight: 600
                                   }}>
-                                    +{getFilteredExperts(p.nom).length - 25} autres résultats
+                                    D'autres experts correspondent
                                     <div style={{fontSize: '11px', marginTop: '4px', fontWeight: 400}}>
                                       Affinez votre recherche pour voir plus
                                     </div>
@@ -773,7 +769,7 @@ export default function RemboursementTransport() {
                                         overflowY: 'auto',
                                         overflowX: 'hidden'
                                       }}>
-                                        {getFilteredExperts(a.nom).slice(0, 25).map(expert => (
+                                        {getFilteredExperts(a.nom).map(expert => (
                                           <div
                                             key={expert.id}
                                             onMouseDown={(e) => {
@@ -827,7 +823,7 @@ export default function RemboursementTransport() {
                                             <div>
                                               <div style={{fontSize: '32px', marginBottom: '12px'}}>🔍</div>
                                               <div style={{fontSize: '14px', fontWeight: 600, marginBottom: '6px'}}>
-                                                Aucun expert trouvé
+                                                {searchingExperts ? 'Recherche en cours...' : 'Aucun expert trouvé'}
                                               </div>
                                               <div style={{fontSize: '12px'}}>
                                                 pour "{a.nom}"
@@ -837,7 +833,7 @@ export default function RemboursementTransport() {
                                             <div>
                                               <div style={{fontSize: '32px', marginBottom: '12px'}}>👨‍💼</div>
                                               <div style={{fontSize: '14px', fontWeight: 600, marginBottom: '6px'}}>
-                                                {experts.length} experts disponibles
+                                                Registre des experts-comptables
                                               </div>
                                               <div style={{fontSize: '12px'}}>
                                                 Tapez pour rechercher
@@ -846,7 +842,7 @@ export default function RemboursementTransport() {
                                           )}
                                         </div>
                                       )}
-                                      {getFilteredExperts(a.nom).length > 25 && (
+                                      {getFilteredExperts(a.nom).length >= EXPERT_SUGGESTIONS_MAX && (
                                         <div style={{
                                           padding: '12px 16px',
                                           textAlign: 'center',
@@ -856,7 +852,7 @@ export default function RemboursementTransport() {
                                           borderTop: '1px solid #e5e7eb',
                                           fontWeight: 600
                                         }}>
-                                          +{getFilteredExperts(a.nom).length - 25} autres résultats
+                                          D'autres experts correspondent
                                           <div style={{fontSize: '11px', marginTop: '4px', fontWeight: 400}}>
                                             Affinez votre recherche pour voir plus
                                           </div>
@@ -130,13 +130,13 @@ export default function Requisitions() {
       return
     }
 
-    const invalidLigne = lignes.find(l => !l.rubrique || !l.description || l.montant_unitaire <= 0)
+    const invalidLigne = lignes.find(l => !l.rubrique || !l.description || l.montant_unitaire <= 0 || !(l.quantite >= 1))
     if (invalidLigne) {
       setNotification({
         show: true,
         type: 'error',
         title: 'Lignes incomplètes',
-        message: 'Toutes les lignes doivent avoir une rubrique, une description et un montant positif.'
+        message: 'Toutes les lignes doivent avoir une rubrique, une description, une quantité d\'au moins 1 et un montant positif.'
       })
       return
     }
@@ -146,28 +146,20 @@ export default function Requisitions() {
       const numeroRes: any = await apiRequest('POST', '/requisitions/generate-numero')
       const numeroData = numeroRes
 
-      const reqRes: any = await apiRequest('POST', '/requisitions', {
+      // Réquisition et lignes créées ensemble (montant total recalculé côté serveur)
+      await apiRequest('POST', '/requisitions/with-lignes', {
         numero_requisition: numeroData,
         objet: formData.objet,
         mode_paiement: formData.mode_paiement,
         type_requisition: formData.type_requisition,
-        montant_total: calculateTotal(),
         status: 'EN_ATTENTE',
         created_by: user?.id,
         a_valoir: formData.a_valoir,
         instance_beneficiaire: formData.a_valoir ? formData.instance_beneficiaire : null,
-        notes_a_valoir: formData.a_valoir ? formData.notes_a_valoir : null
+        notes_a_valoir: formData.a_valoir ? formData.notes_a_valoir : null,
+        lignes
       })
 
-      const reqData = reqRes as any
-
-      const lignesData = lignes.map(l => ({
-        requisition_id: reqData.id,
-        ...l
-      }))
-
-      await apiRequest('POST', '/lignes-requisition', lignesData)
-
       setNotification({
         show: true,
         type: 'success',
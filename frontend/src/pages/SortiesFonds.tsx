@@ -137,18 +137,12 @@ export default function SortiesFonds() {
         sortieInsert.rubrique_code = formData.rubrique_code
       }
 
-      await apiRequest('POST', '/sorties-fonds', sortieInsert)
+      const created = await apiRequest<any>('POST', '/sorties-fonds', sortieInsert)
 
       if (formData.type_sortie === 'requisition') {
-        await apiRequest('PUT', `/requisitions/${formData.requisition_id}`, {
-          statut: 'payee',
-          payee_par: user?.id,
-          payee_le: new Date().toISOString(),
-          updated_at: new Date().toISOString(),
-        })
-
+        // Montant payé cumulé et statut de la réquisition sont tenus par le serveur : renvoyés avec la sortie
         setLastCreatedSortie({
-          requisition: selectedReq,
+          requisition: created?.requisition ?? selectedReq,
           sortie: {
             montant_paye: parseFloat(formData.montant_paye),
             mode_paiement: formData.mode_paiement,